@@ -25,6 +25,8 @@ class AbstractEntity(ABC):  # pragma: no cover
     It sits at the top of the entity class hierarchy.
     """
 
+    __slots__ = ("g", "res")
+
     short_name_to_type_iri: ClassVar[Dict[str, URIRef]] = {}
 
     def __init__(self) -> None:
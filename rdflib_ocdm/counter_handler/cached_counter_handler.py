@@ -0,0 +1,228 @@
+#!/usr/bin/python
+
+# SPDX-FileCopyrightText: 2026 Arcangelo Massari <arcangelo.massari@unibo.it>
+#
+# SPDX-License-Identifier: ISC
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from rdflib_ocdm.counter_handler.counter_handler import CounterHandler
+
+if TYPE_CHECKING:
+    from typing import Dict, Iterable, List, Mapping
+
+
+class CachedCounterHandler(CounterHandler):
+    """A ``CounterHandler`` that wraps any other handler with a bounded
+    least-recently-used cache of counter values.
+
+    Reads are served from the cache when possible, and reach the wrapped
+    handler only for the counters not seen recently. Updates are written
+    back: they stay in the cache until ``flush`` is called, the ``with``
+    block ends or the counter is evicted, so that a counter read and
+    updated many times during a provenance run reaches the wrapped handler
+    once in each direction. The number of hits, misses and evictions is
+    kept in ``hits``, ``misses`` and ``evictions``.
+
+    The cache assumes that nobody else updates the wrapped handler's
+    counters while it is in use."""
+
+    def __init__(self, inner: CounterHandler, max_size: int = 100_000) -> None:
+        """
+        Constructor of the ``CachedCounterHandler`` class.
+
+        :param inner: The wrapped counter handler
+        :type inner: CounterHandler
+        :param max_size: The maximum number of cached counters
+        :type max_size: int
+        :raises ValueError: if ``max_size`` is not positive.
+        """
+        if max_size <= 0:
+            raise ValueError("max_size must be a positive integer!")
+        self.inner = inner
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._cache: OrderedDict[str, int] = OrderedDict()
+        self._dirty: Dict[str, int] = dict()
+        self._lock = threading.RLock()
+
+    def set_counter(self, new_value: int, entity_name: str) -> None:
+        """
+        It allows to set the counter value of graph and provenance entities.
+
+        :param new_value: The new counter value to be set
+        :type new_value: int
+        :param entity_name: The entity name
+        :type entity_name: str
+        :raises ValueError: if ``new_value`` is a negative integer.
+        :return: None
+        """
+        self.set_counters({str(entity_name): new_value})
+
+    def read_counter(self, entity_name: str) -> int:
+        """
+        It allows to read the counter value of provenance entities.
+
+        :param entity_name: The entity name
+        :type entity_name: str
+        :return: The requested counter value.
+        """
+        entity_name = str(entity_name)
+        with self._lock:
+            if entity_name in self._cache:
+                self.hits += 1
+                self._cache.move_to_end(entity_name)
+                return self._cache[entity_name]
+            self.misses += 1
+            count = self.inner.read_counter(entity_name)
+            self._put(entity_name, count, dirty=False)
+            return count
+
+    def increment_counter(self, entity_name: str) -> int:
+        """
+        It allows to increment the counter value of graph and
+        provenance entities by one unit.
+
+        :param entity_name: The entity name
+        :type entity_name: str
+        :return: The newly-updated (already incremented) counter value.
+        """
+        entity_name = str(entity_name)
+        with self._lock:
+            count = self.read_counter(entity_name) + 1
+            self._put(entity_name, count, dirty=True)
+            return count
+
+    def read_counters(self, entity_names: Iterable[str]) -> Dict[str, int]:
+        """
+        It allows to read the counter values of many entities. The ones
+        not in the cache are read from the wrapped handler with a single
+        bulk request.
+
+        :param entity_names: The entity names
+        :type entity_names: Iterable[str]
+        :return: A dictionary mapping every entity name to its counter value.
+        """
+        with self._lock:
+            names: List[str] = list(dict.fromkeys(str(name) for name in entity_names))
+            missing = [name for name in names if name not in self._cache]
+            self.misses += len(missing)
+            self.hits += len(names) - len(missing)
+            fetched = self.inner.read_counters(missing) if missing else dict()
+            counters: Dict[str, int] = dict()
+            for name in names:
+                if name in fetched:
+                    counters[name] = fetched[name]
+                else:
+                    self._cache.move_to_end(name)
+                    counters[name] = self._cache[name]
+            for name, count in fetched.items():
+                self._put(name, count, dirty=False)
+            return counters
+
+    def increment_counters(self, entity_names: Iterable[str]) -> Dict[str, int]:
+        """
+        It allows to increment by one unit the counter values of many
+        entities in the cache, reading the missing ones with a single bulk
+        request. The new values are written back to the wrapped handler
+        by ``flush`` or when they are evicted. A name repeated n times is
+        incremented n times.
+
+        :param entity_names: The entity names
+        :type entity_names: Iterable[str]
+        :return: A dictionary mapping every entity name to its
+          newly-updated counter value.
+        """
+        with self._lock:
+            names = [str(name) for name in entity_names]
+            new_values = self.read_counters(names)
+            for name in names:
+                new_values[name] += 1
+            for name, count in new_values.items():
+                self._put(name, count, dirty=True)
+            return new_values
+
+    def set_counters(self, new_values: Mapping[str, int]) -> None:
+        """
+        It allows to set the counter values of many entities in the cache,
+        without any request. The new values are written back to the
+        wrapped handler by ``flush`` or when they are evicted.
+
+        :param new_values: A dictionary mapping entity names to the new
+          counter values
+        :type new_values: Mapping[str, int]
+        :raises ValueError: if any new value is a negative integer.
+        :return: None
+        """
+        if any(new_value < 0 for new_value in new_values.values()):
+            raise ValueError("new_value must be a non negative integer!")
+        with self._lock:
+            for name, new_value in new_values.items():
+                self._put(str(name), new_value, dirty=True)
+
+    def flush(self) -> None:
+        """
+        It writes the updated counters to the wrapped handler with a single
+        bulk request. They stay in the cache.
+
+        :return: None
+        """
+        with self._lock:
+            if self._dirty:
+                dirty = self._dirty
+                self._dirty = dict()
+                self.inner.set_counters(dirty)
+
+    def clear(self) -> None:
+        """
+        It flushes the updated counters and empties the cache, e.g. before
+        another process updates the wrapped handler.
+
+        :return: None
+        """
+        with self._lock:
+            self.flush()
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        It returns the number of hits, misses and evictions so far, and
+        the number of cached counters.
+
+        :return: A dictionary with the ``hits``, ``misses``, ``evictions``
+          and ``size`` keys.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._cache),
+        }
+
+    def __enter__(self) -> CachedCounterHandler:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:  # noqa: ARG002
+        self.flush()
+
+    def _put(self, entity_name: str, count: int, dirty: bool) -> None:
+        self._cache[entity_name] = count
+        self._cache.move_to_end(entity_name)
+        if dirty:
+            self._dirty[entity_name] = count
+        if len(self._cache) <= self.max_size:
+            return
+        evicted: Dict[str, int] = dict()
+        while len(self._cache) > self.max_size:
+            name, _ = self._cache.popitem(last=False)
+            self.evictions += 1
+            if name in self._dirty:
+                evicted[name] = self._dirty.pop(name)
+        if evicted:
+            self.inner.set_counters(evicted)
@@ -0,0 +1,319 @@
+#!/usr/bin/python
+
+# SPDX-FileCopyrightText: 2026 Arcangelo Massari <arcangelo.massari@unibo.it>
+#
+# SPDX-License-Identifier: ISC
+
+from __future__ import annotations
+
+import json
+import os
+import struct
+import sys
+import threading
+from array import array
+from typing import TYPE_CHECKING
+
+from rdflib_ocdm.counter_handler.counter_handler import CounterHandler
+
+if TYPE_CHECKING:
+    from typing import Dict, Iterable, Mapping
+
+# The numeric tail of an entity name, without its leading zeros, must fit
+# in the low bits of a key, and the id of its prefix in the high ones
+_TAIL_BITS = 47
+_MAX_TAIL_DIGITS = 14
+_MAX_PREFIXES = 1 << 16
+
+_FIBONACCI = 0x9E3779B97F4A7C15
+_MASK_64 = (1 << 64) - 1
+_MAX_LOAD_FACTOR = 0.7
+
+# Snapshot header: magic, version, metadata length, capacity, used slots
+_SNAPSHOT_HEADER = struct.Struct("<8sIQQQ")
+_SNAPSHOT_MAGIC = b"OCDMCIMC"
+_SNAPSHOT_VERSION = 1
+
+
+class CompactInMemoryCounterHandler(CounterHandler):
+    """A concrete implementation of the ``CounterHandler`` interface
+    that stores the counter values in the volatile system memory, using
+    a fraction of the memory of ``InMemoryCounterHandler``.
+
+    Entity names such as ``https://w3id.org/oc/meta/br/0601`` are split
+    into a prefix (``https://w3id.org/oc/meta/br/0``), which is interned
+    once, and a numeric tail (``601``). Their pair is packed into a
+    single integer key of an open-addressing table made of two ``array``
+    objects, so a counter costs 23 to 46 bytes instead of a string, an
+    integer and a dictionary entry. Names without a numeric tail fall
+    back to a plain dictionary.
+
+    Unlike ``InMemoryCounterHandler``, reading a missing counter does not
+    store it. The counters can be saved with ``snapshot`` and loaded back
+    with ``restore``, e.g. to warm up a handler on start."""
+
+    def __init__(self, initial_capacity: int = 1024) -> None:
+        """
+        Constructor of the ``CompactInMemoryCounterHandler`` class.
+
+        :param initial_capacity: The number of slots of the table, rounded
+          up to a power of two. The table grows as needed.
+        :type initial_capacity: int
+        :raises ValueError: if ``initial_capacity`` is not positive.
+        """
+        if initial_capacity <= 0:
+            raise ValueError("initial_capacity must be a positive integer!")
+        self._prefixes: Dict[str, int] = dict()
+        self._fallback: Dict[str, int] = dict()
+        self._count = 0
+        self._lock = threading.Lock()
+        self._allocate(1 << (max(initial_capacity, 8) - 1).bit_length())
+
+    def set_counter(self, new_value: int, entity_name: str) -> None:
+        """
+        It allows to set the counter value of graph and provenance entities.
+
+        :param new_value: The new counter value to be set
+        :type new_value: int
+        :param entity_name: The entity name
+        :type entity_name: str
+        :raises ValueError: if ``new_value`` is a negative integer.
+        :return: None
+        """
+        if new_value < 0:
+            raise ValueError("new_value must be a non negative integer!")
+        with self._lock:
+            self._store(str(entity_name), new_value)
+
+    def read_counter(self, entity_name: str) -> int:
+        """
+        It allows to read the counter value of provenance entities.
+
+        :param entity_name: The entity name
+        :type entity_name: str
+        :return: The requested counter value.
+        """
+        # The table may be reallocated by a concurrent _grow
+        with self._lock:
+            return self._read(str(entity_name))
+
+    def increment_counter(self, entity_name: str) -> int:
+        """
+        It allows to increment the counter value of graph and
+        provenance entities by one unit.
+
+        :param entity_name: The entity name
+        :type entity_name: str
+        :return: The newly-updated (already incremented) counter value.
+        """
+        with self._lock:
+            return self._increment(str(entity_name))
+
+    def read_counters(self, entity_names: Iterable[str]) -> Dict[str, int]:
+        """
+        It allows to read the counter values of many entities, acquiring
+        the lock only once.
+
+        :param entity_names: The entity names
+        :type entity_names: Iterable[str]
+        :return: A dictionary mapping every entity name to its counter value.
+        """
+        names = [str(name) for name in entity_names]
+        with self._lock:
+            return {name: self._read(name) for name in names}
+
+    def increment_counters(self, entity_names: Iterable[str]) -> Dict[str, int]:
+        """
+        It allows to increment by one unit the counter values of many
+        entities, acquiring the lock only once. A name repeated n times is
+        incremented n times.
+
+        :param entity_names: The entity names
+        :type entity_names: Iterable[str]
+        :return: A dictionary mapping every entity name to its
+          newly-updated counter value.
+        """
+        new_values: Dict[str, int] = dict()
+        with self._lock:
+            for name in entity_names:
+                name = str(name)
+                new_values[name] = self._increment(name)
+        return new_values
+
+    def set_counters(self, new_values: Mapping[str, int]) -> None:
+        """
+        It allows to set the counter values of many entities, acquiring
+        the lock only once.
+
+        :param new_values: A dictionary mapping entity names to the new
+          counter values
+        :type new_values: Mapping[str, int]
+        :raises ValueError: if any new value is a negative integer.
+        :return: None
+        """
+        if any(new_value < 0 for new_value in new_values.values()):
+            raise ValueError("new_value must be a non negative integer!")
+        with self._lock:
+            for name, new_value in new_values.items():
+                self._store(str(name), new_value)
+
+    def __len__(self) -> int:
+        return self._count + len(self._fallback)
+
+    def snapshot(self, file_path: str) -> None:
+        """
+        It saves every counter to a file, which is atomically replaced.
+
+        :param file_path: The path to the snapshot file
+        :type file_path: str
+        :return: None
+        """
+        with self._lock:
+            metadata = json.dumps(
+                {
+                    "byteorder": sys.byteorder,
+                    "prefixes": list(self._prefixes),
+                    "fallback": self._fallback,
+                },
+                ensure_ascii=False,
+            ).encode("utf-8")
+            tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(
+                    _SNAPSHOT_HEADER.pack(
+                        _SNAPSHOT_MAGIC,
+                        _SNAPSHOT_VERSION,
+                        len(metadata),
+                        len(self._keys),
+                        self._count,
+                    )
+                )
+                f.write(metadata)
+                self._keys.tofile(f)
+                self._values.tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, file_path)
+
+    @classmethod
+    def restore(cls, file_path: str) -> CompactInMemoryCounterHandler:
+        """
+        It creates a handler holding the counters saved by ``snapshot``.
+
+        :param file_path: The path to the snapshot file
+        :type file_path: str
+        :raises ValueError: if the file is not a snapshot.
+        :return: The restored handler.
+        """
+        handler = cls()
+        with open(file_path, "rb") as f:
+            header = f.read(_SNAPSHOT_HEADER.size)
+            if len(header) != _SNAPSHOT_HEADER.size:
+                raise ValueError(f"{file_path} is not a counter snapshot")
+            magic, version, metadata_size, capacity, count = _SNAPSHOT_HEADER.unpack(
+                header
+            )
+            if magic != _SNAPSHOT_MAGIC or version != _SNAPSHOT_VERSION:
+                raise ValueError(f"{file_path} is not a counter snapshot")
+            metadata = json.loads(f.read(metadata_size).decode("utf-8"))
+            keys = array("q")
+            values = array("q")
+            try:
+                keys.fromfile(f, capacity)
+                values.fromfile(f, capacity)
+            except EOFError as e:
+                raise ValueError(f"{file_path} is truncated") from e
+        if metadata["byteorder"] != sys.byteorder:
+            keys.byteswap()
+            values.byteswap()
+        handler._prefixes = {prefix: i for i, prefix in enumerate(metadata["prefixes"])}
+        handler._fallback = metadata["fallback"]
+        handler._keys = keys
+        handler._values = values
+        handler._mask = capacity - 1
+        handler._shift = 64 - (capacity.bit_length() - 1)
+        handler._count = count
+        return handler
+
+    def _allocate(self, capacity: int) -> None:
+        self._keys = array("q", [0]) * capacity
+        self._values = array("q", [0]) * capacity
+        self._mask = capacity - 1
+        self._shift = 64 - (capacity.bit_length() - 1)
+
+    def _get_key(self, entity_name: str, create: bool) -> int | None:
+        """
+        It returns the key of the name in the table, None if the name
+        belongs to the fallback dictionary, or 0 if its prefix is unknown
+        and ``create`` is False.
+        """
+        digits = len(entity_name) - len(entity_name.rstrip("0123456789"))
+        tail = entity_name[len(entity_name) - digits :].lstrip("0")
+        if not tail or len(tail) > _MAX_TAIL_DIGITS:
+            return None
+        prefix = entity_name[: len(entity_name) - len(tail)]
+        prefix_id = self._prefixes.get(prefix)
+        if prefix_id is None:
+            if not create:
+                return 0
+            if len(self._prefixes) >= _MAX_PREFIXES:
+                return None
+            prefix_id = self._prefixes[prefix] = len(self._prefixes)
+        return (prefix_id << _TAIL_BITS) | int(tail)
+
+    def _find(self, key: int) -> int:
+        keys = self._keys
+        mask = self._mask
+        index = ((key * _FIBONACCI) & _MASK_64) >> self._shift
+        while True:
+            slot_key = keys[index]
+            if slot_key == key or slot_key == 0:
+                return index
+            index = (index + 1) & mask
+
+    def _insert_index(self, key: int) -> int:
+        index = self._find(key)
+        if self._keys[index] == 0:
+            if self._count + 1 > len(self._keys) * _MAX_LOAD_FACTOR:
+                self._grow()
+                index = self._find(key)
+            self._keys[index] = key
+            self._count += 1
+        return index
+
+    def _store(self, entity_name: str, new_value: int) -> None:
+        key = self._get_key(entity_name, create=True)
+        if key is None:
+            self._fallback[entity_name] = new_value
+        else:
+            self._values[self._insert_index(key)] = new_value
+
+    def _read(self, entity_name: str) -> int:
+        key = self._get_key(entity_name, create=False)
+        if key is None:
+            return self._fallback.get(entity_name, 0)
+        if key == 0:
+            return 0
+        index = self._find(key)
+        return self._values[index] if self._keys[index] == key else 0
+
+    def _increment(self, entity_name: str) -> int:
+        key = self._get_key(entity_name, create=True)
+        if key is None:
+            count = self._fallback[entity_name] = self._fallback.get(entity_name, 0) + 1
+            return count
+        index = self._insert_index(key)
+        count = self._values[index] = self._values[index] + 1
+        return count
+
+    def _grow(self) -> None:
+        old_keys = self._keys
+        old_values = self._values
+        self._allocate(len(old_keys) * 2)
+        keys = self._keys
+        values = self._values
+        for old_index, key in enumerate(old_keys):
+            if key:
+                index = self._find(key)
+                keys[index] = key
+                values[index] = old_values[old_index]
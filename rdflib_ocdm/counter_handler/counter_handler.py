@@ -4,7 +4,13 @@
 # SPDX-FileCopyrightText: 2023-2026 Arcangelo Massari <arcangelo.massari@unibo.it>
 #
 # SPDX-License-Identifier: ISC
+from __future__ import annotations
+
 from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, Iterable, Mapping
 
 
 class CounterHandler(ABC):  # pragma: no cover
@@ -52,6 +58,50 @@ class CounterHandler(ABC):  # pragma: no cover
         """
         raise NotImplementedError
 
+    def read_counters(self, entity_names: Iterable[str]) -> Dict[str, int]:
+        """
+        It allows to read the counter values of many entities at once.
+        Concrete implementations should override it to avoid a round-trip
+        per entity.
+
+        :param entity_names: The entity names
+        :type entity_names: Iterable[str]
+        :return: A dictionary mapping every entity name to its counter value.
+        """
+        return {str(name): self.read_counter(str(name)) for name in entity_names}
+
+    def increment_counters(self, entity_names: Iterable[str]) -> Dict[str, int]:
+        """
+        It allows to increment by one unit the counter values of many
+        entities at once. A name repeated n times is incremented n times.
+        Concrete implementations should override it to avoid a round-trip
+        per entity.
+
+        :param entity_names: The entity names
+        :type entity_names: Iterable[str]
+        :return: A dictionary mapping every entity name to its
+          newly-updated counter value.
+        """
+        new_values: Dict[str, int] = dict()
+        for name in entity_names:
+            new_values[str(name)] = self.increment_counter(str(name))
+        return new_values
+
+    def set_counters(self, new_values: Mapping[str, int]) -> None:
+        """
+        It allows to set the counter values of many entities at once.
+        Concrete implementations should override it to avoid a round-trip
+        per entity.
+
+        :param new_values: A dictionary mapping entity names to the new
+          counter values
+        :type new_values: Mapping[str, int]
+        :raises ValueError: if any new value is a negative integer.
+        :return: None
+        """
+        for name, new_value in new_values.items():
+            self.set_counter(new_value, str(name))
+
 
 class SupplierAwareCounterHandler(CounterHandler, ABC):
     supplier_prefix: str
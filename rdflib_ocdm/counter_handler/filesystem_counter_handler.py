@@ -6,37 +6,102 @@
 # SPDX-License-Identifier: ISC
 from __future__ import annotations
 
+import hashlib
 import json
 import os
+import threading
+from typing import TYPE_CHECKING
 
 from rdflib_ocdm.counter_handler.counter_handler import CounterHandler
 from rdflib_ocdm.support import is_string_empty
 
+if TYPE_CHECKING:
+    from typing import Dict, Iterable, List, Mapping, Set
+
 
 class FilesystemCounterHandler(CounterHandler):
     """A concrete implementation of the ``CounterHandler`` interface
     that persistently stores the counter values within the
-    filesystem."""
+    filesystem.
+
+    By default, every operation reads the index file and every update
+    rewrites it. In cached mode, the index is loaded once and served from
+    memory, and the updated counters are written back by ``flush``, when
+    leaving a ``with`` block or every ``flush_every`` updates. Cached mode
+    assumes that no other process writes to ``info_dir`` at the same time.
+
+    Every write replaces the index file atomically, so a crash never leaves
+    a truncated index behind. The written files are also synced to disk
+    on every flush in cached mode, and on every update with ``durable=True``.
+
+    With the sharded layout, the counters are spread by a hash of the
+    entity name over many small files in the ``provenance_index`` folder,
+    so that reading or updating a counter only touches its own shard. An
+    existing single-file index can be converted with ``migrate_to_sharded``."""
 
-    def __init__(self, info_dir: str) -> None:
+    shards_dirname = "provenance_index"
+    layout_filename = "layout.json"
+
+    def __init__(
+        self,
+        info_dir: str,
+        cached: bool = False,
+        flush_every: int | None = None,
+        sharded: bool = False,
+        n_shards: int = 1024,
+        durable: bool = False,
+    ) -> None:
         """
         Constructor of the ``FilesystemCounterHandler`` class.
 
         :param info_dir: The path to the folder that does/will
           contain the counter values.
         :type info_dir: str
+        :param cached: If True, the counters are kept in memory and
+          written to the filesystem only when flushed.
+        :type cached: bool
+        :param flush_every: In cached mode, the number of updates after
+          which the counters are flushed automatically. If None, they are
+          flushed only explicitly.
+        :type flush_every: int, optional
+        :param sharded: If True, the counters are stored in many small
+          files instead of a single one.
+        :type sharded: bool
+        :param n_shards: The number of shards of a new sharded index. An
+          existing sharded index keeps the number it was created with.
+        :type n_shards: int
+        :param durable: If True, every update is synced to disk before
+          returning, so that it survives a power loss. In cached mode,
+          the flushed files are always synced.
+        :type durable: bool
         :raises ValueError: if ``info_dir`` is None or an empty
-          string.
+          string, if ``flush_every`` or ``n_shards`` is not positive, or
+          if ``info_dir`` holds an index in the other layout.
         """
         if info_dir is None or is_string_empty(info_dir):
             raise ValueError("info_dir parameter is required!")
 
+        if flush_every is not None and flush_every <= 0:
+            raise ValueError("flush_every must be a positive integer!")
+
+        if n_shards <= 0:
+            raise ValueError("n_shards must be a positive integer!")
+
         if info_dir[-1] != os.sep:
             info_dir += os.sep
 
         self.info_dir: str = info_dir
         self.prov_files = dict()
         self.provenance_index_filename = "provenance_index.json"
+        self.cached = cached
+        self.flush_every = flush_every
+        self.sharded = sharded
+        self.n_shards = n_shards
+        self.durable = durable
+        self._shards: Dict[str, Dict[str, int]] = dict()
+        self._dirty_shards: Set[str] = set()
+        self._updates_since_flush: int = 0
+        self._check_layout()
 
     def set_counter(self, new_value: int, entity_name: str) -> None:
         """
@@ -49,16 +114,9 @@ class FilesystemCounterHandler(CounterHandler):
         :raises ValueError: if ``new_value`` is a negative integer.
         :return: None
         """
-        entity_name = str(entity_name)
         if new_value < 0:
             raise ValueError("new_value must be a non negative integer!")
-        file_path: str = self._get_prov_path()
-        self.__initialize_file_if_not_existing(file_path, entity_name)
-        with open(file_path, "r", encoding="utf8") as file:
-            data = json.load(file)
-        with open(file_path, "w", encoding="utf8") as outfile:
-            data[entity_name] = new_value
-            json.dump(obj=data, fp=outfile, ensure_ascii=False, indent=False)
+        self.set_counters({str(entity_name): new_value})
 
     def read_counter(self, entity_name: str) -> int:
         """
@@ -69,8 +127,7 @@ class FilesystemCounterHandler(CounterHandler):
         :return: The requested counter value.
         """
         entity_name = str(entity_name)
-        file_path: str = self._get_prov_path()
-        return self._read_number(file_path, entity_name)
+        return self.read_counters((entity_name,))[entity_name]
 
     def increment_counter(self, entity_name: str) -> int:
         """
@@ -81,38 +138,232 @@ class FilesystemCounterHandler(CounterHandler):
         :return: The newly-updated (already incremented) counter value.
         """
         entity_name = str(entity_name)
-        file_path: str = self._get_prov_path()
-        return self._add_number(file_path, entity_name)
+        return self.increment_counters((entity_name,))[entity_name]
+
+    def read_counters(self, entity_names: Iterable[str]) -> Dict[str, int]:
+        """
+        It allows to read the counter values of many entities, parsing
+        every index file involved at most once.
+
+        :param entity_names: The entity names
+        :type entity_names: Iterable[str]
+        :return: A dictionary mapping every entity name to its counter value.
+        """
+        counters: Dict[str, int] = dict()
+        for file_path, names in self._group_by_shard(entity_names).items():
+            data = self._read_shard(file_path)
+            for name in names:
+                counters[name] = data.get(name, 0)
+        self.prov_files.update(counters)
+        return counters
+
+    def increment_counters(self, entity_names: Iterable[str]) -> Dict[str, int]:
+        """
+        It allows to increment by one unit the counter values of many
+        entities, parsing and rewriting every index file involved at most
+        once. A name repeated n times is incremented n times.
+
+        :param entity_names: The entity names
+        :type entity_names: Iterable[str]
+        :return: A dictionary mapping every entity name to its
+          newly-updated counter value.
+        """
+        new_values: Dict[str, int] = dict()
+        for file_path, names in self._group_by_shard(entity_names).items():
+            data = self._read_shard(file_path)
+            for name in names:
+                new_values[name] = data[name] = data.get(name, 0) + 1
+            self._write_shard(file_path, data, len(names))
+        self.prov_files.update(new_values)
+        return new_values
+
+    def set_counters(self, new_values: Mapping[str, int]) -> None:
+        """
+        It allows to set the counter values of many entities, parsing
+        and rewriting every index file involved at most once.
+
+        :param new_values: A dictionary mapping entity names to the new
+          counter values
+        :type new_values: Mapping[str, int]
+        :raises ValueError: if any new value is a negative integer.
+        :return: None
+        """
+        if any(new_value < 0 for new_value in new_values.values()):
+            raise ValueError("new_value must be a non negative integer!")
+        values = {str(name): new_value for name, new_value in new_values.items()}
+        for file_path, names in self._group_by_shard(values).items():
+            data = self._read_shard(file_path)
+            for name in names:
+                data[name] = values[name]
+            self._write_shard(file_path, data, len(names))
+
+    def flush(self) -> None:
+        """
+        In cached mode, it writes the counters updated since the last
+        flush to the filesystem. Otherwise, it does nothing, since every
+        update is written immediately.
+
+        :return: None
+        """
+        if self._dirty_shards:
+            self._ensure_layout()
+        for file_path in sorted(self._dirty_shards):
+            self._dump_index(file_path, self._shards[file_path])
+        self._dirty_shards = set()
+        self._updates_since_flush = 0
+
+    @classmethod
+    def migrate_to_sharded(
+        cls, info_dir: str, n_shards: int = 1024, **kwargs
+    ) -> FilesystemCounterHandler:
+        """
+        It moves the counters of the single-file index of ``info_dir``
+        into a sharded index with ``n_shards`` shards, and then removes the
+        single file. The single file is removed only after every shard and
+        the layout file are written, so an interrupted migration can simply
+        be run again.
+
+        :param info_dir: The path to the folder that contains the counter values.
+        :type info_dir: str
+        :param n_shards: The number of shards of the new index
+        :type n_shards: int
+        :param kwargs: Further arguments for the returned handler
+        :raises ValueError: if ``info_dir`` has already been migrated.
+        :return: A sharded handler of ``info_dir``.
+        """
+        # Raises if only the sharded index is left, i.e. if it was migrated
+        single_file_handler = cls(info_dir, durable=True)
+        single_file_path = single_file_handler._get_prov_path()
+        data = single_file_handler._load_index(single_file_path)
+        shards: Dict[str, Dict[str, int]] = dict()
+        for name, count in data.items():
+            file_path = _get_shard_path(single_file_handler.info_dir, n_shards, name)
+            shards.setdefault(file_path, dict())[name] = count
+        for file_path, shard in shards.items():
+            single_file_handler._dump_index(file_path, shard)
+        single_file_handler._dump_index(
+            single_file_handler._get_layout_path(), {"n_shards": n_shards}
+        )
+        if os.path.isfile(single_file_path):
+            os.remove(single_file_path)
+        return cls(info_dir, sharded=True, n_shards=n_shards, **kwargs)
+
+    def __enter__(self) -> FilesystemCounterHandler:
+        """
+        Context manager entry point.
+
+        :return: self
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:  # noqa: ARG002
+        """
+        Context manager exit point that flushes the cached counters.
+
+        :param exc_type: Exception type
+        :param exc_val: Exception value
+        :param exc_tb: Exception traceback
+        :return: None
+        """
+        self.flush()
 
     def _get_prov_path(self) -> str:
         return os.path.join(self.info_dir, self.provenance_index_filename)
 
-    def __initialize_file_if_not_existing(self, file_path: str, entity_name: str):
-        entity_name = str(entity_name)
-        if not os.path.exists(os.path.dirname(file_path)):
-            os.makedirs(os.path.dirname(file_path))
-        if not os.path.isfile(file_path):
-            with open(file_path, "w", encoding="utf8") as outfile:
-                json.dump({entity_name: 0}, ensure_ascii=False, indent=None, fp=outfile)
+    def _get_layout_path(self) -> str:
+        return os.path.join(self.info_dir, self.shards_dirname, self.layout_filename)
 
-    def _read_number(self, file_path: str, entity_name: str) -> int:
-        self.__initialize_file_if_not_existing(file_path, entity_name)
-        with open(file_path, "r", encoding="utf8") as file:
-            data = json.load(file)
-            if entity_name in data:
-                self.prov_files[entity_name] = data[entity_name]
-            else:
-                self.prov_files[entity_name] = 0
-        return self.prov_files[entity_name]
-
-    def _add_number(self, file_path: str, entity_name: str) -> int:
-        self.__initialize_file_if_not_existing(file_path, entity_name)
-        cur_number = self._read_number(file_path, entity_name)
-        cur_number += 1
+    def _check_layout(self) -> None:
+        # Reading counters from the wrong layout would restart them from
+        # zero, and the snapshots numbered from there would clash
+        has_single_file = os.path.isfile(self._get_prov_path())
+        layout_path = self._get_layout_path()
+        self._has_layout = os.path.isfile(layout_path)
+        if self.sharded:
+            if self._has_layout:
+                self.n_shards = self._load_index(layout_path)["n_shards"]
+            elif has_single_file:
+                raise ValueError(
+                    f"{self.info_dir} holds a single-file index:"
+                    " call migrate_to_sharded to convert it."
+                )
+        elif not has_single_file and os.path.isfile(layout_path):
+            raise ValueError(
+                f"{self.info_dir} holds a sharded index: use sharded=True."
+            )
+
+    def _get_shard_path(self, entity_name: str) -> str:
+        if not self.sharded:
+            return self._get_prov_path()
+        return _get_shard_path(self.info_dir, self.n_shards, entity_name)
+
+    def _ensure_layout(self) -> None:
+        # The number of shards is recorded before the first shard is written
+        if self.sharded and not self._has_layout:
+            self._dump_index(self._get_layout_path(), {"n_shards": self.n_shards})
+            self._has_layout = True
+
+    def _group_by_shard(self, entity_names: Iterable[str]) -> Dict[str, List[str]]:
+        groups: Dict[str, List[str]] = dict()
+        for name in entity_names:
+            name = str(name)
+            groups.setdefault(self._get_shard_path(name), []).append(name)
+        return groups
+
+    def _read_shard(self, file_path: str) -> Dict[str, int]:
+        if not self.cached:
+            return self._load_index(file_path)
+        if file_path not in self._shards:
+            self._shards[file_path] = self._load_index(file_path)
+        return self._shards[file_path]
+
+    def _write_shard(
+        self, file_path: str, data: Dict[str, int], n_updates: int
+    ) -> None:
+        if not self.cached:
+            self._ensure_layout()
+            self._dump_index(file_path, data)
+            return
+        self._dirty_shards.add(file_path)
+        self._updates_since_flush += n_updates
+        if (
+            self.flush_every is not None
+            and self._updates_since_flush >= self.flush_every
+        ):
+            self.flush()
+
+    def _load_index(self, file_path: str) -> Dict[str, int]:
+        if not os.path.isfile(file_path):
+            return dict()
         with open(file_path, "r", encoding="utf8") as file:
-            data = json.load(file)
-        with open(file_path, "w", encoding="utf8") as outfile:
-            data[entity_name] = cur_number
-            json_object = json.dumps(data, ensure_ascii=False, indent=None)
-            outfile.write(json_object)
-        return cur_number
+            return json.load(file)
+
+    def _dump_index(self, file_path: str, data: Dict[str, int]) -> None:
+        directory = os.path.dirname(file_path)
+        if not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        # Written to a temporary file and renamed, so that a crash while
+        # writing never leaves a truncated index behind
+        temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf8") as outfile:
+                json.dump(obj=data, fp=outfile, ensure_ascii=False, indent=None)
+                if self.durable or self.cached:
+                    outfile.flush()
+                    os.fsync(outfile.fileno())
+            os.replace(temp_path, file_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+
+def _get_shard_path(info_dir: str, n_shards: int, entity_name: str) -> str:
+    digest = hashlib.blake2b(entity_name.encode("utf-8"), digest_size=8).digest()
+    shard = int.from_bytes(digest, "big") % n_shards
+    width = len(f"{n_shards - 1:x}")
+    return os.path.join(
+        info_dir,
+        FilesystemCounterHandler.shards_dirname,
+        f"{shard:0{width}x}.json",
+    )
@@ -10,7 +10,7 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
-    pass
+    from typing import Dict, Iterable, Mapping
 
 from rdflib_ocdm.counter_handler.counter_handler import CounterHandler
 
@@ -72,3 +72,47 @@ class InMemoryCounterHandler(CounterHandler):
         else:
             self.prov_counters[entity_name] = 1
         return self.prov_counters[entity_name]
+
+    def read_counters(self, entity_names: Iterable[str]) -> Dict[str, int]:
+        """
+        It allows to read the counter values of many entities at once.
+        Unlike ``read_counter``, it does not store the missing counters.
+
+        :param entity_names: The entity names
+        :type entity_names: Iterable[str]
+        :return: A dictionary mapping every entity name to its counter value.
+        """
+        prov_counters = self.prov_counters
+        return {str(name): prov_counters.get(str(name), 0) for name in entity_names}
+
+    def increment_counters(self, entity_names: Iterable[str]) -> Dict[str, int]:
+        """
+        It allows to increment by one unit the counter values of many
+        entities at once. A name repeated n times is incremented n times.
+
+        :param entity_names: The entity names
+        :type entity_names: Iterable[str]
+        :return: A dictionary mapping every entity name to its
+          newly-updated counter value.
+        """
+        prov_counters = self.prov_counters
+        new_values: Dict[str, int] = dict()
+        for name in entity_names:
+            name = str(name)
+            new_values[name] = prov_counters[name] = prov_counters.get(name, 0) + 1
+        return new_values
+
+    def set_counters(self, new_values: Mapping[str, int]) -> None:
+        """
+        It allows to set the counter values of many entities at once.
+
+        :param new_values: A dictionary mapping entity names to the new
+          counter values
+        :type new_values: Mapping[str, int]
+        :raises ValueError: if any new value is a negative integer.
+        :return: None
+        """
+        if any(new_value < 0 for new_value in new_values.values()):
+            raise ValueError("new_value must be a non negative integer!")
+        for name, new_value in new_values.items():
+            self.prov_counters[str(name)] = new_value
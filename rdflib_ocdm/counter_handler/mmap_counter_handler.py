@@ -0,0 +1,331 @@
+#!/usr/bin/python
+
+# SPDX-FileCopyrightText: 2026 Arcangelo Massari <arcangelo.massari@unibo.it>
+#
+# SPDX-License-Identifier: ISC
+
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from array import array
+from typing import TYPE_CHECKING
+
+from rdflib_ocdm.counter_handler.counter_handler import CounterHandler
+from rdflib_ocdm.support import is_string_empty
+
+if TYPE_CHECKING:
+    from typing import Dict, Iterable, Mapping, Tuple
+
+# Header: magic, version, clean flag, capacity, number of used slots
+_HEADER = struct.Struct("<8sIIQQ")
+_HEADER_SIZE = 64
+_MAGIC = b"OCDMCNTR"
+_VERSION = 1
+
+# Slot: a 16-byte digest of the entity name followed by its counter
+_KEY_SIZE = 16
+_VALUE = struct.Struct("<Q")
+_SLOT_SIZE = _KEY_SIZE + _VALUE.size
+_EMPTY_KEY = bytes(_KEY_SIZE)
+
+_MAX_LOAD_FACTOR = 0.7
+
+# Slots checked at a time when counting the used ones
+_SCAN_SLOTS = 1 << 16
+
+
+class MmapCounterHandler(CounterHandler):
+    """A concrete implementation of the ``CounterHandler`` interface
+    that persistently stores the counter values within a memory-mapped
+    hash table, meant for hundreds of millions of counters.
+
+    Every entity name is hashed to a 16-byte digest, and its counter is
+    kept in an open-addressing table inside the file, so reading and
+    incrementing a counter costs a few memory accesses, while opening
+    the file only maps it. When the table becomes too full, it is copied
+    into a file twice as large, which then atomically replaces the old one.
+
+    Updates are written straight to the shared mapping, so they survive a
+    crash of the process as soon as they are made, and ``flush`` or
+    ``close`` makes them durable on disk. A file that was not closed
+    cleanly is checked again the next time it is opened. The file must not
+    be opened by more than one handler at a time."""
+
+    def __init__(self, file_path: str, initial_capacity: int = 1 << 20) -> None:
+        """
+        Constructor of the ``MmapCounterHandler`` class.
+
+        :param file_path: The path to the file that does/will contain the
+          counter values.
+        :type file_path: str
+        :param initial_capacity: The number of slots of a new file, rounded
+          up to a power of two. An existing file keeps its own capacity.
+        :type initial_capacity: int
+        :raises ValueError: if ``file_path`` is None or an empty string, if
+          ``initial_capacity`` is not positive, or if the file exists but is
+          not a counter file.
+        """
+        if file_path is None or is_string_empty(file_path):
+            raise ValueError("file_path parameter is required!")
+
+        if initial_capacity <= 0:
+            raise ValueError("initial_capacity must be a positive integer!")
+
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
+            capacity = 1 << (initial_capacity - 1).bit_length()
+            _create_table(file_path, capacity)
+        self._open()
+
+    def set_counter(self, new_value: int, entity_name: str) -> None:
+        """
+        It allows to set the counter value of provenance entities.
+
+        :param new_value: The new counter value to be set
+        :type new_value: int
+        :param entity_name: The entity name
+        :type entity_name: str
+        :raises ValueError: if ``new_value`` is a negative integer.
+        :return: None
+        """
+        if new_value < 0:
+            raise ValueError("new_value must be a non negative integer!")
+        with self._lock:
+            self._store(_get_key(entity_name), new_value)
+
+    def read_counter(self, entity_name: str) -> int:
+        """
+        It allows to read the counter value of provenance entities.
+
+        :param entity_name: The entity name
+        :type entity_name: str
+        :return: The requested counter value.
+        """
+        key = _get_key(entity_name)
+        # The table may be remapped by a concurrent _grow
+        with self._lock:
+            return self._read(key)
+
+    def increment_counter(self, entity_name: str) -> int:
+        """
+        It allows to increment the counter value of provenance entities by one unit.
+
+        :param entity_name: The entity name
+        :type entity_name: str
+        :return: The newly-updated (already incremented) counter value.
+        """
+        key = _get_key(entity_name)
+        with self._lock:
+            offset, found = self._find(key)
+            if not found:
+                self._store(key, 1)
+                return 1
+            count = _VALUE.unpack_from(self._mm, offset + _KEY_SIZE)[0] + 1
+            _VALUE.pack_into(self._mm, offset + _KEY_SIZE, count)
+            return count
+
+    def read_counters(self, entity_names: Iterable[str]) -> Dict[str, int]:
+        """
+        It allows to read the counter values of many entities, acquiring
+        the lock only once.
+
+        :param entity_names: The entity names
+        :type entity_names: Iterable[str]
+        :return: A dictionary mapping every entity name to its counter value.
+        """
+        keys = {str(name): _get_key(name) for name in entity_names}
+        with self._lock:
+            return {name: self._read(key) for name, key in keys.items()}
+
+    def set_counters(self, new_values: Mapping[str, int]) -> None:
+        """
+        It allows to set the counter values of many entities, acquiring
+        the lock only once.
+
+        :param new_values: A dictionary mapping entity names to the new
+          counter values
+        :type new_values: Mapping[str, int]
+        :raises ValueError: if any new value is a negative integer.
+        :return: None
+        """
+        if any(new_value < 0 for new_value in new_values.values()):
+            raise ValueError("new_value must be a non negative integer!")
+        with self._lock:
+            for name, new_value in new_values.items():
+                self._store(_get_key(name), new_value)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def flush(self) -> None:
+        """
+        It makes every update durable on disk.
+
+        :return: None
+        """
+        with self._lock:
+            self._write_header(clean=False)
+            self._mm.flush()
+
+    def close(self) -> None:
+        """
+        It writes every update to disk, marks the file as cleanly closed
+        and unmaps it.
+
+        :return: None
+        """
+        with self._lock:
+            if self._mm.closed:
+                return
+            self._write_header(clean=True)
+            self._mm.flush()
+            self._mm.close()
+            self._file.close()
+
+    def __enter__(self) -> MmapCounterHandler:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:  # noqa: ARG002
+        self.close()
+
+    def __del__(self) -> None:
+        if hasattr(self, "_mm"):
+            self.close()
+
+    def _open(self) -> None:
+        self._file = open(self.file_path, "r+b")
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        if len(self._mm) < _HEADER_SIZE:
+            self._mm.close()
+            self._file.close()
+            raise ValueError(f"{self.file_path} is not a counter file")
+        magic, version, clean, capacity, count = _HEADER.unpack_from(self._mm, 0)
+        if (
+            magic != _MAGIC
+            or version != _VERSION
+            or len(self._mm) != _HEADER_SIZE + capacity * _SLOT_SIZE
+        ):
+            self._mm.close()
+            self._file.close()
+            raise ValueError(f"{self.file_path} is not a counter file")
+        self._capacity: int = capacity
+        self._mask: int = capacity - 1
+        if clean:
+            self._count: int = count
+        else:
+            # The process that last wrote the file may have died between
+            # filling a slot and updating the header
+            self._count = _count_used_slots(self._mm, capacity)
+        self._write_header(clean=False)
+
+    def _write_header(self, clean: bool) -> None:
+        _HEADER.pack_into(
+            self._mm, 0, _MAGIC, _VERSION, int(clean), self._capacity, self._count
+        )
+
+    def _read(self, key: bytes) -> int:
+        offset, found = self._find(key)
+        if not found:
+            return 0
+        return _VALUE.unpack_from(self._mm, offset + _KEY_SIZE)[0]
+
+    def _find(self, key: bytes) -> Tuple[int, bool]:
+        mm = self._mm
+        mask = self._mask
+        index = int.from_bytes(key[:8], "little") & mask
+        while True:
+            offset = _HEADER_SIZE + index * _SLOT_SIZE
+            slot_key = mm[offset : offset + _KEY_SIZE]
+            if slot_key == key:
+                return offset, True
+            if slot_key == _EMPTY_KEY:
+                return offset, False
+            index = (index + 1) & mask
+
+    def _store(self, key: bytes, value: int) -> None:
+        offset, found = self._find(key)
+        if not found:
+            if self._count + 1 > self._capacity * _MAX_LOAD_FACTOR:
+                self._grow()
+                offset, _ = self._find(key)
+            # The value goes first, so the slot becomes visible only when
+            # it is complete
+            _VALUE.pack_into(self._mm, offset + _KEY_SIZE, value)
+            self._mm[offset : offset + _KEY_SIZE] = key
+            self._count += 1
+            _HEADER.pack_into(
+                self._mm, 0, _MAGIC, _VERSION, 0, self._capacity, self._count
+            )
+        else:
+            _VALUE.pack_into(self._mm, offset + _KEY_SIZE, value)
+
+    def _grow(self) -> None:
+        tmp_path = f"{self.file_path}.{os.getpid()}.tmp"
+        capacity = self._capacity * 2
+        mask = capacity - 1
+        _create_table(tmp_path, capacity)
+        with open(tmp_path, "r+b") as tmp_file:
+            new_mm = mmap.mmap(tmp_file.fileno(), 0)
+            old_mm = self._mm
+            for old_offset in range(_HEADER_SIZE, len(old_mm), _SLOT_SIZE):
+                slot = old_mm[old_offset : old_offset + _SLOT_SIZE]
+                if slot[:_KEY_SIZE] == _EMPTY_KEY:
+                    continue
+                index = int.from_bytes(slot[:8], "little") & mask
+                while True:
+                    offset = _HEADER_SIZE + index * _SLOT_SIZE
+                    if new_mm[offset : offset + _KEY_SIZE] == _EMPTY_KEY:
+                        break
+                    index = (index + 1) & mask
+                new_mm[offset : offset + _SLOT_SIZE] = slot
+            _HEADER.pack_into(new_mm, 0, _MAGIC, _VERSION, 1, capacity, self._count)
+            new_mm.flush()
+            new_mm.close()
+            os.fsync(tmp_file.fileno())
+        self._write_header(clean=True)
+        self._mm.close()
+        self._file.close()
+        os.replace(tmp_path, self.file_path)
+        self._open()
+
+
+def _get_key(entity_name: str) -> bytes:
+    key = hashlib.blake2b(
+        str(entity_name).encode("utf-8"), digest_size=_KEY_SIZE
+    ).digest()
+    # The all-zero digest marks the empty slots
+    return key if key != _EMPTY_KEY else b"\x01" + key[1:]
+
+
+def _count_used_slots(mm: mmap.mmap, capacity: int) -> int:
+    # Each slot is three 8-byte words, the first two holding the key. For
+    # a block of slots, the key words are ORed together as big integers and
+    # the bytes of every word are folded into its lowest one, so the empty
+    # slots are the zero bytes at every eighth position: no Python code
+    # runs per slot.
+    used = 0
+    for start in range(0, capacity, _SCAN_SLOTS):
+        n_slots = min(_SCAN_SLOTS, capacity - start)
+        offset = _HEADER_SIZE + start * _SLOT_SIZE
+        words = array("Q", mm[offset : offset + n_slots * _SLOT_SIZE])
+        keys = int.from_bytes(words[0::3].tobytes(), "little") | int.from_bytes(
+            words[1::3].tobytes(), "little"
+        )
+        keys |= keys >> 32
+        keys |= keys >> 16
+        keys |= keys >> 8
+        lowest_bytes = keys.to_bytes(n_slots * 8, "little")[0::8]
+        used += n_slots - lowest_bytes.count(0)
+    return used
+
+
+def _create_table(file_path: str, capacity: int) -> None:
+    with open(file_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, 1, capacity, 0))
+        # Extending the file leaves a sparse region of empty slots
+        f.truncate(_HEADER_SIZE + capacity * _SLOT_SIZE)
@@ -6,49 +6,221 @@
 
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
 import redis
 
+from rdflib_ocdm.counter_handler.counter_handler import CounterHandler
+
+if TYPE_CHECKING:
+    from typing import Dict, Iterable, List, Mapping
+
+
+class RedisCounterHandler(CounterHandler):
+    """A concrete implementation of the ``CounterHandler`` interface that persistently
+    stores the counter values within a Redis database.
 
-class RedisCounterHandler:
-    def __init__(self, host: str, port: int, db: int, password: str | None = None):
+    Increments use the native ``INCR`` command, so several processes can safely
+    share the same counters. The bulk methods send a single ``MGET``/``MSET`` or
+    pipeline per call."""
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        db: int = 0,
+        password: str | None = None,
+        namespace: str = "",
+        connection_pool: redis.ConnectionPool | None = None,
+        max_connections: int | None = None,
+    ) -> None:
+        """
+        Constructor of the ``RedisCounterHandler`` class.
+
+        :param host: The host of the Redis server
+        :type host: str
+        :param port: The port of the Redis server
+        :type port: int
+        :param db: The number of the Redis database
+        :type db: int
+        :param password: The password of the Redis server
+        :type password: str, optional
+        :param namespace: A prefix prepended to every key, so that the counters can
+          share a database with other data
+        :type namespace: str
+        :param connection_pool: A connection pool shared with other clients. If given,
+          host, port, db, password and max_connections are ignored
+        :type connection_pool: redis.ConnectionPool, optional
+        :param max_connections: The maximum number of connections of the pool
+          created by the handler
+        :type max_connections: int, optional
+        """
         self.host = host
         self.port = port
         self.db = db
         self.password = password
+        self.namespace = namespace
+        self.connection_pool = connection_pool
+        self.max_connections = max_connections
         self.connection: redis.Redis | None = None  # type: ignore[type-arg]
 
     def connect(self) -> None:
-        self.connection = redis.Redis(
-            host=self.host, port=self.port, db=self.db, password=self.password
-        )
+        """
+        It opens the connection to Redis. The other methods call it on their own
+        if needed.
+
+        :return: None
+        """
+        if self.connection_pool is not None:
+            self.connection = redis.Redis(connection_pool=self.connection_pool)
+        else:
+            self.connection = redis.Redis(
+                host=self.host,
+                port=self.port,
+                db=self.db,
+                password=self.password,
+                max_connections=self.max_connections,
+            )
 
     def disconnect(self) -> None:
+        """
+        It closes the connection to Redis. A shared connection pool is not
+        disconnected.
+
+        :return: None
+        """
         if self.connection:
             self.connection.close()
+            self.connection = None
+
+    def _get_connection(self) -> redis.Redis:  # type: ignore[type-arg]
+        if self.connection is None:
+            self.connect()
+        assert self.connection is not None
+        return self.connection
+
+    def _key(self, entity_name: str) -> str:
+        return self.namespace + str(entity_name)
 
     def set_counter(self, new_value: int, entity_name: str) -> None:
-        entity_name = str(entity_name)
+        """
+        It allows to set the counter value of provenance entities.
+
+        :param new_value: The new counter value to be set
+        :type new_value: int
+        :param entity_name: The entity name
+        :type entity_name: str
+        :raises ValueError: if ``new_value`` is a negative integer.
+        :return: None
+        """
         if new_value < 0:
             raise ValueError("new_value must be a non negative integer!")
-        assert self.connection is not None
-        self.connection.set(entity_name, new_value)
+        self._get_connection().set(self._key(entity_name), new_value)
 
     def read_counter(self, entity_name: str) -> int:
-        entity_name = str(entity_name)
-        assert self.connection is not None
-        result: bytes | None = self.connection.get(entity_name)  # type: ignore[assignment]
+        """
+        It allows to read the counter value of provenance entities.
+
+        :param entity_name: The entity name
+        :type entity_name: str
+        :return: The requested counter value.
+        """
+        result: bytes | None = self._get_connection().get(self._key(entity_name))  # type: ignore[assignment]
         if result:
             return int(result.decode("utf-8"))
         else:
             return 0
 
     def increment_counter(self, entity_name: str) -> int:
-        entity_name = str(entity_name)
-        cur_count = self.read_counter(entity_name)
-        count = cur_count + 1
-        self.set_counter(count, entity_name)
-        return count
+        """
+        It allows to increment the counter value of provenance entities by one unit,
+        atomically with respect to every other client of the same database.
+
+        :param entity_name: The entity name
+        :type entity_name: str
+        :return: The newly-updated (already incremented) counter value.
+        """
+        return self._get_connection().incr(self._key(entity_name))  # type: ignore[return-value]
+
+    def read_counters(self, entity_names: Iterable[str]) -> Dict[str, int]:
+        """
+        It allows to read the counter values of many entities with a
+        single MGET command.
+
+        :param entity_names: The entity names
+        :type entity_names: Iterable[str]
+        :return: A dictionary mapping every entity name to its counter value.
+        """
+        names: List[str] = list(dict.fromkeys(str(name) for name in entity_names))
+        if not names:
+            return dict()
+        results: List[bytes | None] = self._get_connection().mget(  # type: ignore[assignment]
+            [self._key(name) for name in names]
+        )
+        return {
+            name: int(result.decode("utf-8")) if result else 0
+            for name, result in zip(names, results)
+        }
+
+    def increment_counters(self, entity_names: Iterable[str]) -> Dict[str, int]:
+        """
+        It allows to increment by one unit the counter values of many
+        entities, sending their INCR commands in a single pipeline. Every
+        increment is atomic with respect to the other clients of the same
+        database. A name repeated n times is incremented n times.
+
+        :param entity_names: The entity names
+        :type entity_names: Iterable[str]
+        :return: A dictionary mapping every entity name to its
+          newly-updated counter value.
+        """
+        names = [str(name) for name in entity_names]
+        if not names:
+            return dict()
+        # Every INCR is atomic on its own, so no MULTI/EXEC is needed
+        pipeline = self._get_connection().pipeline(transaction=False)
+        for name in names:
+            pipeline.incr(self._key(name))
+        return dict(zip(names, pipeline.execute()))
+
+    def set_counters(self, new_values: Mapping[str, int]) -> None:
+        """
+        It allows to set the counter values of many entities with a single
+        MSET command.
+
+        :param new_values: A dictionary mapping entity names to the new
+          counter values
+        :type new_values: Mapping[str, int]
+        :raises ValueError: if any new value is a negative integer.
+        :return: None
+        """
+        if any(new_value < 0 for new_value in new_values.values()):
+            raise ValueError("new_value must be a non negative integer!")
+        if not new_values:
+            return
+        self._get_connection().mset(
+            {self._key(name): new_value for name, new_value in new_values.items()}
+        )
 
     def flush(self) -> None:
-        assert self.connection is not None
-        self.connection.flushdb()
+        """
+        It deletes every counter. Without a namespace the whole database is
+        flushed, otherwise only the keys within the namespace are deleted.
+
+        :return: None
+        """
+        connection = self._get_connection()
+        if not self.namespace:
+            connection.flushdb()
+            return
+        pattern = "".join(
+            "\\" + char if char in "*?[]\\" else char for char in self.namespace
+        )
+        keys: List[bytes] = []
+        for key in connection.scan_iter(match=pattern + "*", count=1000):
+            keys.append(key)
+            if len(keys) == 1000:
+                connection.delete(*keys)
+                keys.clear()
+        if keys:
+            connection.delete(*keys)
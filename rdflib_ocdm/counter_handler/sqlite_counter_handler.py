@@ -4,31 +4,128 @@
 #
 # SPDX-License-Identifier: ISC
 
+from __future__ import annotations
+
 import sqlite3
 import urllib.parse
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
 
 from rdflib_ocdm.counter_handler.counter_handler import CounterHandler
 
+if TYPE_CHECKING:
+    from typing import Dict, Iterable, Iterator, List, Mapping
+
+# Stays below the default limit on the number of parameters of a statement
+# of older SQLite versions
+_MAX_PARAMETERS = 900
+
+# The statements are constant strings, so that sqlite3 prepares each of
+# them once and reuses it from its statement cache
+_SELECT_COUNTER = "SELECT count FROM info WHERE entity = ?"
+_UPSERT_COUNTER = (
+    "INSERT INTO info (entity, count) VALUES (?, ?)"
+    " ON CONFLICT (entity) DO UPDATE SET count = excluded.count"
+)
+_INCREMENT_COUNTER = (
+    "INSERT INTO info (entity, count) VALUES (?, 1)"
+    " ON CONFLICT (entity) DO UPDATE SET count = count + 1"
+    " RETURNING count"
+)
+
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    # In WAL mode the database stays consistent with NORMAL, but a power
+    # loss may roll back the latest commits
+    "synchronous": "NORMAL",
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,
+}
+
 
 class SqliteCounterHandler(CounterHandler):
     """A concrete implementation of the ``CounterHandler`` interface
     that persistently stores the counter values within a SQLite
-    database."""
+    database.
+
+    Every update is committed on its own, unless it happens between
+    ``begin`` and ``commit`` or within a ``batch`` block, in which case
+    all the updates are committed together."""
 
-    def __init__(self, database: str) -> None:
+    def __init__(
+        self, database: str, pragmas: Mapping[str, str | int] | None = None
+    ) -> None:
         """
         Constructor of the ``SqliteCounterHandler`` class.
 
         :param database: The name of the database
         :type info_dir: str
+        :param pragmas: The PRAGMA statements run on the connection, which
+          override and extend ``DEFAULT_PRAGMAS``
+        :type pragmas: Mapping[str, str | int], optional
         """
         sqlite3.threadsafety = 3
         self.con = sqlite3.connect(database, check_same_thread=False)
         self.cur = self.con.cursor()
+        self._batch_depth: int = 0
+        for name, value in {**DEFAULT_PRAGMAS, **(pragmas or {})}.items():
+            self.cur.execute(f"PRAGMA {name} = {value}")
         self.cur.execute("""CREATE TABLE IF NOT EXISTS info(
             entity TEXT PRIMARY KEY, 
             count INTEGER)""")
 
+    def begin(self) -> None:
+        """
+        It starts a batch: the following updates are committed together
+        by the matching ``commit``. Batches can be nested, in which case
+        only the outermost ``commit`` writes to the database.
+
+        :return: None
+        """
+        self._batch_depth += 1
+
+    def commit(self) -> None:
+        """
+        It ends the batch started by the matching ``begin``, committing
+        its updates if it is the outermost one.
+
+        :return: None
+        """
+        if self._batch_depth > 0:
+            self._batch_depth -= 1
+        if self._batch_depth == 0:
+            self.con.commit()
+
+    def rollback(self) -> None:
+        """
+        It discards every update of the current batch, and ends it
+        together with any enclosing one.
+
+        :return: None
+        """
+        self._batch_depth = 0
+        self.con.rollback()
+
+    @contextmanager
+    def batch(self) -> Iterator[SqliteCounterHandler]:
+        """
+        A context manager that commits all the updates of its block in a
+        single transaction, or rolls them back if the block raises.
+
+        :return: The handler itself
+        """
+        self.begin()
+        try:
+            yield self
+        except BaseException:
+            self.rollback()
+            raise
+        self.commit()
+
+    def _commit_unless_batching(self) -> None:
+        if self._batch_depth == 0:
+            self.con.commit()
+
     def set_counter(self, new_value: int, entity_name: str) -> None:
         """
         It allows to set the counter value of provenance
@@ -44,11 +141,8 @@ class SqliteCounterHandler(CounterHandler):
         entity_name = urllib.parse.quote(str(entity_name))
         if new_value < 0:
             raise ValueError("new_value must be a non negative integer!")
-        self.cur.execute(
-            "INSERT OR REPLACE INTO info (entity, count)"
-            f" VALUES ('{entity_name}', {new_value})"
-        )
-        self.con.commit()
+        self.cur.execute(_UPSERT_COUNTER, (entity_name, new_value))
+        self._commit_unless_batching()
 
     def read_counter(self, entity_name: str) -> int:
         """
@@ -59,10 +153,7 @@ class SqliteCounterHandler(CounterHandler):
         :return: The requested counter value.
         """
         entity_name = urllib.parse.quote(str(entity_name))
-        result = self.cur.execute(
-            f"SELECT count FROM info WHERE entity='{entity_name}'"
-        )
-        rows = result.fetchall()
+        rows = self.cur.execute(_SELECT_COUNTER, (entity_name,)).fetchall()
         if len(rows) == 1:
             return rows[0][0]
         elif len(rows) == 0:
@@ -81,11 +172,84 @@ class SqliteCounterHandler(CounterHandler):
         :type entity_name: str
         :return: The newly-updated (already incremented) counter value.
         """
-        cur_count = self.read_counter(entity_name)
-        count = cur_count + 1
-        self.set_counter(count, entity_name)
+        entity_name = urllib.parse.quote(str(entity_name))
+        # A single statement, so concurrent increments are never lost
+        count = self.cur.execute(_INCREMENT_COUNTER, (entity_name,)).fetchall()[0][0]
+        self._commit_unless_batching()
         return count
 
+    def read_counters(self, entity_names: Iterable[str]) -> Dict[str, int]:
+        """
+        It allows to read the counter values of many entities, with one
+        query every few hundred entities.
+
+        :param entity_names: The entity names
+        :type entity_names: Iterable[str]
+        :return: A dictionary mapping every entity name to its counter value.
+        """
+        names: List[str] = list(dict.fromkeys(str(name) for name in entity_names))
+        counters: Dict[str, int] = dict.fromkeys(names, 0)
+        quoted_names = {urllib.parse.quote(name): name for name in names}
+        quoted_list = list(quoted_names)
+        for start in range(0, len(quoted_list), _MAX_PARAMETERS):
+            chunk = quoted_list[start : start + _MAX_PARAMETERS]
+            placeholders = ", ".join("?" * len(chunk))
+            found = set()
+            for entity, count in self.cur.execute(
+                f"SELECT entity, count FROM info WHERE entity IN ({placeholders})",
+                chunk,
+            ):
+                if entity in found:
+                    raise Exception(
+                        "There is more than one counter for this entity."
+                        " The database is broken"
+                    )
+                found.add(entity)
+                counters[quoted_names[entity]] = count
+        return counters
+
+    def increment_counters(self, entity_names: Iterable[str]) -> Dict[str, int]:
+        """
+        It allows to increment by one unit the counter values of many
+        entities within a single transaction. A name repeated n times
+        is incremented n times.
+
+        :param entity_names: The entity names
+        :type entity_names: Iterable[str]
+        :return: A dictionary mapping every entity name to its
+          newly-updated counter value.
+        """
+        new_values: Dict[str, int] = dict()
+        for name in entity_names:
+            name = str(name)
+            new_values[name] = self.cur.execute(
+                _INCREMENT_COUNTER, (urllib.parse.quote(name),)
+            ).fetchall()[0][0]
+        self._commit_unless_batching()
+        return new_values
+
+    def set_counters(self, new_values: Mapping[str, int]) -> None:
+        """
+        It allows to set the counter values of many entities within a
+        single transaction.
+
+        :param new_values: A dictionary mapping entity names to the new
+          counter values
+        :type new_values: Mapping[str, int]
+        :raises ValueError: if any new value is a negative integer.
+        :return: None
+        """
+        if any(new_value < 0 for new_value in new_values.values()):
+            raise ValueError("new_value must be a non negative integer!")
+        self.cur.executemany(
+            _UPSERT_COUNTER,
+            (
+                (urllib.parse.quote(str(name)), new_value)
+                for name, new_value in new_values.items()
+            ),
+        )
+        self._commit_unless_batching()
+
     def close(self) -> None:
         """
         Closes the database connection.
@@ -9,9 +9,16 @@ from __future__ import annotations
 from typing import TYPE_CHECKING, Optional
 
 if TYPE_CHECKING:
+    from typing import List, Tuple
+
     from rdflib import Dataset
+    from rdflib.term import Node
 
-from rdflib import URIRef
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.graph import DATASET_DEFAULT_GRAPH_ID
+from rdflib.parser import create_input_source
+from rdflib.plugins.parsers.nquads import NQuadsParser
+from rdflib.store import Store
 
 
 def _extract_graph_iri_from_context(context) -> Optional[URIRef]:
@@ -51,3 +58,114 @@ def _extract_graph_iri(dataset: Dataset, subject: URIRef) -> Optional[URIRef]:
         if graph_iri is not None:
             return graph_iri
     return None
+
+
+class _SharedBNodeIds(dict):
+    """
+    A blank node context mapping every label to an id derived from it, so
+    that the workers parsing different parts of the same document agree
+    on the blank node of each label.
+    """
+
+    def __init__(self, prefix: str) -> None:
+        super().__init__()
+        self.prefix = prefix
+
+    def get(self, key, default=None):  # noqa: ARG002
+        return self.prefix + key
+
+
+class _QuadCollector(Store):
+    """
+    A store that keeps nothing but the list of the statements added to it,
+    encoded by ``_encode_term`` so that they are cheap to send back from a
+    worker process.
+    """
+
+    context_aware = True
+    graph_aware = True
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.quads: List[tuple] = []
+
+    def add(self, triple, context, quoted: bool = False) -> None:  # type: ignore[override] # noqa: ARG002
+        s, p, o = triple
+        c = context.identifier if context is not None else None
+        self.quads.append(
+            (
+                _encode_term(s),
+                str(p),
+                _encode_term(o),
+                None if c == DATASET_DEFAULT_GRAPH_ID else _encode_term(c),
+            )
+        )
+
+    def add_graph(self, graph) -> None:
+        pass
+
+    def remove_graph(self, graph) -> None:
+        pass
+
+
+def _encode_term(term) -> str | tuple | None:
+    """
+    Encodes a term as a string for an IRI, a 1-tuple for a blank node and
+    a ``(lexical form, datatype, language)`` tuple for a literal.
+    """
+    if term is None:
+        return None
+    if isinstance(term, Literal):
+        datatype = term.datatype
+        return (
+            str(term),
+            str(datatype) if datatype is not None else None,
+            term.language,
+        )
+    if isinstance(term, BNode):
+        return (str(term),)
+    return str(term)
+
+
+def _decode_term(value: str | tuple) -> Node:
+    if type(value) is str:
+        return URIRef(value)
+    if len(value) == 1:
+        return BNode(value[0])
+    return Literal(value[0], lang=value[2], datatype=value[1])
+
+
+def _parse_nquads_range(task: Tuple[str, int, int, str]) -> List[tuple]:
+    """
+    Parses the N-Quads lines starting within a byte range of a file.
+
+    A line belongs to the range its first byte falls in, so that adjacent
+    ranges split the file at newline boundaries without sharing a line.
+
+    :param task: The path to the file, the first byte and the end of the
+      range, and the prefix of the blank node ids
+    :type task: Tuple[str, int, int, str]
+    :return: The statements of the range, encoded by ``_encode_term``,
+      with None as the default graph.
+    """
+    path, start, end, bnode_prefix = task
+    lines: List[bytes] = []
+    with open(path, "rb") as f:
+        if start > 0:
+            # Skip the rest of the line that began in the previous range
+            f.seek(start - 1)
+            f.readline()
+        position = f.tell()
+        while position < end:
+            line = f.readline()
+            if not line:
+                break
+            lines.append(line)
+            position += len(line)
+    collector = _QuadCollector()
+    NQuadsParser().parse(
+        create_input_source(data=b"".join(lines), format="nquads"),
+        Graph(store=collector, identifier=DATASET_DEFAULT_GRAPH_ID),
+        bnode_context=_SharedBNodeIds(bnode_prefix),
+    )
+    return collector.quads
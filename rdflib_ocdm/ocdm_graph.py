@@ -14,33 +14,67 @@ from rdflib.exceptions import ParserError
 from rdflib.parser import InputSource, Parser, create_input_source
 
 if TYPE_CHECKING:
-    from typing import IO, BinaryIO, Optional, TextIO, Tuple, Union
+    from typing import (
+        IO,
+        BinaryIO,
+        Dict,
+        Iterable,
+        Iterator,
+        List,
+        Mapping,
+        Optional,
+        TextIO,
+        Tuple,
+        Union,
+    )
 
     from rdflib.term import Node as _Node
 
     _TripleType = Tuple[_Node, _Node, _Node]
+    _TriplePatternType = Tuple[Optional[_Node], Optional[_Node], Optional[_Node]]
 
+import os
 import pathlib
 import warnings
+from concurrent.futures import ProcessPoolExecutor
 from copy import deepcopy
 from datetime import datetime, timedelta, timezone
 
-from rdflib import Dataset, Graph, URIRef
+from rdflib import BNode, Dataset, Graph, URIRef
+from rdflib.store import Store
 from rdflib.term import Node
 
 from rdflib_ocdm.counter_handler.counter_handler import CounterHandler
-from rdflib_ocdm.graph_utils import _extract_graph_iri, _extract_graph_iri_from_context
+from rdflib_ocdm.graph_utils import (
+    _decode_term,
+    _extract_graph_iri,
+    _extract_graph_iri_from_context,
+    _parse_nquads_range,
+)
 from rdflib_ocdm.prov.provenance import OCDMProvenance
 from rdflib_ocdm.prov.snapshot_entity import SnapshotEntity
+from rdflib_ocdm.support import get_entity_subgraph
 
 
 class OCDMGraphCommons:
     preexisting_graph: Graph | Dataset
 
-    def __init__(self, counter_handler: CounterHandler):
+    def __init__(self, counter_handler: CounterHandler, track_changes: bool = False):
         self.__merge_index: dict = dict()
         self.__entity_index: dict = dict()
         self.all_entities: set = set()
+        # When track_changes is True, the baseline state is not copied: the
+        # triples added and removed after it are logged per subject instead
+        self.track_changes: bool = track_changes
+        self.__added_triples: dict = dict()
+        self.__removed_triples: dict = dict()
+        self.__baseline_is_empty: bool = True
+        # Subjects whose triples or flags changed since the baseline: only
+        # these need to be diffed, uploaded and described in the provenance
+        self.__dirty_subjects: set = set()
+        # Update queries already computed for the dirty subjects, so that
+        # provenance generation and upload diff each entity only once
+        self.__update_query_cache: dict = dict()
         self.provenance = OCDMProvenance(self, counter_handler)
 
     def preexisting_finished(
@@ -50,7 +84,7 @@ class OCDMGraphCommons:
         c_time: float | str | None = None,
     ) -> None:
         assert isinstance(self, (Graph, Dataset))
-        self.preexisting_graph = deepcopy(self)
+        self._set_baseline()
 
         unique_subjects: set = set()
         if isinstance(self, Dataset):
@@ -59,85 +93,181 @@ class OCDMGraphCommons:
         else:
             unique_subjects = set(self.subjects(unique=True))
 
-        for subject in unique_subjects:
-            existing_graph_iri = self.entity_index.get(subject, {}).get("graph_iri")
-            self.entity_index[subject] = {
-                "to_be_deleted": False,
-                "is_restored": False,
-                "resp_agent": resp_agent,
-                "source": primary_source,
-                "graph_iri": existing_graph_iri,
-            }
+        with self.provenance._batched_counters(
+            str(subject) for subject in unique_subjects
+        ):
+            # Every subject without a counter gets a creation snapshot
+            self.provenance._reserve_counters(
+                str(subject)
+                for subject in unique_subjects
+                if self.provenance._read_counter(str(subject)) == 0
+            )
+            for subject in unique_subjects:
+                existing_graph_iri = self.entity_index.get(subject, {}).get("graph_iri")
+                self.entity_index[subject] = {
+                    "to_be_deleted": False,
+                    "is_restored": False,
+                    "resp_agent": resp_agent,
+                    "source": primary_source,
+                    "graph_iri": existing_graph_iri,
+                }
 
-            if isinstance(self, Dataset) and existing_graph_iri is None:
-                self.entity_index[subject]["graph_iri"] = _extract_graph_iri(
-                    self, subject
-                )
+                if isinstance(self, Dataset) and existing_graph_iri is None:
+                    self.entity_index[subject]["graph_iri"] = _extract_graph_iri(
+                        self, subject
+                    )
 
-            self.all_entities.add(subject)
-            count = self.provenance.counter_handler.read_counter(str(subject))
-            if count == 0:
-                if c_time is None:
-                    cur_time = (
-                        datetime.now(tz=timezone.utc).replace(microsecond=0)
-                        - timedelta(seconds=5)
-                    ).isoformat(sep="T")
-                else:
-                    cur_time = (
-                        datetime.fromtimestamp(float(c_time), tz=timezone.utc).replace(
-                            microsecond=0
-                        )
-                        - timedelta(seconds=5)
-                    ).isoformat(sep="T")
-                new_snapshot: SnapshotEntity = self.provenance._create_snapshot(
-                    URIRef(str(subject)), cur_time
-                )
-                new_snapshot.has_description(
-                    f"The entity '{str(subject)}' has been created."
-                )
+                self.all_entities.add(subject)
+                count = self.provenance._read_counter(str(subject))
+                if count == 0:
+                    if c_time is None:
+                        cur_time = (
+                            datetime.now(tz=timezone.utc).replace(microsecond=0)
+                            - timedelta(seconds=5)
+                        ).isoformat(sep="T")
+                    else:
+                        cur_time = (
+                            datetime.fromtimestamp(
+                                float(c_time), tz=timezone.utc
+                            ).replace(microsecond=0)
+                            - timedelta(seconds=5)
+                        ).isoformat(sep="T")
+                    new_snapshot: SnapshotEntity = self.provenance._create_snapshot(
+                        URIRef(str(subject)), cur_time
+                    )
+                    new_snapshot.has_description(
+                        f"The entity '{str(subject)}' has been created."
+                    )
 
     def merge(self, res: URIRef, other: URIRef) -> None:
+        self.merge_many({res: (other,)})
+
+    def merge_many(self, merges: Mapping[URIRef, Iterable[URIRef]]) -> None:
+        """
+        Merges many entities at once, with the same result as calling
+        ``merge`` for each of them, but a single lookup of the statements
+        of every merged entity and a single update of the indexes.
+
+        Chains are resolved: if B is merged into A and C into B, the
+        references to both B and C are redirected to A, and A is recorded
+        in ``merge_index`` as merged with both.
+
+        :param merges: A mapping from every surviving entity to the
+          entities merged into it
+        :type merges: Mapping[URIRef, Iterable[URIRef]]
+        :raises ValueError: if an entity is merged into two different
+          entities, or if the merges form a cycle
+        :return: None
+        """
         assert isinstance(self, (Graph, Dataset))
-        other_graph_iri = None
-        if isinstance(self, Dataset):
-            other_graph_iri = _extract_graph_iri(self, other)
-
-            quads_list = list(self.quads((None, None, other, None)))
-            for s, p, o, c in quads_list:
-                self.remove((s, p, o, c))  # type: ignore[arg-type]
-                self.add((s, p, res, c))  # type: ignore[arg-type]
-            quads_list_del = list(self.quads((other, None, None, None)))
-            for s, p, o, c in quads_list_del:
-                self.remove((s, p, o, c))  # type: ignore[arg-type]
-        elif isinstance(self, Graph):
-            triples_list = list(self.triples((None, None, other)))
-            for triple in triples_list:
-                self.remove(triple)
-                new_triple = (triple[0], triple[1], res)
-                self.add(new_triple)
-            triples_list_del = list(self.triples((other, None, None)))
-            for triple in triples_list_del:
-                self.remove(triple)
-
-        self._OCDMGraphCommons__merge_index.setdefault(res, set()).add(other)
-        if other not in self.entity_index:
-            self.entity_index[other] = {
-                "to_be_deleted": False,
-                "is_restored": False,
-                "resp_agent": None,
-                "source": None,
-                "graph_iri": other_graph_iri,
-            }
-        else:
-            if (
+        targets: Dict[URIRef, URIRef] = dict()
+        for res, others in merges.items():
+            for other in others:
+                if other == res:
+                    continue
+                if targets.get(other, res) != res:
+                    raise ValueError(
+                        f"The entity {other} cannot be merged into both"
+                        f" {targets[other]} and {res}"
+                    )
+                targets[other] = res
+        survivors: Dict[URIRef, URIRef] = dict()
+        for other, res in targets.items():
+            chain = [other]
+            while res in targets and res not in survivors:
+                if res in chain:
+                    raise ValueError(f"The merges of {other} form a cycle")
+                chain.append(res)
+                res = targets[res]
+            res = survivors.get(res, res)
+            for entity in chain:
+                survivors[entity] = res
+
+        # Every statement is collected before changing the store: the
+        # statements about a merged entity are removed, and the references
+        # to it from the other entities are redirected to its survivor
+        is_dataset = isinstance(self, Dataset)
+        removed: Dict[tuple, None] = dict()
+        added: Dict[tuple, None] = dict()
+        graph_iris: Dict[URIRef, URIRef] = dict()
+        for other, res in survivors.items():
+            if is_dataset:
+                for quad in self.quads((other, None, None, None)):
+                    removed[quad] = None
+                    if other not in graph_iris:
+                        graph_iri = _extract_graph_iri_from_context(quad[3])
+                        if graph_iri is not None:
+                            graph_iris[other] = graph_iri
+                for s, p, o, c in self.quads((None, None, other, None)):
+                    removed[(s, p, o, c)] = None
+                    if s not in survivors:
+                        added[(s, p, res, c)] = None
+            else:
+                for triple in self.triples((other, None, None)):
+                    removed[triple] = None
+                for s, p, o in self.triples((None, None, other)):
+                    removed[(s, p, o)] = None
+                    if s not in survivors:
+                        added[(s, p, res)] = None
+
+        is_recording = self._is_recording_changes()
+        for statement in removed:
+            if is_recording:
+                self._record_removal(statement[0], statement)
+            if is_dataset:
+                self.store.remove(statement[:3], context=self.get_context(statement[3]))
+            else:
+                self.store.remove(statement, context=self)
+        for statement in added:
+            s = statement[0]
+            if is_dataset:
+                context = self.get_context(statement[3])
+                is_new = (*statement[:3], context) not in self
+            else:
+                context = self
+                is_new = statement not in self
+            if is_recording and is_new:
+                self._record_addition(s, statement)
+            self.store.add(statement[:3], context=context, quoted=False)
+            self._touch(s)
+            self.all_entities.add(s)
+            if s not in self.entity_index:
+                self.entity_index[s] = {
+                    "to_be_deleted": False,
+                    "is_restored": False,
+                    "resp_agent": None,
+                    "source": None,
+                }
+                if is_dataset:
+                    self.entity_index[s]["graph_iri"] = None
+            if is_dataset and self.entity_index[s]["graph_iri"] is None:
+                self.entity_index[s]["graph_iri"] = _extract_graph_iri_from_context(
+                    statement[3]
+                )
+
+        for other, res in survivors.items():
+            other_graph_iri = graph_iris.get(other)
+            self._OCDMGraphCommons__merge_index.setdefault(res, set()).add(other)
+            self._touch(res)
+            self._touch(other)
+            if other not in self.entity_index:
+                self.entity_index[other] = {
+                    "to_be_deleted": False,
+                    "is_restored": False,
+                    "resp_agent": None,
+                    "source": None,
+                    "graph_iri": other_graph_iri,
+                }
+            elif (
                 other_graph_iri is not None
                 and self.entity_index[other].get("graph_iri") is None
             ):
                 self.entity_index[other]["graph_iri"] = other_graph_iri
-        self.entity_index[other]["to_be_deleted"] = True
+            self.entity_index[other]["to_be_deleted"] = True
 
     def mark_as_deleted(self, res: URIRef) -> None:
         self.entity_index[res]["to_be_deleted"] = True
+        self._touch(res)
 
     def mark_as_restored(self, res: URIRef) -> None:
         """
@@ -153,6 +283,7 @@ class OCDMGraphCommons:
         if res in self.entity_index:
             self.entity_index[res]["is_restored"] = True
             self.entity_index[res]["to_be_deleted"] = False
+            self._touch(res)
 
     @property
     def merge_index(self) -> dict:
@@ -162,8 +293,22 @@ class OCDMGraphCommons:
     def entity_index(self) -> dict:
         return self.__entity_index
 
-    def generate_provenance(self, c_time: float | None = None) -> None:
-        return self.provenance.generate_provenance(c_time)
+    @property
+    def dirty_subjects(self) -> set:
+        return self.__dirty_subjects
+
+    @property
+    def update_query_cache(self) -> dict:
+        return self.__update_query_cache
+
+    def _touch(self, subject: Node) -> None:
+        self.__dirty_subjects.add(subject)
+        self.__update_query_cache.pop(subject, None)
+
+    def generate_provenance(
+        self, c_time: float | None = None, max_workers: int = 1
+    ) -> None:
+        return self.provenance.generate_provenance(c_time, max_workers)
 
     def get_entity(self, res: str) -> SnapshotEntity | None:
         entity = self.provenance.get_entity(res)
@@ -175,22 +320,246 @@ class OCDMGraphCommons:
         self._OCDMGraphCommons__merge_index = dict()
         self._OCDMGraphCommons__entity_index = dict()
         assert isinstance(self, (Graph, Dataset))
-        self.preexisting_graph = deepcopy(self)
+        self._set_baseline()
+
+    def _set_baseline(self) -> None:
+        assert isinstance(self, (Graph, Dataset))
+        self.__dirty_subjects.clear()
+        self.__update_query_cache.clear()
+        if self.track_changes:
+            self.__added_triples.clear()
+            self.__removed_triples.clear()
+            self.__baseline_is_empty = False
+        else:
+            self.preexisting_graph = deepcopy(self)
+
+    def _is_recording_changes(self) -> bool:
+        return self.track_changes and not self.__baseline_is_empty
+
+    def _record_addition(self, subject: Node, statement: tuple) -> None:
+        removed = self.__removed_triples.get(subject)
+        if removed is not None and statement in removed:
+            del removed[statement]
+        else:
+            self.__added_triples.setdefault(subject, dict())[statement] = None
+
+    def _record_removal(self, subject: Node, statement: tuple) -> None:
+        added = self.__added_triples.get(subject)
+        if added is not None and statement in added:
+            del added[statement]
+        else:
+            self.__removed_triples.setdefault(subject, dict())[statement] = None
+
+    def get_entity_changes(self, entity: URIRef) -> Tuple[list, list] | None:
+        """
+        Returns the statements removed from and added to the given entity
+        since the baseline, as recorded by the change log.
+
+        :param entity: The subject of the entity
+        :type entity: URIRef
+        :return: A ``(removed, added)`` pair of triples (quads for datasets),
+          or None if changes are not being tracked against a non-empty baseline
+        """
+        if not self._is_recording_changes():
+            return None
+        return (
+            list(self.__removed_triples.get(entity, ())),
+            list(self.__added_triples.get(entity, ())),
+        )
+
+    def get_preexisting_subgraph(self, entity: URIRef) -> Graph | Dataset:
+        """
+        Returns the triples of the given entity as they were in the baseline
+        state set by ``preexisting_finished`` or ``commit_changes``.
+
+        In change-tracking mode the baseline is rebuilt from the live store,
+        dropping the triples added and restoring the ones removed since then.
+
+        :param entity: The subject of the entity
+        :type entity: URIRef
+        :return: The baseline subgraph of the entity
+        """
+        if not self.track_changes:
+            return get_entity_subgraph(self.preexisting_graph, entity)
+        assert isinstance(self, (Graph, Dataset))
+        added = self.__added_triples.get(entity, {})
+        removed = self.__removed_triples.get(entity, {})
+        if isinstance(self, Dataset):
+            subgraph: Graph | Dataset = Dataset()
+            if not self.__baseline_is_empty:
+                for quad in self.quads((entity, None, None, None)):
+                    if quad not in added:
+                        subgraph.add(quad)  # type: ignore[arg-type]
+                for quad in removed:
+                    subgraph.add(quad)
+        else:
+            subgraph = Graph()
+            if not self.__baseline_is_empty:
+                for triple in self.triples((entity, None, None)):
+                    if triple not in added:
+                        subgraph.add(triple)
+                for triple in removed:
+                    subgraph.add(triple)
+        return subgraph
 
     def get_provenance_graphs(self) -> Dataset:
+        self.provenance.materialize()
         prov_g = Dataset()
         for _, prov_entity in self.provenance.res_to_entity.items():
-            for triple in prov_entity.g.triples((None, None, None)):
-                prov_iri = URIRef(prov_entity.prov_subject + "/prov/")
-                prov_g.add((triple[0], triple[1], triple[2], prov_iri))  # type: ignore[arg-type]
+            prov_iri = URIRef(prov_entity.prov_subject + "/prov/")
+            for _, p, o, _ in self.provenance.quads(
+                (prov_entity.res, None, None, None)
+            ):
+                prov_g.add((prov_entity.res, p, o, prov_iri))  # type: ignore[arg-type]
         return prov_g
 
+    def parse_stream(
+        self,
+        source: IO[bytes] | TextIO | str | pathlib.PurePath,
+        format: str | None = None,
+        chunk_triples: int = 100_000,
+        publicID: str | None = None,  # noqa: N803
+        resp_agent: URIRef | None = None,
+        primary_source: URIRef | None = None,
+    ) -> Iterator[int]:
+        """
+        Parses an N-Triples or N-Quads source a chunk at a time, so that
+        sources larger than the available memory can be processed.
+
+        After each chunk is parsed, the generator yields the number of its
+        statements: the caller can then generate the provenance and store
+        the chunk. When the generator is resumed, every statement and all
+        the bookkeeping of the graph, its provenance included, are dropped
+        before parsing the next chunk. Only the counters survive, in the
+        counter handler.
+
+        A chunk is closed at the first change of subject after
+        ``chunk_triples`` statements, so the statements of an entity that
+        are grouped together in the source end up in the same chunk. Blank
+        node labels are scoped to a single chunk.
+
+        :param source: The path to the source, or a file object opened on it
+        :type source: IO[bytes] | TextIO | str | pathlib.PurePath
+        :param format: ``nt`` or ``nquads``, guessed from the file name if
+          not given
+        :type format: str, optional
+        :param chunk_triples: The minimum number of statements of a chunk
+        :type chunk_triples: int
+        :param publicID: The name of the graph the statements of a
+          dataset are parsed into, when they do not name their own graph
+        :type publicID: str, optional
+        :param resp_agent: The responsible agent of the parsed entities
+        :type resp_agent: URIRef, optional
+        :param primary_source: The primary source of the parsed entities
+        :type primary_source: URIRef, optional
+        :raises ValueError: if ``chunk_triples`` is not positive, or if the
+          format is not a line-based one.
+        :return: An iterator over the number of statements of each chunk.
+        """
+        if chunk_triples <= 0:
+            raise ValueError("chunk_triples must be a positive integer!")
+        if format is None:
+            name = (
+                source
+                if isinstance(source, (str, pathlib.PurePath))
+                else getattr(source, "name", None)
+            )
+            if isinstance(name, (str, pathlib.PurePath)):
+                format = rdflib.util.guess_format(str(name))
+        if format not in _LINE_BASED_FORMATS:
+            raise ValueError(
+                f"parse_stream supports N-Triples and N-Quads only, not {format}"
+            )
+        if isinstance(source, (str, pathlib.PurePath)):
+            with open(source, "rb") as f:
+                yield from self._parse_stream(
+                    f, format, chunk_triples, publicID, resp_agent, primary_source
+                )
+        else:
+            yield from self._parse_stream(
+                source, format, chunk_triples, publicID, resp_agent, primary_source
+            )
+
+    def _parse_stream(
+        self,
+        file: IO[bytes] | TextIO,
+        format: str,
+        chunk_triples: int,
+        publicID: str | None,  # noqa: N803
+        resp_agent: URIRef | None,
+        primary_source: URIRef | None,
+    ) -> Iterator[int]:
+        assert isinstance(self, (Graph, Dataset))
+        lines: list = []
+        last_subject = None
+        for line in file:
+            stripped = line.strip()
+            if not stripped or stripped[:1] in ("#", b"#"):
+                continue
+            # Neither IRIs nor blank node labels can contain whitespace
+            subject = stripped.split(None, 1)[0]
+            if len(lines) >= chunk_triples and subject != last_subject:
+                yield self._parse_chunk(
+                    lines, format, publicID, resp_agent, primary_source
+                )
+                self._release()
+                lines = []
+            lines.append(line)
+            last_subject = subject
+        if lines:
+            yield self._parse_chunk(lines, format, publicID, resp_agent, primary_source)
+            self._release()
+
+    def _parse_chunk(
+        self,
+        lines: list,
+        format: str,
+        publicID: str | None,  # noqa: N803
+        resp_agent: URIRef | None,
+        primary_source: URIRef | None,
+    ) -> int:
+        assert isinstance(self, (Graph, Dataset))
+        data = lines[0][:0].join(lines)
+        self.parse(
+            data=data,
+            format=format,
+            publicID=publicID,
+            resp_agent=resp_agent,
+            primary_source=primary_source,
+        )
+        return len(lines)
+
+    def _release(self) -> None:
+        # Initializing the graph again replaces its store, which releases
+        # the memory that removing the statements one by one would not
+        assert isinstance(self, (Graph, Dataset))
+        namespaces = list(self.namespaces())
+        provenance = self.provenance
+        counter_handler = provenance.counter_handler
+        if isinstance(self, Dataset):
+            Dataset.__init__(self)
+            self.preexisting_graph = Dataset()
+        else:
+            Graph.__init__(self, identifier=self.identifier)
+            self.preexisting_graph = Graph()
+        OCDMGraphCommons.__init__(self, counter_handler, self.track_changes)
+        # The provenance is emptied in place, so that whoever holds it
+        # keeps seeing the current one
+        OCDMProvenance.__init__(provenance, self, counter_handler)
+        self.provenance = provenance
+        for prefix, namespace in namespaces:
+            self.bind(prefix, namespace, override=True, replace=True)
+
 
 class OCDMGraph(OCDMGraphCommons, Graph):
-    def __init__(self, counter_handler: CounterHandler | None = None):
+    def __init__(
+        self,
+        counter_handler: CounterHandler | None = None,
+        track_changes: bool = False,
+    ):
         Graph.__init__(self)
         self.preexisting_graph: Graph | Dataset = Graph()
-        OCDMGraphCommons.__init__(self, counter_handler)  # type: ignore[arg-type]
+        OCDMGraphCommons.__init__(self, counter_handler, track_changes)  # type: ignore[arg-type]
 
     def add(
         self,
@@ -202,7 +571,10 @@ class OCDMGraph(OCDMGraphCommons, Graph):
         assert isinstance(s, Node), "Subject %s must be an rdflib term" % (s,)
         assert isinstance(p, Node), "Predicate %s must be an rdflib term" % (p,)
         assert isinstance(o, Node), "Object %s must be an rdflib term" % (o,)
+        if self._is_recording_changes() and (s, p, o) not in self:
+            self._record_addition(s, (s, p, o))
         self.store.add((s, p, o), self, quoted=False)
+        self._touch(s)
 
         # Add the subject to all_entities if it's not already present
         if s not in self.all_entities:
@@ -218,6 +590,73 @@ class OCDMGraph(OCDMGraphCommons, Graph):
 
         return self
 
+    def addN(  # type: ignore[override] # noqa: N802
+        self,
+        quads: Iterable[tuple],
+        resp_agent: object = None,
+        primary_source: object = None,
+    ):
+        """
+        Adds many triples at once, with the same result as calling ``add``
+        for each of them. As in rdflib, only the quads whose context is
+        this graph are added.
+
+        Every triple is checked before the store is changed, then they are
+        added through the bulk method of the store, and each subject is
+        registered once.
+
+        :param quads: The ``(s, p, o, context)`` quads to add
+        :type quads: Iterable[tuple]
+        :param resp_agent: The responsible agent of the new entities
+        :type resp_agent: object, optional
+        :param primary_source: The primary source of the new entities
+        :type primary_source: object, optional
+        :return: The graph itself.
+        """
+        identifier = self.identifier
+        quads = [
+            (s, p, o, self)
+            for s, p, o, c in quads
+            if isinstance(c, Graph) and c.identifier is identifier
+        ]
+        _assertnodes(quads)
+        if self._is_recording_changes():
+            recorded: set = set()
+            for s, p, o, _ in quads:
+                triple = (s, p, o)
+                if triple not in recorded and triple not in self:
+                    recorded.add(triple)
+                    self._record_addition(s, triple)
+        self.store.addN(quads)
+
+        for s in dict.fromkeys(quad[0] for quad in quads):
+            self._touch(s)
+
+            if s not in self.all_entities:
+                self.all_entities.add(s)
+
+            if s not in self.entity_index:
+                self.entity_index[s] = {
+                    "to_be_deleted": False,
+                    "is_restored": False,
+                    "resp_agent": resp_agent,
+                    "source": primary_source,
+                }
+
+        return self
+
+    def remove(self, triple: _TriplePatternType):  # type: ignore[override]
+        is_recording = self._is_recording_changes()
+        if is_recording or triple[0] is None:
+            for s, p, o in list(self.triples(triple)):
+                self._touch(s)
+                if is_recording:
+                    self._record_removal(s, (s, p, o))
+        else:
+            self._touch(triple[0])
+        self.store.remove(triple, context=self)
+        return self
+
     def parse(
         self,
         source: Optional[
@@ -255,8 +694,19 @@ class OCDMGraph(OCDMGraphCommons, Graph):
                 format = "turtle"
                 could_not_guess_format = True
         parser = plugin.get(format, Parser)()
+        # The parser writes through a sink, so that only the subjects it
+        # produces are registered afterwards
+        sink = _ParseSink(self.store, record_new=self._is_recording_changes())
         try:
-            parser.parse(source, self, **args)
+            parser.parse(
+                source,
+                Graph(
+                    store=sink,
+                    identifier=self.identifier,
+                    namespace_manager=self.namespace_manager,
+                ),
+                **args,
+            )
         except SyntaxError as se:
             if could_not_guess_format:
                 raise ParserError(
@@ -271,7 +721,12 @@ class OCDMGraph(OCDMGraphCommons, Graph):
             if source.auto_close:
                 source.close()
 
-        for subject in self.subjects(unique=True):
+        for triple, _ in sink.new_statements:
+            self._record_addition(triple[0], triple)
+
+        for subject in sink.subjects:
+            self._touch(subject)
+
             if subject not in self.all_entities:
                 self.all_entities.add(subject)
 
@@ -287,13 +742,20 @@ class OCDMGraph(OCDMGraphCommons, Graph):
 
 
 class OCDMDataset(OCDMGraphCommons, Dataset):
-    def __init__(self, counter_handler: CounterHandler | None = None):
+    def __init__(
+        self,
+        counter_handler: CounterHandler | None = None,
+        track_changes: bool = False,
+    ):
         Dataset.__init__(self)
         self.preexisting_graph: Graph | Dataset = Dataset()
-        OCDMGraphCommons.__init__(self, counter_handler)  # type: ignore[arg-type]
+        OCDMGraphCommons.__init__(self, counter_handler, track_changes)  # type: ignore[arg-type]
 
     def __deepcopy__(self, memo):
-        new_graph = OCDMDataset(counter_handler=self.provenance.counter_handler)
+        new_graph = OCDMDataset(
+            counter_handler=self.provenance.counter_handler,
+            track_changes=self.track_changes,
+        )
 
         # Copy graph data
         for quad in self.quads((None, None, None, None)):
@@ -319,11 +781,15 @@ class OCDMDataset(OCDMGraphCommons, Dataset):
 
         _assertnode(s, p, o)
 
+        if self._is_recording_changes() and (s, p, o, c) not in self:
+            self._record_addition(s, (s, p, o, c.identifier))  # type: ignore[union-attr]
+
         self.store.add(
             (s, p, o),
             context=c,  # type: ignore[arg-type]
             quoted=False,
         )
+        self._touch(s)
 
         # Add the subject to all_entities if it's not already present
         if s not in self.all_entities:
@@ -345,6 +811,83 @@ class OCDMDataset(OCDMGraphCommons, Dataset):
 
         return self
 
+    def addN(  # type: ignore[override] # noqa: N802
+        self,
+        quads: Iterable[tuple],
+        resp_agent: object = None,
+        primary_source: object = None,
+    ) -> Dataset:
+        """
+        Adds many quads at once, with the same result as calling ``add``
+        for each of them. Quads without a context go to the default graph.
+
+        Every quad is checked before the store is changed, then they are
+        added through the bulk method of the store, and each subject is
+        registered once, with the first named graph it is added to.
+
+        :param quads: The ``(s, p, o, context)`` quads to add, where the
+          context is a graph, its identifier or None
+        :type quads: Iterable[tuple]
+        :param resp_agent: The responsible agent of the new entities
+        :type resp_agent: object, optional
+        :param primary_source: The primary source of the new entities
+        :type primary_source: object, optional
+        :return: The dataset itself.
+        """
+        contexts: Dict[object, Graph] = dict()
+        resolved: list = []
+        for s, p, o, c in quads:
+            key = c.identifier if isinstance(c, Graph) else c
+            context = contexts.get(key)
+            if context is None:
+                context = contexts[key] = (
+                    self.default_graph if c is None else self._graph(c)
+                )
+            resolved.append((s, p, o, context))
+        _assertnodes(resolved)
+        if self._is_recording_changes():
+            recorded: set = set()
+            for s, p, o, context in resolved:
+                quad = (s, p, o, context.identifier)
+                if (
+                    quad not in recorded
+                    and next(self.store.triples((s, p, o), context), None) is None
+                ):
+                    recorded.add(quad)
+                    self._record_addition(s, quad)
+        self.store.addN(resolved)
+
+        # Every subject added, with the first named graph it was added to
+        subjects: Dict[Node, URIRef | None] = dict()
+        for s, _, _, context in resolved:
+            if subjects.get(s) is None:
+                subjects[s] = _extract_graph_iri_from_context(context)
+        for subject, graph_iri in subjects.items():
+            self._register_subject(subject, graph_iri, resp_agent, primary_source)
+
+        return self
+
+    def remove(  # type: ignore[override]
+        self,
+        triple_or_quad: tuple[Node | None, Node | None, Node | None]
+        | tuple[Node | None, Node | None, Node | None, Graph | Node | None],
+    ) -> Dataset:
+        s, p, o, c = self._spoc(triple_or_quad)  # type: ignore[arg-type]
+        is_recording = self._is_recording_changes()
+        if is_recording or s is None:
+            for quad in list(self.quads((s, p, o, c))):
+                # quads() yields a matching triple once for every graph
+                # holding it, even when a graph is given
+                if c is not None and quad[3] != c.identifier:
+                    continue
+                self._touch(quad[0])
+                if is_recording:
+                    self._record_removal(quad[0], quad)
+        else:
+            self._touch(s)
+        self.store.remove((s, p, o), context=c)  # type: ignore[arg-type]
+        return self
+
     def parse(  # type: ignore[override]
         self,
         source: IO[bytes]
@@ -377,37 +920,162 @@ class OCDMDataset(OCDMGraphCommons, Dataset):
             g_id = URIRef(g_id)
 
         context = Graph(store=self.store, identifier=g_id)
-        context.remove((None, None, None))  # type: ignore[arg-type]
-        context.parse(source, publicID=publicID, format=format, **args)  # type: ignore[arg-type]
+        replaced_subjects = set(context.subjects(unique=True))
+        self.remove((None, None, None, g_id))
+        # The parser writes through a sink, so that only the subjects it
+        # produces are registered afterwards, with the graph they come from
+        sink = _ParseSink(self.store, record_new=self._is_recording_changes())
+        Graph(
+            store=sink, identifier=g_id, namespace_manager=self.namespace_manager
+        ).parse(source, publicID=publicID, format=format, **args)  # type: ignore[arg-type]
         # TODO: FIXME: This should not return context, but self.
 
-        unique_subjects = set()
-        for s, _, _, _ in self.quads((None, None, None, None)):
-            unique_subjects.add(s)
-
-        for subject in unique_subjects:
-            if subject not in self.all_entities:
-                self.all_entities.add(subject)
+        for (s, p, o), c in sink.new_statements:
+            self._record_addition(s, (s, p, o, c))
+
+        for subject, graph_iri in sink.subjects.items():
+            self._register_subject(subject, graph_iri, resp_agent, primary_source)
+
+        # The subjects of the replaced graph that are still described
+        # elsewhere in the dataset
+        for subject in replaced_subjects.difference(sink.subjects):
+            if next(self.quads((subject, None, None, None)), None) is not None:
+                self._register_subject(
+                    subject,
+                    _extract_graph_iri(self, subject),  # type: ignore[arg-type]
+                    resp_agent,
+                    primary_source,
+                )
 
-            if subject not in self.entity_index:
-                self.entity_index[subject] = {
-                    "to_be_deleted": False,
-                    "is_restored": False,
-                    "resp_agent": resp_agent,
-                    "source": primary_source,
-                    "graph_iri": None,
-                }
+        return context
 
-            # Store graph_iri for this subject by finding its context
-            if (
-                "graph_iri" not in self.entity_index[subject]
-                or self.entity_index[subject]["graph_iri"] is None
-            ):
-                self.entity_index[subject]["graph_iri"] = _extract_graph_iri(
-                    self, subject
+    def parse_parallel(
+        self,
+        source: str | pathlib.PurePath,
+        max_workers: int | None = None,
+        chunk_bytes: int = 1 << 26,
+        publicID: str | None = None,  # noqa: N803
+        resp_agent: URIRef | None = None,
+        primary_source: URIRef | None = None,
+    ) -> OCDMDataset:
+        """
+        Parses an N-Quads file in a pool of processes and adds its
+        statements to the dataset, registering their subjects in
+        ``entity_index`` like ``parse`` does.
+
+        The file is split into ranges of ``chunk_bytes`` bytes at newline
+        boundaries. Each worker parses a range and sends its statements
+        back as tuples of strings, which are added to the store in the
+        order of the file. Unlike ``parse``, the graph named by
+        ``publicID`` is not emptied first.
+
+        :param source: The path to the N-Quads file
+        :type source: str | pathlib.PurePath
+        :param max_workers: The number of processes, as many as the CPUs
+          if not given. With 1, the file is parsed in this process.
+        :type max_workers: int, optional
+        :param chunk_bytes: The size of the ranges parsed by each task
+        :type chunk_bytes: int
+        :param publicID: The graph of the statements without one, the
+          default graph if not given
+        :type publicID: str, optional
+        :param resp_agent: The responsible agent of the parsed entities
+        :type resp_agent: URIRef, optional
+        :param primary_source: The primary source of the parsed entities
+        :type primary_source: URIRef, optional
+        :raises ValueError: if ``chunk_bytes`` is not positive.
+        :return: The dataset itself.
+        """
+        if chunk_bytes <= 0:
+            raise ValueError("chunk_bytes must be a positive integer!")
+        path = str(source)
+        size = os.path.getsize(path)
+        # Blank node labels are scoped to the file, across all the ranges
+        bnode_prefix = str(BNode())
+        tasks = [
+            (path, start, min(start + chunk_bytes, size), bnode_prefix)
+            for start in range(0, size, chunk_bytes)
+        ]
+        default_context = (
+            self.get_context(URIRef(publicID))
+            if publicID is not None
+            else self.default_graph
+        )
+        if max_workers == 1 or len(tasks) < 2:
+            self._add_parsed_quads(
+                map(_parse_nquads_range, tasks),
+                default_context,
+                resp_agent,
+                primary_source,
+            )
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                self._add_parsed_quads(
+                    executor.map(_parse_nquads_range, tasks),
+                    default_context,
+                    resp_agent,
+                    primary_source,
                 )
+        return self
 
-        return context
+    def _add_parsed_quads(
+        self,
+        chunks: Iterable[List[tuple]],
+        default_context: Graph,
+        resp_agent: URIRef | None,
+        primary_source: URIRef | None,
+    ) -> None:
+        store = self.store
+        is_recording = self._is_recording_changes()
+        contexts: Dict[object, Graph] = {None: default_context}
+        predicates: Dict[str, URIRef] = dict()
+        # Every subject added, with the first named graph it was added to
+        subjects: Dict[Node, URIRef | None] = dict()
+        for quads in chunks:
+            for s, p, o, c in quads:
+                context = contexts.get(c)
+                if context is None:
+                    context = contexts[c] = self.get_context(_decode_term(c))  # type: ignore[arg-type]
+                predicate = predicates.get(p)
+                if predicate is None:
+                    predicate = predicates[p] = URIRef(p)
+                triple = (_decode_term(s), predicate, _decode_term(o))
+                if is_recording and next(store.triples(triple, context), None) is None:
+                    self._record_addition(triple[0], (*triple, context.identifier))
+                store.add(triple, context, quoted=False)
+                if subjects.get(triple[0]) is None:
+                    subjects[triple[0]] = _extract_graph_iri_from_context(context)
+        for subject, graph_iri in subjects.items():
+            self._register_subject(subject, graph_iri, resp_agent, primary_source)
+
+    def _register_subject(
+        self,
+        subject: Node,
+        graph_iri: URIRef | None,
+        resp_agent: object,
+        primary_source: object,
+    ) -> None:
+        self._touch(subject)
+
+        if subject not in self.all_entities:
+            self.all_entities.add(subject)
+
+        if subject not in self.entity_index:
+            self.entity_index[subject] = {
+                "to_be_deleted": False,
+                "is_restored": False,
+                "resp_agent": resp_agent,
+                "source": primary_source,
+                "graph_iri": None,
+            }
+
+        if self.entity_index[subject].get("graph_iri") is None:
+            self.entity_index[subject]["graph_iri"] = graph_iri
+
+
+_LINE_BASED_FORMATS = frozenset(
+    ("nt", "nt11", "ntriples", "application/n-triples", "nquads", "application/n-quads")
+)
 
 
 def _assertnode(*terms):
@@ -416,6 +1084,99 @@ def _assertnode(*terms):
     return True
 
 
+def _assertnodes(statements: List[tuple]) -> None:
+    # Each type of term is checked once, instead of each term
+    term_types = {type(term) for statement in statements for term in statement[:3]}
+    if not all(issubclass(term_type, Node) for term_type in term_types):
+        for statement in statements:
+            _assertnode(*statement[:3])
+
+
+class _ParseSink(Store):
+    """
+    A store that forwards everything to another store, keeping track of
+    the subjects of the statements added through it.
+
+    Parsers of quad formats wrap the store of the graph they are given in
+    a ``Dataset`` of their own, so the statements they produce can only be
+    observed at the store level.
+    """
+
+    def __init__(self, store: Store, record_new: bool = False) -> None:
+        """
+        :param store: The wrapped store
+        :type store: Store
+        :param record_new: Whether to keep the statements that were not in
+          the wrapped store yet, in ``new_statements``
+        :type record_new: bool
+        """
+        super().__init__()
+        self.store = store
+        self.record_new = record_new
+        self.context_aware = store.context_aware
+        self.formula_aware = store.formula_aware
+        self.graph_aware = store.graph_aware
+        self.transaction_aware = store.transaction_aware
+        # Every subject added, with the first named graph it was added to
+        self.subjects: Dict[Node, URIRef | None] = dict()
+        self.new_statements: List[Tuple[_TripleType, Node]] = []
+        self._contexts: Dict[Node, Graph] = dict()
+
+    def _rebind(self, context):
+        # The wrapped store keeps the context objects it is given, which
+        # must not refer to the sink once the parsing is over
+        if context is None or context.store is not self:
+            return context
+        rebound = self._contexts.get(context.identifier)
+        if rebound is None:
+            rebound = Graph(store=self.store, identifier=context.identifier)
+            self._contexts[context.identifier] = rebound
+        return rebound
+
+    def add(self, triple, context, quoted: bool = False) -> None:  # type: ignore[override]
+        context = self._rebind(context)
+        if (
+            self.record_new
+            and not quoted
+            and next(self.store.triples(triple, context), None) is None
+        ):
+            self.new_statements.append((triple, context.identifier))
+        self.store.add(triple, context, quoted=quoted)
+        subject = triple[0]
+        if self.subjects.get(subject) is None:
+            self.subjects[subject] = _extract_graph_iri_from_context(context)
+
+    def remove(self, triple, context=None) -> None:  # type: ignore[override]
+        self.store.remove(triple, context=self._rebind(context))
+
+    def triples(self, triple_pattern, context=None):  # type: ignore[override]
+        return self.store.triples(triple_pattern, context=self._rebind(context))
+
+    def __len__(self, context=None) -> int:  # type: ignore[override]
+        return self.store.__len__(context=self._rebind(context))
+
+    def contexts(self, triple=None):  # type: ignore[override]
+        return self.store.contexts(triple)
+
+    def add_graph(self, graph: Graph) -> None:
+        self.store.add_graph(self._rebind(graph))
+
+    def remove_graph(self, graph: Graph) -> None:
+        self.store.remove_graph(self._rebind(graph))
+
+    def bind(self, prefix: str, namespace: URIRef, override: bool = True) -> None:
+        self.store.bind(prefix, namespace, override=override)
+
+    def prefix(self, namespace: URIRef) -> str | None:
+        return self.store.prefix(namespace)
+
+    def namespace(self, prefix: str) -> URIRef | None:
+        return self.store.namespace(prefix)
+
+    def namespaces(self):  # type: ignore[override]
+        return self.store.namespaces()
+
+
 # Backward compatibility alias
 class OCDMConjunctiveGraph(OCDMDataset):
     """
@@ -426,10 +1187,14 @@ class OCDMConjunctiveGraph(OCDMDataset):
     the migration from the deprecated ConjunctiveGraph to Dataset.
     """
 
-    def __init__(self, counter_handler: CounterHandler | None = None):
+    def __init__(
+        self,
+        counter_handler: CounterHandler | None = None,
+        track_changes: bool = False,
+    ):
         warnings.warn(
             "OCDMConjunctiveGraph is deprecated, use OCDMDataset instead",
             DeprecationWarning,
             stacklevel=2,
         )
-        super().__init__(counter_handler)
+        super().__init__(counter_handler, track_changes)
@@ -16,7 +16,9 @@ if TYPE_CHECKING:
 from rdflib_ocdm.abstract_entity import AbstractEntity
 
 if TYPE_CHECKING:
-    from typing import ClassVar, Dict
+    from typing import ClassVar, Dict, Iterator, Tuple
+
+    from rdflib.term import Node
 
 
 class ProvEntity(AbstractEntity):
@@ -42,12 +44,37 @@ class ProvEntity(AbstractEntity):
 
     short_name_to_type_iri: ClassVar[Dict[str, URIRef]] = {"se": iri_entity}
 
+    __slots__ = ("prov_subject", "_materialized")
+
     def __init__(self, prov_subject: str, g: OCDMProvenance, count: str) -> None:
-        super(ProvEntity, self).__init__()
+        # The statements of a provenance entity are kept in its fields, and
+        # written to g only when g is read, so no graph of its own is needed
         self.prov_subject = prov_subject
         self.res = URIRef(prov_subject + "/prov/se/" + count)
         self.g: OCDMProvenance = g  # type: ignore[assignment]
-        self._create_type(ProvEntity.iri_entity, prov_subject + "/prov/")
+        self._materialized = False
         if str(self.res) not in g.res_to_entity:
             g.res_to_entity[str(self.res)] = self  # type: ignore[assignment]
             g.all_entities.add(self.res)
+            g._pending.append(self)
+        else:
+            # A duplicate of a registered entity is never read back through
+            # get_entity, so it writes straight to g
+            self._materialize()
+
+    def _get_triples(self) -> Iterator[Tuple[URIRef, URIRef, Node]]:
+        """
+        Yields the statements of the entity held in its fields, except its
+        type, which is stored in the provenance graph of its subject.
+        """
+        return iter(())
+
+    def _materialize(self) -> None:
+        """
+        Writes the statements of the entity to the provenance dataset. From
+        then on, every change to the entity is written there as well.
+        """
+        self._materialized = True
+        self._create_type(ProvEntity.iri_entity, self.prov_subject + "/prov/")
+        for triple in self._get_triples():
+            self.g.add(triple)
@@ -9,11 +9,14 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from typing import Dict, List, Optional
+    from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
     from rdflib_ocdm.ocdm_graph import OCDMGraphCommons
 
+import multiprocessing
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timezone
 
 from rdflib import Dataset, URIRef
@@ -25,6 +28,20 @@ from rdflib_ocdm.prov.snapshot_entity import SnapshotEntity
 from rdflib_ocdm.query_utils import get_update_query
 from rdflib_ocdm.support import get_prov_count
 
+# The graph whose update queries are computed by a worker process of
+# _prefill_update_queries, set once when the worker starts
+_worker_graph: OCDMGraphCommons | None = None
+
+
+def _init_worker(graph: OCDMGraphCommons) -> None:
+    global _worker_graph
+    _worker_graph = graph
+
+
+def _get_update_queries(entities: List[URIRef]) -> List[Tuple[str, int, int]]:
+    assert _worker_graph is not None
+    return [get_update_query(_worker_graph, entity) for entity in entities]
+
 
 class OCDMProvenance(Dataset):
     def __init__(
@@ -32,6 +49,9 @@ class OCDMProvenance(Dataset):
         prov_subj_graph: OCDMGraphCommons,
         counter_handler: CounterHandler | None = None,
     ):
+        # The provenance entities whose statements are still held only in
+        # their fields, see materialize
+        self._pending: List[ProvEntity] = []
         Dataset.__init__(self)
         self.prov_g = prov_subj_graph
         # The following variable maps a URIRef with the related provenance entity
@@ -40,8 +60,129 @@ class OCDMProvenance(Dataset):
         if counter_handler is None:
             counter_handler = InMemoryCounterHandler()
         self.counter_handler = counter_handler
+        # Counters prefetched by _batched_counters, and the values obtained
+        # in advance by _reserve_counters for the next increment
+        self._counters: Dict[str, int] | None = None
+        self._reserved_counters: Dict[str, int] = dict()
+
+    def materialize(self) -> None:
+        """
+        Writes to the dataset the statements of the provenance entities
+        created since the last call. It is called by every method that
+        reads the dataset, so it is only needed before accessing its
+        store or its graphs directly.
+
+        :return: None
+        """
+        if not self._pending:
+            return
+        pending = self._pending
+        self._pending = []
+        for entity in pending:
+            entity._materialize()
+
+    def quads(self, quad=None):  # type: ignore[override]
+        self.materialize()
+        return Dataset.quads(self, quad)
+
+    def triples(self, triple_or_quad, context=None):  # type: ignore[override]
+        self.materialize()
+        return Dataset.triples(self, triple_or_quad, context)
+
+    def contexts(self, triple=None):  # type: ignore[override]
+        self.materialize()
+        return Dataset.contexts(self, triple)
+
+    def __len__(self) -> int:
+        self.materialize()
+        return Dataset.__len__(self)
+
+    def __contains__(self, triple_or_quad) -> bool:  # type: ignore[override]
+        self.materialize()
+        return Dataset.__contains__(self, triple_or_quad)
+
+    def serialize(self, *args, **kwargs):  # type: ignore[override]
+        self.materialize()
+        return Dataset.serialize(self, *args, **kwargs)
+
+    def query(self, *args, **kwargs):  # type: ignore[override]
+        self.materialize()
+        return Dataset.query(self, *args, **kwargs)
 
-    def generate_provenance(self, c_time: float | None = None) -> None:
+    def update(self, *args, **kwargs):  # type: ignore[override]
+        self.materialize()
+        return Dataset.update(self, *args, **kwargs)
+
+    @contextmanager
+    def _batched_counters(self, entity_names: Iterable[str]) -> Iterator[None]:
+        """
+        Reads the counters of the given entities with a single bulk request
+        and serves the reads from memory until the block ends. Increments
+        and updates are still sent to the counter handler, so that they
+        stay atomic with respect to other processes sharing it.
+        """
+        if self._counters is not None:
+            yield
+            return
+        self._counters = self.counter_handler.read_counters(entity_names)
+        try:
+            yield
+        finally:
+            self._counters = None
+            self._reserved_counters = dict()
+
+    def _reserve_counters(self, entity_names: Iterable[str]) -> None:
+        """
+        Increments the counters of the given entities with a single bulk
+        request. The next increment of each of them, which the caller must
+        be sure will happen, returns the reserved value instead of sending
+        a new request. Only usable within a ``_batched_counters`` block.
+        """
+        assert self._counters is not None
+        names = list(entity_names)
+        if names:
+            self._reserved_counters.update(
+                self.counter_handler.increment_counters(names)
+            )
+
+    def _read_counter(self, entity_name: str) -> int:
+        if self._counters is None:
+            return self.counter_handler.read_counter(entity_name)
+        if entity_name not in self._counters:
+            self._counters[entity_name] = self.counter_handler.read_counter(entity_name)
+        return self._counters[entity_name]
+
+    def _set_counter(self, new_value: int, entity_name: str) -> None:
+        self.counter_handler.set_counter(new_value, entity_name)
+        if self._counters is not None:
+            self._counters[entity_name] = new_value
+
+    def _increment_counter(self, entity_name: str) -> int:
+        new_value = self._reserved_counters.pop(entity_name, None)
+        if new_value is None:
+            new_value = self.counter_handler.increment_counter(entity_name)
+        if self._counters is not None:
+            self._counters[entity_name] = new_value
+        return new_value
+
+    def generate_provenance(
+        self, c_time: float | None = None, max_workers: int = 1
+    ) -> None:
+        """
+        Creates the snapshots describing the changes of every entity since
+        the baseline state.
+
+        :param c_time: The generation time as a POSIX timestamp, or None
+          for the current time
+        :type c_time: float, optional
+        :param max_workers: If greater than 1, the update queries of the
+          modified entities are computed upfront by a pool of as many
+          processes. The snapshots are then created in the same order as
+          in the sequential mode, so the result is identical. The pool is
+          only used where processes can be forked, as on Linux.
+        :type max_workers: int
+        :return: None
+        """
         if c_time is None:
             cur_time: str = (
                 datetime.now(tz=timezone.utc).replace(microsecond=0).isoformat(sep="T")
@@ -53,95 +194,176 @@ class OCDMProvenance(Dataset):
                 .isoformat(sep="T")
             )
         merge_index = self.prov_g.merge_index
+        dirty_subjects = self.prov_g.dirty_subjects
         prov_g_subjects = OrderedDict(
             sorted(
-                self.prov_g.entity_index.items(),
+                (
+                    (subject, metadata)
+                    for subject, metadata in self.prov_g.entity_index.items()
+                    if subject in dirty_subjects
+                ),
                 key=lambda x: not x[1]["to_be_deleted"],
                 reverse=True,
             )
         )
-        for cur_subj, cur_subj_metadata in prov_g_subjects.items():
-            last_snapshot_res: Optional[URIRef] = self._retrieve_last_snapshot(cur_subj)
-            if cur_subj_metadata["to_be_deleted"]:
-                update_query: str = get_update_query(self.prov_g, cur_subj)[0]
-                # DELETION SNAPSHOT
-                last_snapshot: SnapshotEntity = self.add_se(
-                    prov_subject=cur_subj, res=last_snapshot_res
-                )
-                last_snapshot.has_invalidation_time(cur_time)
-
-                cur_snapshot: SnapshotEntity = self._create_snapshot(cur_subj, cur_time)
-                cur_snapshot.derives_from(last_snapshot)
-                cur_snapshot.has_invalidation_time(cur_time)
-                cur_snapshot.has_description(
-                    f"The entity '{str(cur_subj)}' has been deleted."
-                )
-                cur_snapshot.has_update_action(update_query)
-            elif cur_subj_metadata["is_restored"]:
-                # RESTORATION SNAPSHOT
-                last_snapshot: SnapshotEntity = self.add_se(
-                    prov_subject=cur_subj, res=last_snapshot_res
-                )
-                # Non settiamo l'invalidation time per il precedente
-                # snapshot in caso di restore
-
-                cur_snapshot: SnapshotEntity = self._create_snapshot(cur_subj, cur_time)
-                cur_snapshot.derives_from(last_snapshot)
-                cur_snapshot.has_description(
-                    f"The entity '{str(cur_subj)}' has been restored."
+        # Every counter the loop may need is read upfront, and those that
+        # surely get a new snapshot are incremented together, instead of
+        # one request per use
+        counter_names: List[str] = []
+        for cur_subj in prov_g_subjects:
+            counter_names.append(str(cur_subj))
+            for merged_entity in merge_index.get(cur_subj, ()):
+                counter_names.append(str(merged_entity))
+        with self._batched_counters(counter_names):
+            if max_workers > 1:
+                self._prefill_update_queries(prov_g_subjects, max_workers)
+            self._reserve_counters(
+                str(cur_subj)
+                for cur_subj, cur_subj_metadata in prov_g_subjects.items()
+                if self._gets_new_snapshot(cur_subj, cur_subj_metadata)
+            )
+            for cur_subj, cur_subj_metadata in prov_g_subjects.items():
+                last_snapshot_res: Optional[URIRef] = self._retrieve_last_snapshot(
+                    cur_subj
                 )
+                if cur_subj_metadata["to_be_deleted"]:
+                    update_query: str = get_update_query(self.prov_g, cur_subj)[0]
+                    # DELETION SNAPSHOT
+                    last_snapshot: SnapshotEntity = self.add_se(
+                        prov_subject=cur_subj, res=last_snapshot_res
+                    )
+                    last_snapshot.has_invalidation_time(cur_time)
 
-                update_query: str = get_update_query(self.prov_g, cur_subj)[0]
-                if update_query:
+                    cur_snapshot: SnapshotEntity = self._create_snapshot(
+                        cur_subj, cur_time
+                    )
+                    cur_snapshot.derives_from(last_snapshot)
+                    cur_snapshot.has_invalidation_time(cur_time)
+                    cur_snapshot.has_description(
+                        f"The entity '{str(cur_subj)}' has been deleted."
+                    )
                     cur_snapshot.has_update_action(update_query)
-            else:
-                if last_snapshot_res is None:
-                    # CREATION SNAPSHOT
+                elif cur_subj_metadata["is_restored"]:
+                    # RESTORATION SNAPSHOT
+                    last_snapshot: SnapshotEntity = self.add_se(
+                        prov_subject=cur_subj, res=last_snapshot_res
+                    )
+                    # Non settiamo l'invalidation time per il precedente
+                    # snapshot in caso di restore
+
                     cur_snapshot: SnapshotEntity = self._create_snapshot(
                         cur_subj, cur_time
                     )
+                    cur_snapshot.derives_from(last_snapshot)
                     cur_snapshot.has_description(
-                        f"The entity '{str(cur_subj)}' has been created."
+                        f"The entity '{str(cur_subj)}' has been restored."
                     )
+
+                    update_query: str = get_update_query(self.prov_g, cur_subj)[0]
+                    if update_query:
+                        cur_snapshot.has_update_action(update_query)
                 else:
-                    update_query = get_update_query(self.prov_g, cur_subj)[0]
-                    cur_subj_merge_index = {
-                        k: v for k, v in merge_index.items() if k == cur_subj
-                    }
-                    snapshots_list = self._get_snapshots_from_merge_list(
-                        cur_subj_merge_index
-                    )
-                    if update_query and len(snapshots_list) == 0:
-                        # MODIFICATION SNAPSHOT
-                        last_snapshot: SnapshotEntity = self.add_se(
-                            prov_subject=cur_subj, res=last_snapshot_res
-                        )
-                        last_snapshot.has_invalidation_time(cur_time)
+                    if last_snapshot_res is None:
+                        # CREATION SNAPSHOT
                         cur_snapshot: SnapshotEntity = self._create_snapshot(
                             cur_subj, cur_time
                         )
-                        cur_snapshot.derives_from(last_snapshot)
                         cur_snapshot.has_description(
-                            f"The entity '{str(cur_subj)}' was modified."
+                            f"The entity '{str(cur_subj)}' has been created."
                         )
-                        cur_snapshot.has_update_action(update_query)
-                    elif len(snapshots_list) > 0:
-                        # MERGE SNAPSHOT
-                        last_snapshot: SnapshotEntity = self.add_se(
-                            prov_subject=cur_subj, res=last_snapshot_res
-                        )
-                        last_snapshot.has_invalidation_time(cur_time)
-                        cur_snapshot: SnapshotEntity = self._create_snapshot(
-                            cur_subj, cur_time
+                    else:
+                        update_query = get_update_query(self.prov_g, cur_subj)[0]
+                        snapshots_list = self._get_snapshots_from_merge_list(
+                            merge_index.get(cur_subj, ())
                         )
-                        cur_snapshot.derives_from(last_snapshot)
-                        for snapshot in snapshots_list:
-                            cur_snapshot.derives_from(snapshot)
-                        if update_query:
+                        if update_query and len(snapshots_list) == 0:
+                            # MODIFICATION SNAPSHOT
+                            last_snapshot: SnapshotEntity = self.add_se(
+                                prov_subject=cur_subj, res=last_snapshot_res
+                            )
+                            last_snapshot.has_invalidation_time(cur_time)
+                            cur_snapshot: SnapshotEntity = self._create_snapshot(
+                                cur_subj, cur_time
+                            )
+                            cur_snapshot.derives_from(last_snapshot)
+                            cur_snapshot.has_description(
+                                f"The entity '{str(cur_subj)}' was modified."
+                            )
                             cur_snapshot.has_update_action(update_query)
-                        cur_snapshot.has_description(
-                            self._get_merge_description(cur_subj, snapshots_list)
-                        )
+                        elif len(snapshots_list) > 0:
+                            # MERGE SNAPSHOT
+                            last_snapshot: SnapshotEntity = self.add_se(
+                                prov_subject=cur_subj, res=last_snapshot_res
+                            )
+                            last_snapshot.has_invalidation_time(cur_time)
+                            cur_snapshot: SnapshotEntity = self._create_snapshot(
+                                cur_subj, cur_time
+                            )
+                            cur_snapshot.derives_from(last_snapshot)
+                            for snapshot in snapshots_list:
+                                cur_snapshot.derives_from(snapshot)
+                            if update_query:
+                                cur_snapshot.has_update_action(update_query)
+                            cur_snapshot.has_description(
+                                self._get_merge_description(cur_subj, snapshots_list)
+                            )
+
+    def _prefill_update_queries(self, prov_g_subjects: dict, max_workers: int) -> None:
+        """
+        Computes in a process pool the update queries that the sequential
+        loop of ``generate_provenance`` will need, and stores them in the
+        update query cache, where the loop finds them.
+
+        The workers are forked, so they inherit the graph instead of
+        receiving the statements of every entity: extracting the subgraphs,
+        diffing and serializing them all happens in the workers, and only
+        the entities and their queries cross the process boundary.
+        """
+        if "fork" not in multiprocessing.get_all_start_methods():
+            return
+        cache = self.prov_g.update_query_cache
+        entities: List[URIRef] = []
+        for cur_subj, cur_subj_metadata in prov_g_subjects.items():
+            if cur_subj in cache:
+                continue
+            # A creation snapshot does not record any update query
+            if (
+                not cur_subj_metadata["is_restored"]
+                and self._read_counter(str(cur_subj)) <= 0
+            ):
+                continue
+            entities.append(cur_subj)
+        if len(entities) < 2:
+            return
+        max_workers = min(max_workers, len(entities))
+        chunk_size = -(-len(entities) // (max_workers * 4))
+        chunks = [
+            entities[i : i + chunk_size] for i in range(0, len(entities), chunk_size)
+        ]
+        # The graph reaches each worker as an argument of its initializer,
+        # which a forked worker inherits without pickling it
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_worker,
+            initargs=(self.prov_g,),
+        ) as executor:
+            for chunk, results in zip(
+                chunks, executor.map(_get_update_queries, chunks)
+            ):
+                cache.update(zip(chunk, results))
+
+    def _gets_new_snapshot(self, cur_subj: URIRef, cur_subj_metadata: dict) -> bool:
+        # Whether generate_provenance surely creates a snapshot of the
+        # entity. Merges are left out, as whether they create one depends
+        # on the snapshots created before them in the same run.
+        if cur_subj_metadata["to_be_deleted"] or cur_subj_metadata["is_restored"]:
+            return True
+        if self._read_counter(str(cur_subj)) <= 0:
+            return True
+        if self.prov_g.merge_index.get(cur_subj):
+            return False
+        return bool(get_update_query(self.prov_g, cur_subj)[0])
 
     @staticmethod
     def _get_merge_description(
@@ -159,9 +381,7 @@ class OCDMProvenance(Dataset):
         return merge_description
 
     def _retrieve_last_snapshot(self, prov_subject: URIRef) -> URIRef | None:
-        last_snapshot_count: str = str(
-            self.counter_handler.read_counter(str(prov_subject))
-        )
+        last_snapshot_count: str = str(self._read_counter(str(prov_subject)))
         if int(last_snapshot_count) <= 0:
             return None
         else:
@@ -180,20 +400,17 @@ class OCDMProvenance(Dataset):
         return new_snapshot
 
     def _get_snapshots_from_merge_list(
-        self, cur_subj_merge_index: dict
+        self, merge_entities: Iterable[URIRef]
     ) -> List[SnapshotEntity]:
         snapshots_list: List[SnapshotEntity] = []
-        for _, merge_entities in cur_subj_merge_index.items():
-            for merge_entity in merge_entities:
-                last_entity_snapshot_res: Optional[URIRef] = (
-                    self._retrieve_last_snapshot(merge_entity)
+        for merge_entity in merge_entities:
+            last_entity_snapshot_res: Optional[URIRef] = self._retrieve_last_snapshot(
+                merge_entity
+            )
+            if last_entity_snapshot_res is not None:
+                snapshots_list.append(
+                    self.add_se(prov_subject=merge_entity, res=last_entity_snapshot_res)
                 )
-                if last_entity_snapshot_res is not None:
-                    snapshots_list.append(
-                        self.add_se(
-                            prov_subject=merge_entity, res=last_entity_snapshot_res
-                        )
-                    )
         return snapshots_list
 
     def add_se(self, prov_subject: URIRef, res: URIRef | None = None) -> SnapshotEntity:
@@ -210,10 +427,10 @@ class OCDMProvenance(Dataset):
             prov_count = get_prov_count(res)
             assert prov_count is not None
             res_count: int = int(prov_count)
-            if res_count > self.counter_handler.read_counter(prov_subject):
-                self.counter_handler.set_counter(res_count, prov_subject)
+            if res_count > self._read_counter(prov_subject):
+                self._set_counter(res_count, prov_subject)
             return str(res_count)
-        return str(self.counter_handler.increment_counter(prov_subject))
+        return str(self._increment_counter(prov_subject))
 
     def get_entity(self, res: str) -> ProvEntity | None:
         if res in self.res_to_entity:
@@ -8,19 +8,78 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
-from rdflib import XSD, URIRef
+from rdflib import XSD, Literal, URIRef
 
 from rdflib_ocdm.prov.prov_entity import ProvEntity
+from rdflib_ocdm.support import is_string_empty
 
 if TYPE_CHECKING:
-    from typing import List, Optional
+    from typing import Iterator, List, Optional, Tuple
+
+    from rdflib.term import Node
+
+    from rdflib_ocdm.prov.provenance import OCDMProvenance
 
 
 class SnapshotEntity(ProvEntity):
     """Snapshot of entity metadata: a particular snapshot recording the
     metadata associated with an individual entity at a particular date and time,
     including the agent, such as a person, organisation or automated process that
-    created or modified the entity metadata."""
+    created or modified the entity metadata.
+
+    The values of the snapshot are kept as fields rather than as statements
+    of the provenance dataset, which receives them only when it is read,
+    e.g. to be serialized or uploaded."""
+
+    __slots__ = (
+        "_is_snapshot_of",
+        "_generation_time",
+        "_invalidation_time",
+        "_derives_from",
+        "_primary_source",
+        "_resp_agent",
+        "_description",
+        "_update_action",
+    )
+
+    def __init__(self, prov_subject: str, g: OCDMProvenance, count: str) -> None:
+        self._is_snapshot_of: URIRef | None = None
+        self._generation_time: Literal | None = None
+        self._invalidation_time: Literal | None = None
+        self._derives_from: List[URIRef] = []
+        self._primary_source: URIRef | None = None
+        self._resp_agent: URIRef | None = None
+        self._description: Literal | None = None
+        self._update_action: Literal | None = None
+        super(SnapshotEntity, self).__init__(prov_subject, g, count)
+
+    def _get_triples(self) -> Iterator[Tuple[URIRef, URIRef, Node]]:
+        for predicate, value in (
+            (ProvEntity.iri_specialization_of, self._is_snapshot_of),
+            (ProvEntity.iri_generated_at_time, self._generation_time),
+            (ProvEntity.iri_invalidated_at_time, self._invalidation_time),
+            (ProvEntity.iri_had_primary_source, self._primary_source),
+            (ProvEntity.iri_was_attributed_to, self._resp_agent),
+            (ProvEntity.iri_description, self._description),
+            (ProvEntity.iri_has_update_query, self._update_action),
+        ):
+            if value is not None:
+                yield self.res, predicate, value
+        for se_res in self._derives_from:
+            yield self.res, ProvEntity.iri_was_derived_from, se_res
+
+    def _set_value(self, field: str, predicate: URIRef, value: Node | None) -> None:
+        setattr(self, field, value)
+        if self._materialized:
+            self.g.remove((self.res, predicate, None))  # type: ignore[arg-type]
+            if value is not None:
+                self.g.add((self.res, predicate, value))
+
+    @staticmethod
+    def _to_literal(string: str, dt: URIRef = XSD.string) -> Literal | None:
+        if is_string_empty(string):
+            return None
+        return Literal(string, datatype=dt, normalize=True)
 
     # HAS CREATION DATE
     def get_generation_time(self) -> Optional[str]:
@@ -29,7 +88,7 @@ class SnapshotEntity(ProvEntity):
 
         :return: The requested value if found, None otherwise
         """
-        return self._get_literal(ProvEntity.iri_generated_at_time)
+        return None if self._generation_time is None else str(self._generation_time)
 
     def has_generation_time(self, string: str) -> None:
         """
@@ -49,8 +108,11 @@ class SnapshotEntity(ProvEntity):
         :raises TypeError: if the parameter is of the wrong type
         :return: None
         """
-        self.remove_generation_time()
-        self._create_literal(ProvEntity.iri_generated_at_time, string, XSD.dateTime)
+        self._set_value(
+            "_generation_time",
+            ProvEntity.iri_generated_at_time,
+            self._to_literal(string, XSD.dateTime),
+        )
 
     def remove_generation_time(self) -> None:
         """
@@ -58,7 +120,7 @@ class SnapshotEntity(ProvEntity):
 
         :return: None
         """
-        self.g.remove((self.res, ProvEntity.iri_generated_at_time, None))  # type: ignore[arg-type]
+        self._set_value("_generation_time", ProvEntity.iri_generated_at_time, None)
 
     # HAS INVALIDATION DATE
     def get_invalidation_time(self) -> Optional[str]:
@@ -67,7 +129,9 @@ class SnapshotEntity(ProvEntity):
 
         :return: The requested value if found, None otherwise
         """
-        return self._get_literal(ProvEntity.iri_invalidated_at_time)
+        if self._invalidation_time is None:
+            return None
+        return str(self._invalidation_time)
 
     def has_invalidation_time(self, string: str) -> None:
         """
@@ -91,8 +155,11 @@ class SnapshotEntity(ProvEntity):
         :raises TypeError: if the parameter is of the wrong type
         :return: None
         """
-        self.remove_invalidation_time()
-        self._create_literal(ProvEntity.iri_invalidated_at_time, string, XSD.dateTime)
+        self._set_value(
+            "_invalidation_time",
+            ProvEntity.iri_invalidated_at_time,
+            self._to_literal(string, XSD.dateTime),
+        )
 
     def remove_invalidation_time(self) -> None:
         """
@@ -100,7 +167,7 @@ class SnapshotEntity(ProvEntity):
 
         :return: None
         """
-        self.g.remove((self.res, ProvEntity.iri_invalidated_at_time, None))  # type: ignore[arg-type]
+        self._set_value("_invalidation_time", ProvEntity.iri_invalidated_at_time, None)
 
     # IS SNAPSHOT OF
     def get_is_snapshot_of(self) -> Optional[URIRef]:
@@ -109,10 +176,7 @@ class SnapshotEntity(ProvEntity):
 
         :return: The requested value if found, None otherwise
         """
-        uri: Optional[URIRef] = self._get_uri_reference(
-            ProvEntity.iri_specialization_of
-        )
-        return uri
+        return self._is_snapshot_of
 
     def is_snapshot_of(self, en_res: URIRef) -> None:
         """
@@ -131,8 +195,7 @@ class SnapshotEntity(ProvEntity):
         :type en_res: URIRef
         :return: None
         """
-        self.remove_is_snapshot_of()
-        self.g.add((self.res, ProvEntity.iri_specialization_of, en_res))
+        self._set_value("_is_snapshot_of", ProvEntity.iri_specialization_of, en_res)
 
     def remove_is_snapshot_of(self) -> None:
         """
@@ -140,7 +203,7 @@ class SnapshotEntity(ProvEntity):
 
         :return: None
         """
-        self.g.remove((self.res, ProvEntity.iri_specialization_of, None))  # type: ignore[arg-type]
+        self._set_value("_is_snapshot_of", ProvEntity.iri_specialization_of, None)
 
     # IS DERIVED FROM
     def get_derives_from(self) -> List[ProvEntity]:
@@ -149,11 +212,8 @@ class SnapshotEntity(ProvEntity):
 
         :return: A list containing the requested values if found, None otherwise
         """
-        uri_list: List[URIRef] = self._get_multiple_uri_references(
-            ProvEntity.iri_was_derived_from
-        )
         result: List[ProvEntity] = []
-        for uri in uri_list:
+        for uri in self._derives_from:
             prov_subj = uri.split("/prov/se/")[0]
             result.append(self.g.add_se(URIRef(prov_subj), uri))  # type: ignore[union-attr]
         return result
@@ -173,7 +233,10 @@ class SnapshotEntity(ProvEntity):
         :raises TypeError: if the parameter is of the wrong type
         :return: None
         """
-        self.g.add((self.res, ProvEntity.iri_was_derived_from, se_res.res))
+        if se_res.res not in self._derives_from:
+            self._derives_from.append(se_res.res)
+            if self._materialized:
+                self.g.add((self.res, ProvEntity.iri_was_derived_from, se_res.res))
 
     def remove_derives_from(self, se_res: ProvEntity | None = None) -> None:
         """
@@ -190,9 +253,14 @@ class SnapshotEntity(ProvEntity):
         :return: None
         """
         if se_res is not None:
-            self.g.remove((self.res, ProvEntity.iri_was_derived_from, se_res.res))  # type: ignore[arg-type]
+            if se_res.res in self._derives_from:
+                self._derives_from.remove(se_res.res)
+            if self._materialized:
+                self.g.remove((self.res, ProvEntity.iri_was_derived_from, se_res.res))  # type: ignore[arg-type]
         else:
-            self.g.remove((self.res, ProvEntity.iri_was_derived_from, None))  # type: ignore[arg-type]
+            self._derives_from = []
+            if self._materialized:
+                self.g.remove((self.res, ProvEntity.iri_was_derived_from, None))  # type: ignore[arg-type]
 
     # HAS PRIMARY SOURCE
     def get_primary_source(self) -> Optional[URIRef]:
@@ -201,10 +269,7 @@ class SnapshotEntity(ProvEntity):
 
         :return: The requested value if found, None otherwise
         """
-        uri: Optional[URIRef] = self._get_uri_reference(
-            ProvEntity.iri_had_primary_source
-        )
-        return uri
+        return self._primary_source
 
     def has_primary_source(self, any_res: URIRef) -> None:
         """
@@ -224,8 +289,7 @@ class SnapshotEntity(ProvEntity):
         :type any_res: URIRef
         :return: None
         """
-        self.remove_primary_source()
-        self.g.add((self.res, ProvEntity.iri_had_primary_source, any_res))
+        self._set_value("_primary_source", ProvEntity.iri_had_primary_source, any_res)
 
     def remove_primary_source(self) -> None:
         """
@@ -233,7 +297,7 @@ class SnapshotEntity(ProvEntity):
 
         :return: None
         """
-        self.g.remove((self.res, ProvEntity.iri_had_primary_source, None))  # type: ignore[arg-type]
+        self._set_value("_primary_source", ProvEntity.iri_had_primary_source, None)
 
     # HAS UPDATE ACTION
     def get_update_action(self) -> Optional[str]:
@@ -242,7 +306,7 @@ class SnapshotEntity(ProvEntity):
 
         :return: The requested value if found, None otherwise
         """
-        return self._get_literal(ProvEntity.iri_has_update_query)
+        return None if self._update_action is None else str(self._update_action)
 
     def has_update_action(self, string: str) -> None:
         """
@@ -264,8 +328,11 @@ class SnapshotEntity(ProvEntity):
         :type string: str
         :return: None
         """
-        self.remove_update_action()
-        self._create_literal(ProvEntity.iri_has_update_query, string)
+        self._set_value(
+            "_update_action",
+            ProvEntity.iri_has_update_query,
+            self._to_literal(string),
+        )
 
     def remove_update_action(self) -> None:
         """
@@ -273,7 +340,7 @@ class SnapshotEntity(ProvEntity):
 
         :return: None
         """
-        self.g.remove((self.res, ProvEntity.iri_has_update_query, None))  # type: ignore[arg-type]
+        self._set_value("_update_action", ProvEntity.iri_has_update_query, None)
 
     # HAS DESCRIPTION
     def get_description(self) -> Optional[str]:
@@ -282,7 +349,7 @@ class SnapshotEntity(ProvEntity):
 
         :return: The requested value if found, None otherwise
         """
-        return self._get_literal(ProvEntity.iri_description)
+        return None if self._description is None else str(self._description)
 
     def has_description(self, string: str) -> None:
         """
@@ -306,8 +373,9 @@ class SnapshotEntity(ProvEntity):
         :type string: str
         :return: None
         """
-        self.remove_description()
-        self._create_literal(ProvEntity.iri_description, string)
+        self._set_value(
+            "_description", ProvEntity.iri_description, self._to_literal(string)
+        )
 
     def remove_description(self) -> None:
         """
@@ -315,7 +383,7 @@ class SnapshotEntity(ProvEntity):
 
         :return: None
         """
-        self.g.remove((self.res, ProvEntity.iri_description, None))  # type: ignore[arg-type]
+        self._set_value("_description", ProvEntity.iri_description, None)
 
     # IS ATTRIBUTED TO
     def get_resp_agent(self) -> Optional[URIRef]:
@@ -324,10 +392,7 @@ class SnapshotEntity(ProvEntity):
 
         :return: The requested value if found, None otherwise
         """
-        uri: Optional[URIRef] = self._get_uri_reference(
-            ProvEntity.iri_was_attributed_to
-        )
-        return uri
+        return self._resp_agent
 
     def has_resp_agent(self, se_agent: URIRef) -> None:
         """
@@ -345,8 +410,7 @@ class SnapshotEntity(ProvEntity):
         :type se_agent: URIRef
         :return: None
         """
-        self.remove_resp_agent()
-        self.g.add((self.res, ProvEntity.iri_was_attributed_to, se_agent))
+        self._set_value("_resp_agent", ProvEntity.iri_was_attributed_to, se_agent)
 
     def remove_resp_agent(self) -> None:
         """
@@ -354,4 +418,4 @@ class SnapshotEntity(ProvEntity):
 
         :return: None
         """
-        self.g.remove((self.res, ProvEntity.iri_was_attributed_to, None))  # type: ignore[arg-type]
+        self._set_value("_resp_agent", ProvEntity.iri_was_attributed_to, None)
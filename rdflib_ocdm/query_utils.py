@@ -10,13 +10,13 @@ from __future__ import annotations
 from typing import TYPE_CHECKING, cast
 
 if TYPE_CHECKING:
-    from typing import Tuple
+    from typing import Iterable, List, Tuple
 
     from rdflib.compare import IsomorphicGraph
 
     from rdflib_ocdm.ocdm_graph import OCDMGraphCommons
 
-from rdflib import Dataset, Graph, URIRef
+from rdflib import BNode, Dataset, Graph, URIRef
 from rdflib.compare import graph_diff, to_isomorphic
 
 from rdflib_ocdm.graph_utils import _extract_graph_iri
@@ -57,13 +57,38 @@ def get_insert_query(
         return insert_string, num_of_statements
 
 
+def get_graph_iri(a_set: OCDMGraphCommons | Dataset, entity: URIRef) -> URIRef | None:
+    """
+    Returns the named graph the statements of an entity are written to,
+    or None for the default graph.
+    """
+    if hasattr(a_set, "entity_index") and entity in a_set.entity_index:  # type: ignore[operator]
+        return a_set.entity_index[entity].get("graph_iri")  # type: ignore[union-attr]
+    return _extract_graph_iri(a_set, entity)  # type: ignore[arg-type]
+
+
 def get_update_query(
     a_set: OCDMGraphCommons | Dataset | Graph,
     entity: URIRef,
     entity_type: str = "graph",
+) -> Tuple[str, int, int]:
+    if entity_type == "graph" and hasattr(a_set, "update_query_cache"):
+        # The cache entry of a subject is dropped as soon as its triples
+        # or its entity_index flags change
+        cache = cast("OCDMGraphCommons", a_set).update_query_cache
+        if entity not in cache:
+            cache[entity] = _compute_update_query(a_set, entity, entity_type)
+        return cache[entity]
+    return _compute_update_query(a_set, entity, entity_type)
+
+
+def _compute_update_query(
+    a_set: OCDMGraphCommons | Dataset | Graph,
+    entity: URIRef,
+    entity_type: str = "graph",
 ) -> Tuple[str, int, int]:
     to_be_deleted: bool = False
-    preexisting_graph: Dataset | Graph = Dataset()
+    graph_set: OCDMGraphCommons | None = None
     graph_iri: URIRef | None = None
 
     if entity_type == "graph":
@@ -74,15 +99,13 @@ def get_update_query(
             if entity in graph_set.entity_index
             else False
         )
-        preexisting_graph = get_entity_subgraph(graph_set.preexisting_graph, entity)
 
     if isinstance(a_set, Dataset):
-        if hasattr(a_set, "entity_index") and entity in a_set.entity_index:  # type: ignore[operator]
-            graph_iri = a_set.entity_index[entity].get("graph_iri")  # type: ignore[union-attr]
-        else:
-            graph_iri = _extract_graph_iri(a_set, entity)
+        graph_iri = get_graph_iri(a_set, entity)
 
     if to_be_deleted:
+        assert graph_set is not None
+        preexisting_graph = graph_set.get_preexisting_subgraph(entity)
         delete_string, removed_triples = get_delete_query(preexisting_graph, graph_iri)
         if delete_string != "":
             return delete_string, 0, removed_triples
@@ -90,36 +113,127 @@ def get_update_query(
             return "", 0, 0
     else:
         assert isinstance(a_set, (Graph, Dataset))
-        current_graph = get_entity_subgraph(a_set, entity)
-
-        # Convert Dataset to Graph for isomorphic comparison if needed
-        if isinstance(preexisting_graph, Dataset):
-            preexisting_for_comparison = Graph()
-            for s, p, o, _ in preexisting_graph.quads((None, None, None, None)):
-                preexisting_for_comparison.add((s, p, o))
-        else:
-            preexisting_for_comparison = preexisting_graph
-
-        if isinstance(current_graph, Dataset):
-            current_for_comparison = Graph()
-            for s, p, o, _ in current_graph.quads((None, None, None, None)):
-                current_for_comparison.add((s, p, o))
-        else:
-            current_for_comparison = current_graph
-
-        preexisting_iso: IsomorphicGraph = to_isomorphic(preexisting_for_comparison)
-        current_iso: IsomorphicGraph = to_isomorphic(current_for_comparison)
-        if preexisting_iso == current_iso:
-            # Both graphs have exactly the same content!
-            return "", 0, 0
-        _, in_first, in_second = graph_diff(preexisting_iso, current_iso)
-        delete_string, removed_triples = get_delete_query(in_first, graph_iri)
-        insert_string, added_triples = get_insert_query(in_second, graph_iri)
-        if delete_string != "" and insert_string != "":
-            return delete_string + "; " + insert_string, added_triples, removed_triples
-        elif delete_string != "":
-            return delete_string, 0, removed_triples
-        elif insert_string != "":
-            return insert_string, added_triples, 0
-        else:
-            return "", 0, 0
+        diff: Tuple[Graph, Graph] | None = None
+        preexisting_graph: Dataset | Graph = Graph()
+        if graph_set is not None:
+            changes = graph_set.get_entity_changes(entity)
+            if changes is not None:
+                diff = _diff_from_change_log(a_set, changes[0], changes[1])
+            if diff is None:
+                preexisting_graph = graph_set.get_preexisting_subgraph(entity)
+        if diff is None:
+            current_graph = get_entity_subgraph(a_set, entity)
+            diff = _diff_graphs(_as_graph(preexisting_graph), _as_graph(current_graph))
+        return _join_update_query(diff[0], diff[1], graph_iri)
+
+
+def _join_update_query(
+    in_first: Graph, in_second: Graph, graph_iri: URIRef | None
+) -> Tuple[str, int, int]:
+    delete_string, removed_triples = get_delete_query(in_first, graph_iri)
+    insert_string, added_triples = get_insert_query(in_second, graph_iri)
+    if delete_string != "" and insert_string != "":
+        return delete_string + "; " + insert_string, added_triples, removed_triples
+    elif delete_string != "":
+        return delete_string, 0, removed_triples
+    elif insert_string != "":
+        return insert_string, added_triples, 0
+    else:
+        return "", 0, 0
+
+
+def _as_graph(data: Dataset | Graph) -> Graph:
+    # Convert Dataset to Graph for the comparison if needed
+    if isinstance(data, Dataset):
+        graph = Graph()
+        for s, p, o, _ in data.quads((None, None, None, None)):
+            graph.add((s, p, o))
+        return graph
+    return data
+
+
+def _has_blank_nodes(statements: Iterable[tuple]) -> bool:
+    for statement in statements:
+        for term in statement[:3]:
+            if isinstance(term, BNode):
+                return True
+    return False
+
+
+def _diff_graphs(preexisting: Graph, current: Graph) -> Tuple[Graph, Graph]:
+    """
+    Returns the triples that are only in ``preexisting`` and those that
+    are only in ``current``.
+
+    Blank nodes have no stable identity across graphs, so they require
+    an isomorphic comparison. Without them, a plain set difference gives
+    the same result at a fraction of the cost.
+    """
+    preexisting_triples = list(preexisting)
+    current_triples = list(current)
+    if _has_blank_nodes(preexisting_triples) or _has_blank_nodes(current_triples):
+        return _isomorphic_diff(preexisting, current)
+    return _set_diff(preexisting_triples, current_triples)
+
+
+def _isomorphic_diff(preexisting: Graph, current: Graph) -> Tuple[Graph, Graph]:
+    preexisting_iso: IsomorphicGraph = to_isomorphic(preexisting)
+    current_iso: IsomorphicGraph = to_isomorphic(current)
+    if preexisting_iso == current_iso:
+        # Both graphs have exactly the same content!
+        return Graph(), Graph()
+    _, in_first, in_second = graph_diff(preexisting_iso, current_iso)
+    return in_first, in_second
+
+
+def _set_diff(
+    preexisting_triples: List[tuple], current_triples: List[tuple]
+) -> Tuple[Graph, Graph]:
+    preexisting_set = set(preexisting_triples)
+    current_set = set(current_triples)
+    in_first = Graph()
+    for triple in preexisting_triples:
+        if triple not in current_set:
+            in_first.add(triple)
+    in_second = Graph()
+    for triple in current_triples:
+        if triple not in preexisting_set:
+            in_second.add(triple)
+    return in_first, in_second
+
+
+def _diff_from_change_log(
+    a_set: Dataset | Graph, removed: List[tuple], added: List[tuple]
+) -> Tuple[Graph, Graph] | None:
+    """
+    Builds the diff of an entity straight from its change log, without
+    extracting any subgraph. Returns None when the log contains blank
+    nodes, so that the caller falls back to the isomorphic comparison.
+    """
+    if _has_blank_nodes(removed) or _has_blank_nodes(added):
+        return None
+    in_first = Graph()
+    in_second = Graph()
+    if isinstance(a_set, Dataset):
+        # The log of a Dataset holds quads, while the update query is
+        # computed on triples: a triple moved from a named graph to another
+        # or still present in a different named graph is not a change
+        removed_triples = dict.fromkeys(quad[:3] for quad in removed)
+        added_triples = dict.fromkeys(quad[:3] for quad in added)
+        added_quads = set(added)
+        for triple in removed_triples:
+            if triple in added_triples:
+                continue
+            if not any(True for _ in a_set.quads(triple)):
+                in_first.add(triple)
+        for triple in added_triples:
+            if triple in removed_triples:
+                continue
+            if all(quad in added_quads for quad in a_set.quads(triple)):
+                in_second.add(triple)
+    else:
+        for triple in removed:
+            in_first.add(triple)
+        for triple in added:
+            in_second.add(triple)
+    return in_first, in_second
@@ -6,14 +6,17 @@
 
 from __future__ import annotations
 
-from typing import List, Union
+import asyncio
+import json
+from typing import List, Tuple, Union
 
 from oc_ocdm.support.reporter import Reporter
 from rdflib import Dataset, Graph, Literal, URIRef
 from SPARQLWrapper import JSON, POST, XML, SPARQLWrapper
 
 from rdflib_ocdm.ocdm_graph import OCDMDataset, OCDMGraph
-from rdflib_ocdm.retry_utils import execute_with_retry
+from rdflib_ocdm.retry_utils import async_execute_with_retry, execute_with_retry
+from rdflib_ocdm.sparql_client import SPARQLClient
 
 
 class Reader:
@@ -34,9 +37,42 @@ class Reader:
         ts_url: str,
         res_list: List[URIRef],
         max_retries: int = 5,
+        sparql_client: SPARQLClient | None = None,
     ) -> None:
-        sparql: SPARQLWrapper = SPARQLWrapper(ts_url)
+        query, return_format = Reader._get_query(ocdm_graph, res_list)
+        result = execute_with_retry(
+            Reader._run_query,
+            query,
+            return_format,
+            ts_url,
+            sparql_client,
+            max_retries=max_retries,
+        )
+        Reader._add_results(ocdm_graph, result)
 
+    @staticmethod
+    def _run_query(
+        query: str,
+        return_format: str,
+        ts_url: str,
+        sparql_client: SPARQLClient | None = None,
+    ) -> object:
+        if sparql_client is None:
+            sparql: SPARQLWrapper = SPARQLWrapper(ts_url)
+            sparql.setQuery(query)
+            sparql.setMethod(POST)
+            sparql.setReturnFormat(return_format)
+            return sparql.queryAndConvert()
+        if return_format == JSON:
+            data = sparql_client.query(ts_url, query, "application/sparql-results+json")
+            return json.loads(data)
+        data = sparql_client.query(ts_url, query, "application/rdf+xml")
+        return Graph().parse(data=data, format="xml")
+
+    @staticmethod
+    def _get_query(
+        ocdm_graph: Union[OCDMGraph, OCDMDataset], res_list: List[URIRef]
+    ) -> Tuple[str, str]:
         if isinstance(ocdm_graph, OCDMDataset):
             query: str = f"""
                 SELECT ?g ?s ?p ?o (LANG(?o) AS ?lang)
@@ -47,15 +83,31 @@ class Reader:
                     }}
                 }}
             """
-            sparql.setQuery(query)
-            sparql.setMethod(POST)
-            sparql.setReturnFormat(JSON)
+            return query, JSON
 
-            result: dict = execute_with_retry(  # type: ignore[type-arg]
-                sparql.queryAndConvert, max_retries=max_retries
-            )
+        elif isinstance(ocdm_graph, OCDMGraph):
+            query: str = f"""
+                CONSTRUCT {{
+                    ?s ?p ?o
+                }}
+                WHERE {{
+                    ?s ?p ?o. 
+                    VALUES ?s {{<{"> <".join(res_list)}>}}
+                }}
+            """
+            return query, XML
 
-            if result and "results" in result and "bindings" in result["results"]:
+        else:
+            raise TypeError("ocdm_graph must be either OCDMGraph or OCDMDataset")
+
+    @staticmethod
+    def _add_results(ocdm_graph: Union[OCDMGraph, OCDMDataset], result: object) -> None:
+        if isinstance(ocdm_graph, OCDMDataset):
+            if (
+                isinstance(result, dict)
+                and "results" in result
+                and "bindings" in result["results"]
+            ):
                 temp_graph = Dataset()
                 for binding in result["results"]["bindings"]:
                     graph_uri = Graph(identifier=URIRef(binding["g"]["value"]))
@@ -84,29 +136,59 @@ class Reader:
             else:
                 raise ValueError("No entities were found.")
 
-        elif isinstance(ocdm_graph, OCDMGraph):
-            query: str = f"""
-                CONSTRUCT {{
-                    ?s ?p ?o
-                }}
-                WHERE {{
-                    ?s ?p ?o. 
-                    VALUES ?s {{<{"> <".join(res_list)}>}}
-                }}
-            """
-            sparql.setQuery(query)
-            sparql.setMethod(POST)
-            sparql.setReturnFormat(XML)
-
-            result_graph: Graph = execute_with_retry(  # type: ignore[type-arg]
-                sparql.queryAndConvert, max_retries=max_retries
-            )
-
-            if result_graph is not None and len(result_graph) > 0:
-                for triple in result_graph:
+        else:
+            if isinstance(result, Graph) and len(result) > 0:
+                for triple in result:
                     ocdm_graph.add(triple)
             else:
                 raise ValueError("No entities were found.")
 
-        else:
-            raise TypeError("ocdm_graph must be either OCDMGraph or OCDMDataset")
+
+class AsyncReader(Reader):
+    """A ``Reader`` whose imports are coroutines, so that it can be used
+    from an asyncio application without blocking its event loop.
+
+    At most ``max_concurrent_requests`` queries are sent at the same time
+    through the same reader."""
+
+    def __init__(
+        self,
+        repok: Reporter | None = None,
+        reperr: Reporter | None = None,
+        max_concurrent_requests: int = 4,
+    ):
+        super().__init__(repok, reperr)
+        self.max_concurrent_requests = max_concurrent_requests
+        self._semaphore: asyncio.Semaphore | None = None
+        self._semaphore_loop: asyncio.AbstractEventLoop | None = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # A semaphore can only be used by the event loop it was first used in
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.BoundedSemaphore(self.max_concurrent_requests)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def import_entities_from_triplestore(  # type: ignore[override]
+        self,
+        ocdm_graph: Union[OCDMGraph, OCDMDataset],
+        ts_url: str,
+        res_list: List[URIRef],
+        max_retries: int = 5,
+        sparql_client: SPARQLClient | None = None,
+    ) -> None:
+        query, return_format = Reader._get_query(ocdm_graph, res_list)
+        # The transports only speak blocking HTTP, so each attempt runs in
+        # a worker thread while the retries wait on the event loop
+        result = await async_execute_with_retry(
+            asyncio.to_thread,
+            Reader._run_query,
+            query,
+            return_format,
+            ts_url,
+            sparql_client,
+            max_retries=max_retries,
+            semaphore=self._get_semaphore(),
+        )
+        Reader._add_results(ocdm_graph, result)
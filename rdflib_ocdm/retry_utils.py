@@ -6,9 +6,11 @@
 
 from __future__ import annotations
 
+import asyncio
 import random
 import time
-from typing import Callable, TypeVar
+from contextlib import nullcontext
+from typing import Awaitable, Callable, TypeVar
 
 T = TypeVar("T")
 
@@ -44,27 +46,82 @@ def execute_with_retry(
             return func(*args, **kwargs)
         except Exception as e:
             retry_count += 1
-            if retry_count <= max_retries:
-                # Calculate wait time with exponential backoff and some randomness
-                wait_time = (base_wait_time * (2 ** (retry_count - 1))) + (
-                    random.random() * 0.5
-                )
+            time.sleep(
+                _handle_failure(e, retry_count, max_retries, base_wait_time, reporter)
+            )
+    raise ValueError(f"Failed after {max_retries} attempts")
+
 
-                # Log the retry attempt
-                message = (
-                    f"Query attempt {retry_count}/{max_retries}"
-                    f" failed: {e}."
-                    f" Retrying in {wait_time:.2f} seconds..."
-                )
-                if reporter is not None and hasattr(reporter, "add_sentence"):
-                    reporter.add_sentence(message)  # type: ignore[attr-defined]
-                else:
-                    print(message)
+async def async_execute_with_retry(
+    func: Callable[..., Awaitable[T]],
+    *args: object,
+    max_retries: int = 5,
+    base_wait_time: float = 1,
+    reporter: object | None = None,
+    semaphore: asyncio.Semaphore | None = None,
+    **kwargs: object,
+) -> T:
+    """
+    The coroutine counterpart of ``execute_with_retry``: it awaits the
+    given coroutine function with retry logic and exponential backoff,
+    sleeping with ``asyncio.sleep`` so that the event loop is never blocked.
+
+    :param func: The coroutine function to execute with retry logic
+    :param args: Positional arguments to pass to the function
+    :param max_retries: Maximum number of retry attempts before
+      giving up
+    :param base_wait_time: Initial wait time in seconds, which will
+      be increased exponentially
+    :param reporter: Optional reporter object with add_sentence
+      method for logging
+    :param semaphore: Optional semaphore held during each attempt,
+      but not while waiting for the next one
+    :param kwargs: Keyword arguments to pass to the function
+    :return: The result of the function call
+    """
+    retry_count = 0
 
-                time.sleep(wait_time)
-            else:
-                error_message = f"Failed after {max_retries} attempts: {e}"
-                if reporter is not None and hasattr(reporter, "add_sentence"):
-                    reporter.add_sentence(f"[ERROR] {error_message}")  # type: ignore[attr-defined]
-                raise ValueError(error_message)
+    while retry_count <= max_retries:
+        try:
+            async with semaphore if semaphore is not None else nullcontext():
+                return await func(*args, **kwargs)
+        except Exception as e:
+            retry_count += 1
+            await asyncio.sleep(
+                _handle_failure(e, retry_count, max_retries, base_wait_time, reporter)
+            )
     raise ValueError(f"Failed after {max_retries} attempts")
+
+
+def _handle_failure(
+    e: Exception,
+    retry_count: int,
+    max_retries: int,
+    base_wait_time: float,
+    reporter: object | None,
+) -> float:
+    """
+    Logs a failed attempt and returns how long to wait before the next one,
+    or raises a ValueError if no attempts are left.
+    """
+    if retry_count <= max_retries:
+        # Calculate wait time with exponential backoff and some randomness
+        wait_time = (base_wait_time * (2 ** (retry_count - 1))) + (
+            random.random() * 0.5
+        )
+
+        # Log the retry attempt
+        message = (
+            f"Query attempt {retry_count}/{max_retries}"
+            f" failed: {e}."
+            f" Retrying in {wait_time:.2f} seconds..."
+        )
+        if reporter is not None and hasattr(reporter, "add_sentence"):
+            reporter.add_sentence(message)  # type: ignore[attr-defined]
+        else:
+            print(message)
+        return wait_time
+    error_message = f"Failed after {max_retries} attempts: {e}"
+    if reporter is not None and hasattr(reporter, "add_sentence"):
+        reporter.add_sentence(f"[ERROR] {error_message}")  # type: ignore[attr-defined]
+    raise ValueError(error_message)
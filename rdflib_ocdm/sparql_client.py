@@ -0,0 +1,190 @@
+#!/usr/bin/python
+
+# SPDX-FileCopyrightText: 2026 Arcangelo Massari <arcangelo.massari@unibo.it>
+#
+# SPDX-License-Identifier: ISC
+
+from __future__ import annotations
+
+import threading
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from queue import Empty, LifoQueue
+from typing import TYPE_CHECKING
+from urllib.parse import urlencode, urlsplit
+
+if TYPE_CHECKING:
+    from types import TracebackType
+    from typing import Dict, Optional, Tuple, Type
+
+    _PoolKey = Tuple[str, str, Optional[int]]
+
+
+class SPARQLClient:
+    """
+    A thread-safe SPARQL protocol client that keeps HTTP connections alive
+    and reuses them across requests, batches and retries, instead of
+    opening a new connection for every request as SPARQLWrapper does.
+
+    Each endpoint host gets a pool of at most ``pool_size`` connections:
+    when all of them are busy, further requests wait for one to be
+    released. A pooled connection closed by the server is transparently
+    replaced once; any other failure is raised to the caller, so that it
+    can be retried with ``execute_with_retry``.
+
+    :param pool_size: The maximum number of connections per host
+    :type pool_size: int
+    :param timeout: The timeout in seconds for connecting and for every
+      read from the socket
+    :type timeout: float
+    :param sparql_update_body: If True, updates are sent as the body of an
+      ``application/sparql-update`` request, otherwise as an URL-encoded form
+    :type sparql_update_body: bool
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 4,
+        timeout: float = 60.0,
+        sparql_update_body: bool = False,
+    ) -> None:
+        if pool_size <= 0:
+            raise ValueError("pool_size must be a positive integer")
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.sparql_update_body = sparql_update_body
+        self._pools: Dict[_PoolKey, Tuple[LifoQueue, threading.BoundedSemaphore]] = {}
+        self._pools_lock = threading.Lock()
+
+    def update(self, endpoint: str, update_string: str) -> None:
+        """
+        Sends a SPARQL update to the endpoint.
+
+        :param endpoint: The URL of the SPARQL endpoint
+        :type endpoint: str
+        :param update_string: The SPARQL update
+        :type update_string: str
+        :raises ValueError: if the endpoint does not answer with a 2xx status
+        :return: None
+        """
+        if self.sparql_update_body:
+            body = update_string.encode("utf-8")
+            content_type = "application/sparql-update; charset=utf-8"
+        else:
+            body = urlencode({"update": update_string}).encode("utf-8")
+            content_type = "application/x-www-form-urlencoded"
+        self._request(endpoint, body, {"Content-Type": content_type})
+
+    def query(self, endpoint: str, query_string: str, accept: str) -> bytes:
+        """
+        Sends a SPARQL query to the endpoint as an URL-encoded form.
+
+        :param endpoint: The URL of the SPARQL endpoint
+        :type endpoint: str
+        :param query_string: The SPARQL query
+        :type query_string: str
+        :param accept: The media type requested for the results
+        :type accept: str
+        :raises ValueError: if the endpoint does not answer with a 2xx status
+        :return: The body of the response
+        """
+        body = urlencode({"query": query_string}).encode("utf-8")
+        return self._request(
+            endpoint,
+            body,
+            {"Content-Type": "application/x-www-form-urlencoded", "Accept": accept},
+        )
+
+    def close(self) -> None:
+        """
+        Closes every idle connection. The client can still be used
+        afterwards, opening new connections as needed.
+        """
+        with self._pools_lock:
+            pools = list(self._pools.values())
+        for idle, _ in pools:
+            while True:
+                try:
+                    idle.get_nowait().close()
+                except Empty:
+                    break
+
+    def __enter__(self) -> SPARQLClient:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def _get_pool(self, key: _PoolKey) -> Tuple[LifoQueue, threading.BoundedSemaphore]:
+        with self._pools_lock:
+            if key not in self._pools:
+                self._pools[key] = (
+                    LifoQueue(),
+                    threading.BoundedSemaphore(self.pool_size),
+                )
+            return self._pools[key]
+
+    def _new_connection(self, key: _PoolKey) -> HTTPConnection:
+        scheme, host, port = key
+        if scheme == "https":
+            return HTTPSConnection(host, port, timeout=self.timeout)
+        return HTTPConnection(host, port, timeout=self.timeout)
+
+    def _request(self, endpoint: str, body: bytes, headers: Dict[str, str]) -> bytes:
+        url = urlsplit(endpoint)
+        if url.scheme not in {"http", "https"} or url.hostname is None:
+            raise ValueError(f"Unsupported SPARQL endpoint URL: {endpoint}")
+        key = (url.scheme, url.hostname, url.port)
+        path = url.path or "/"
+        if url.query:
+            path += "?" + url.query
+        idle, slots = self._get_pool(key)
+        with slots:
+            try:
+                connection = idle.get_nowait()
+                reused = True
+            except Empty:
+                connection = self._new_connection(key)
+                reused = False
+            try:
+                try:
+                    status, reason, data, will_close = self._send(
+                        connection, path, body, headers
+                    )
+                except (ConnectionError, HTTPException):
+                    if not reused:
+                        raise
+                    # The server may close an idle keep-alive connection at any
+                    # time: this is not a failure of the request itself
+                    connection.close()
+                    connection = self._new_connection(key)
+                    status, reason, data, will_close = self._send(
+                        connection, path, body, headers
+                    )
+            except BaseException:
+                connection.close()
+                raise
+            if will_close:
+                connection.close()
+            else:
+                idle.put(connection)
+        if not 200 <= status < 300:
+            raise ValueError(
+                f"SPARQL endpoint answered {status} {reason}: "
+                f"{data.decode('utf-8', errors='replace')}"
+            )
+        return data
+
+    @staticmethod
+    def _send(
+        connection: HTTPConnection, path: str, body: bytes, headers: Dict[str, str]
+    ) -> Tuple[int, str, bytes, bool]:
+        connection.request("POST", path, body=body, headers=headers)
+        response = connection.getresponse()
+        # The response must be read to the end before the connection is reused
+        data = response.read()
+        return response.status, response.reason, data, response.will_close
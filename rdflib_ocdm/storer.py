@@ -6,21 +6,30 @@
 
 from __future__ import annotations
 
+import asyncio
+import gzip
+import json
 import os
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from typing import TYPE_CHECKING
 
 from oc_ocdm.support.reporter import Reporter
+from rdflib import Dataset, Graph
 from SPARQLWrapper import SPARQLWrapper
 
 from rdflib_ocdm.ocdm_graph import OCDMDataset, OCDMGraph, OCDMGraphCommons
-from rdflib_ocdm.query_utils import get_update_query
-from rdflib_ocdm.retry_utils import execute_with_retry
+from rdflib_ocdm.query_utils import get_graph_iri, get_update_query
+from rdflib_ocdm.retry_utils import async_execute_with_retry, execute_with_retry
+from rdflib_ocdm.sparql_client import SPARQLClient
 
 if TYPE_CHECKING:
-    from typing import Set
+    from typing import IO, Deque, Iterator, List, Set, Tuple
 
-    from rdflib import Graph
+    from rdflib import URIRef
 
 
 class Storer:
@@ -31,6 +40,7 @@ class Storer:
         reperr: Reporter | None = None,
         output_format: str = "json-ld",
         zip_output: bool = False,
+        sparql_client: SPARQLClient | None = None,
     ) -> None:
         self.a_set = abstract_set
         supported_formats: Set[str] = {
@@ -50,6 +60,10 @@ class Storer:
         else:
             self.output_format: str = output_format
         self.zip_output = zip_output
+        # When given, the updates share its pool of keep-alive connections
+        # instead of opening a connection per request
+        self.sparql_client = sparql_client
+        self._tp_err_lock = threading.Lock()
         if repok is None:
             self.repok: Reporter = Reporter(prefix="[Storer: INFO] ")
         else:
@@ -72,15 +86,12 @@ class Storer:
         if query_string != "":
             try:
                 # Use the retry utility function with custom error handling
-                def execute_query():
-                    sparql: SPARQLWrapper = SPARQLWrapper(triplestore_url)
-                    sparql.setQuery(query_string)
-                    sparql.setMethod("POST")
-                    sparql.query()
-                    return True
-
                 execute_with_retry(
-                    execute_query, max_retries=max_retries, reporter=self.repok
+                    self._send_update,
+                    query_string,
+                    triplestore_url,
+                    max_retries=max_retries,
+                    reporter=self.repok,
                 )
 
                 self.repok.add_sentence(
@@ -96,72 +107,408 @@ class Storer:
                     f" due to communication problems: {e}"
                 )
                 if base_dir is not None:
-                    tp_err_dir: str = base_dir + os.sep + "tp_err"
-                    if not os.path.exists(tp_err_dir):
-                        os.makedirs(tp_err_dir)
-                    cur_file_err: str = (
-                        tp_err_dir
-                        + os.sep
-                        + datetime.now().strftime(
-                            "%Y-%m-%d-%H-%M-%S-%f_not_uploaded.txt"
-                        )
-                    )
-                    with open(cur_file_err, "wt", encoding="utf-8") as f:
-                        f.write(query_string)
+                    self._store_not_uploaded(query_string, base_dir)
                 return False
         return False
 
-    def upload_all(
-        self, triplestore_url: str, base_dir: str | None = None, batch_size: int = 10
-    ) -> bool:
-        self.repok.new_article()
-        self.reperr.new_article()
-        if batch_size <= 0:
-            batch_size = 10
+    def _send_update(self, query_string: str, triplestore_url: str) -> None:
+        if self.sparql_client is not None:
+            self.sparql_client.update(triplestore_url, query_string)
+            return
+        sparql: SPARQLWrapper = SPARQLWrapper(triplestore_url)
+        sparql.setQuery(query_string)
+        sparql.setMethod("POST")
+        sparql.query()
+
+    def _store_not_uploaded(self, query_string: str, base_dir: str) -> None:
+        tp_err_dir: str = base_dir + os.sep + "tp_err"
+        # Concurrent batches may fail within the same microsecond
+        with self._tp_err_lock:
+            if not os.path.exists(tp_err_dir):
+                os.makedirs(tp_err_dir)
+            cur_file_err: str = ""
+            while cur_file_err == "" or os.path.exists(cur_file_err):
+                cur_file_err = (
+                    tp_err_dir
+                    + os.sep
+                    + datetime.now().strftime("%Y-%m-%d-%H-%M-%S-%f_not_uploaded.txt")
+                )
+            with open(cur_file_err, "wt", encoding="utf-8") as f:
+                f.write(query_string)
+
+    def _get_entity_type(self) -> str:
+        if isinstance(self.a_set, (OCDMGraph, OCDMDataset)):
+            return "graph"
+        return "prov"
+
+    def _get_entities(self) -> List[URIRef]:
+        if self._get_entity_type() == "graph":
+            # Only the entities touched since the baseline can have changed
+            all_entities = self.a_set.all_entities  # type: ignore[union-attr]
+            return [
+                entity
+                for entity in self.a_set.dirty_subjects  # type: ignore[union-attr]
+                if entity in all_entities
+            ]
+        return list(self.a_set.all_entities)  # type: ignore[union-attr]
+
+    def _get_batches(
+        self,
+        batch_size: int | None,
+        max_bytes: int | None = None,
+        max_triples: int | None = None,
+    ) -> Iterator[Tuple[str, int, int]]:
+        entity_type = self._get_entity_type()
+        entities = self._get_entities()
         query_string: str = ""
         added_statements: int = 0
         removed_statements: int = 0
-        skipped_queries: int = 0
-        result: bool = True
-        entity_type = (
-            "graph" if isinstance(self.a_set, (OCDMGraph, OCDMDataset)) else "prov"
-        )
-        for idx, entity in enumerate(list(self.a_set.all_entities)):  # type: ignore[union-attr]
+        n_queries: int = 0
+        n_bytes: int = 0
+        for entity in entities:
             update_query, n_added, n_removed = get_update_query(
                 self.a_set, entity, entity_type
             )
             if update_query == "":
-                skipped_queries += 1
+                continue
+            query_bytes = len(update_query.encode("utf-8"))
+            # An entity exceeding a budget on its own is sent alone, since
+            # its update query cannot be split
+            if n_queries > 0 and (
+                (batch_size is not None and n_queries == batch_size)
+                or (
+                    max_bytes is not None
+                    and n_bytes + len(" ; ") + query_bytes > max_bytes
+                )
+                or (
+                    max_triples is not None
+                    and added_statements + removed_statements + n_added + n_removed
+                    > max_triples
+                )
+            ):
+                yield query_string, added_statements, removed_statements
+                query_string = ""
+                added_statements = 0
+                removed_statements = 0
+                n_queries = 0
+                n_bytes = 0
+            if n_queries == 0:
+                query_string = update_query
+                n_bytes = query_bytes
+            else:
+                query_string += " ; " + update_query
+                n_bytes += len(" ; ") + query_bytes
+            added_statements += n_added
+            removed_statements += n_removed
+            n_queries += 1
+        if query_string != "":
+            yield query_string, added_statements, removed_statements
+
+    def store_graphs_in_file(
+        self, file_path: str, compression: str | None = None
+    ) -> None:
+        """
+        Writes the current statements of the changed entities, or of every
+        provenance entity, to a file in ``output_format``.
+
+        The file is written one entity at a time, so memory usage does not
+        grow with the size of the output. With N-Quads and JSON-LD, the
+        statements are put in the same named graphs used by ``upload_all``.
+        Entities marked as deleted have no current statements and are skipped.
+
+        :param file_path: The path of the output file
+        :type file_path: str
+        :param compression: Either ``"gzip"`` or ``"zip"``. If None, the output
+          is zipped only if ``zip_output`` was set
+        :type compression: str, optional
+        :raises ValueError: if the compression is not supported
+        :return: None
+        """
+        self.repok.new_article()
+        self.reperr.new_article()
+        if compression is None and self.zip_output:
+            compression = "zip"
+        if compression not in {None, "gzip", "zip"}:
+            raise ValueError(
+                f"Given compression '{compression}' is not supported."
+                " Available compressions: {'gzip', 'zip'}."
+            )
+        directory = os.path.dirname(file_path)
+        if directory != "":
+            os.makedirs(directory, exist_ok=True)
+        if compression == "gzip":
+            with gzip.open(file_path, "wb") as f:
+                self._write_entities(f)  # type: ignore[arg-type]
+        elif compression == "zip":
+            member = os.path.basename(file_path)
+            if member.endswith(".zip"):
+                member = member[: -len(".zip")]
+            with zipfile.ZipFile(file_path, "w", zipfile.ZIP_DEFLATED) as archive:
+                # force_zip64 lets the member grow past 4 GiB while streaming
+                with archive.open(member, "w", force_zip64=True) as f:
+                    self._write_entities(f)
+        else:
+            with open(file_path, "wb") as f:
+                self._write_entities(f)
+        self.repok.add_sentence(f"File '{file_path}' added.")
+
+    def _write_entities(self, f: IO[bytes]) -> None:
+        is_json_ld = self.output_format == "json-ld"
+        with_graphs = self.output_format in {"application/n-quads", "nquads"}
+        graph_index = (
+            self.a_set.entity_index  # type: ignore[union-attr]
+            if self._get_entity_type() == "graph"
+            else {}
+        )
+        first = True
+        if is_json_ld:
+            f.write(b"[")
+        for entity in self._get_entities():
+            if entity in graph_index and graph_index[entity]["to_be_deleted"]:
+                continue
+            data = self._get_entity_data(entity, is_json_ld or with_graphs)
+            if len(data) == 0:
+                continue
+            if is_json_ld:
+                for node in json.loads(data.serialize(format="json-ld")):
+                    f.write(b"\n" if first else b",\n")
+                    f.write(json.dumps(node, ensure_ascii=False).encode("utf-8"))
+                    first = False
             else:
-                index = idx - skipped_queries
-                if index == 0:
-                    # First query
-                    query_string = update_query
-                    added_statements = n_added
-                    removed_statements = n_removed
-                elif index % batch_size == 0:
-                    # batch_size-multiple query
-                    result &= self._query(
+                output_format = "nquads" if isinstance(data, Dataset) else "nt11"
+                f.write(
+                    data.serialize(format=output_format, encoding="utf-8").rstrip(b"\n")
+                )
+                f.write(b"\n")
+        if is_json_ld:
+            f.write(b"\n]\n")
+
+    def _get_entity_data(self, entity: URIRef, with_graphs: bool) -> Graph | Dataset:
+        triples = Graph()
+        # Statements repeated in several named graphs are written once
+        for s, p, o, _ in self.a_set.quads((entity, None, None, None)):  # type: ignore[union-attr]
+            triples.add((s, p, o))
+        if not with_graphs or not isinstance(self.a_set, Dataset):
+            return triples
+        graph_iri = get_graph_iri(self.a_set, entity)
+        if graph_iri is None:
+            return triples
+        data = Dataset()
+        named_graph = data.graph(graph_iri)
+        for triple in triples:
+            named_graph.add(triple)
+        return data
+
+    def upload_all(
+        self,
+        triplestore_url: str,
+        base_dir: str | None = None,
+        batch_size: int | None = 10,
+        max_workers: int = 1,
+        max_bytes: int | None = None,
+        max_triples: int | None = None,
+    ) -> bool:
+        """
+        Uploads the changes of every entity to the triplestore, grouping
+        up to ``batch_size`` update queries per request.
+
+        A request is also closed before its query would exceed ``max_bytes``
+        bytes or its added and removed statements would exceed
+        ``max_triples``, so that request sizes stay predictable even when
+        entities differ widely in size. An entity over budget on its own is
+        sent in a request of its own.
+
+        With ``max_workers`` greater than 1, the batches are sent in parallel
+        through a thread pool. Every entity belongs to exactly one batch and
+        all the requests are completed before returning, so the updates of an
+        entity are never reordered, neither within a call nor across calls.
+
+        :param triplestore_url: The SPARQL endpoint to update
+        :type triplestore_url: str
+        :param base_dir: If not None, the batches that could not be uploaded
+          are saved in its ``tp_err`` subfolder
+        :type base_dir: str, optional
+        :param batch_size: The maximum number of update queries per request,
+          or None for no limit on the number of queries
+        :type batch_size: int, optional
+        :param max_workers: The number of requests sent at the same time
+        :type max_workers: int
+        :param max_bytes: The maximum UTF-8 size in bytes of the query of a request
+        :type max_bytes: int, optional
+        :param max_triples: The maximum number of added and removed statements
+          per request
+        :type max_triples: int, optional
+        :return: True if every batch was uploaded, False otherwise
+        """
+        self.repok.new_article()
+        self.reperr.new_article()
+        if batch_size is not None and batch_size <= 0:
+            batch_size = 10
+        batches = self._get_batches(batch_size, max_bytes, max_triples)
+        result: bool = True
+        if max_workers <= 1:
+            for query_string, added_statements, removed_statements in batches:
+                result &= self._query(
+                    query_string,
+                    triplestore_url,
+                    base_dir,
+                    added_statements,
+                    removed_statements,
+                )
+            return result
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Keep a bounded number of batches in flight, so that the
+            # queries of a large upload are not all built upfront
+            pending: Deque[Future[bool]] = deque()
+            for query_string, added_statements, removed_statements in batches:
+                if len(pending) >= 2 * max_workers:
+                    result &= pending.popleft().result()
+                pending.append(
+                    executor.submit(
+                        self._query,
                         query_string,
                         triplestore_url,
                         base_dir,
                         added_statements,
                         removed_statements,
                     )
-                    query_string = update_query
-                    added_statements = n_added
-                    removed_statements = n_removed
-                else:
-                    # Accumulated query
-                    query_string += " ; " + update_query
-                    added_statements += n_added
-                    removed_statements += n_removed
+                )
+            while pending:
+                result &= pending.popleft().result()
+        return result
+
+
+class AsyncStorer(Storer):
+    """A ``Storer`` whose upload is a coroutine, so that it can be used
+    from an asyncio application without blocking its event loop.
+
+    At most ``max_concurrent_requests`` batches are sent at the same time
+    through the same storer."""
+
+    def __init__(
+        self,
+        abstract_set: OCDMGraphCommons | Graph,
+        repok: Reporter | None = None,
+        reperr: Reporter | None = None,
+        output_format: str = "json-ld",
+        zip_output: bool = False,
+        max_concurrent_requests: int = 4,
+        sparql_client: SPARQLClient | None = None,
+    ) -> None:
+        super().__init__(
+            abstract_set, repok, reperr, output_format, zip_output, sparql_client
+        )
+        self.max_concurrent_requests = max_concurrent_requests
+        self._semaphore: asyncio.Semaphore | None = None
+        self._semaphore_loop: asyncio.AbstractEventLoop | None = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # A semaphore can only be used by the event loop it was first used in
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.BoundedSemaphore(self.max_concurrent_requests)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def _query_async(
+        self,
+        query_string: str,
+        triplestore_url: str,
+        base_dir: str | None = None,
+        added_statements: int = 0,
+        removed_statements: int = 0,
+        max_retries: int = 5,
+    ) -> bool:
         if query_string != "":
-            result &= self._query(
-                query_string,
-                triplestore_url,
-                base_dir,
-                added_statements,
-                removed_statements,
+            try:
+                # The transports only speak blocking HTTP, so each attempt runs
+                # in a worker thread while the retries wait on the event loop
+                await async_execute_with_retry(
+                    asyncio.to_thread,
+                    self._send_update,
+                    query_string,
+                    triplestore_url,
+                    max_retries=max_retries,
+                    reporter=self.repok,
+                    semaphore=self._get_semaphore(),
+                )
+
+                self.repok.add_sentence(
+                    f"Triplestore updated with {added_statements} added statements and "
+                    f"with {removed_statements} removed statements."
+                )
+
+                return True
+            except ValueError as e:
+                self.reperr.add_sentence(
+                    "[3] Graph was not loaded into the triplestore"
+                    f" due to communication problems: {e}"
+                )
+                if base_dir is not None:
+                    self._store_not_uploaded(query_string, base_dir)
+                return False
+        return False
+
+    async def upload_all(  # type: ignore[override]
+        self,
+        triplestore_url: str,
+        base_dir: str | None = None,
+        batch_size: int | None = 10,
+        max_bytes: int | None = None,
+        max_triples: int | None = None,
+    ) -> bool:
+        """
+        Uploads the changes of every entity to the triplestore, batched as in
+        ``Storer.upload_all``, sending up to ``max_concurrent_requests``
+        requests at the same time.
+
+        The coroutine returns once every request is completed, so the updates
+        of an entity are never reordered across calls.
+
+        :param triplestore_url: The SPARQL endpoint to update
+        :type triplestore_url: str
+        :param base_dir: If not None, the batches that could not be uploaded
+          are saved in its ``tp_err`` subfolder
+        :type base_dir: str, optional
+        :param batch_size: The maximum number of update queries per request,
+          or None for no limit on the number of queries
+        :type batch_size: int, optional
+        :param max_bytes: The maximum UTF-8 size in bytes of the query of a request
+        :type max_bytes: int, optional
+        :param max_triples: The maximum number of added and removed statements
+          per request
+        :type max_triples: int, optional
+        :return: True if every batch was uploaded, False otherwise
+        """
+        self.repok.new_article()
+        self.reperr.new_article()
+        if batch_size is not None and batch_size <= 0:
+            batch_size = 10
+        result: bool = True
+        pending: Set[asyncio.Task[bool]] = set()
+        for query_string, added_statements, removed_statements in self._get_batches(
+            batch_size, max_bytes, max_triples
+        ):
+            # Keep a bounded number of batches in flight, so that the
+            # queries of a large upload are not all built upfront
+            if len(pending) >= 2 * self.max_concurrent_requests:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    result &= task.result()
+            pending.add(
+                asyncio.create_task(
+                    self._query_async(
+                        query_string,
+                        triplestore_url,
+                        base_dir,
+                        added_statements,
+                        removed_statements,
+                    )
+                )
             )
+        results: List[bool] = await asyncio.gather(*pending)
+        for task_result in results:
+            result &= task_result
         return result
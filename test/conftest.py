@@ -5,10 +5,14 @@
 import os
 import random
 import subprocess
+import threading
 import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
 
 import fakeredis
 import pytest
+from rdflib import ConjunctiveGraph
 from SPARQLWrapper import JSON, POST, SPARQLWrapper
 
 VIRTUOSO_IMAGE = (
@@ -166,3 +170,76 @@ def sparql_wrapper(virtuoso_databases, reset_server):
 @pytest.fixture(scope="class")
 def fake_redis():
     return fakeredis.FakeStrictRedis()
+
+
+class LocalSparqlEndpoint:
+    """An in-process stand-in for a SPARQL endpoint, backed by an rdflib
+    ConjunctiveGraph, for the tests that do not need a real triplestore."""
+
+    def __init__(self):
+        self.dataset = ConjunctiveGraph()
+        self.updates: list[str] = []
+        self.content_types: list[str] = []
+        self.connections: set[tuple] = set()
+        self.failures = 0
+        # Close every connection after answering, without telling the client
+        self.drop_connections = False
+        self.lock = threading.Lock()
+        endpoint = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = self.rfile.read(length).decode("utf-8")
+                content_type = self.headers.get("Content-Type", "")
+                if content_type.startswith("application/sparql-update"):
+                    form = {"update": [payload]}
+                else:
+                    form = parse_qs(payload)
+                with endpoint.lock:
+                    endpoint.connections.add(self.client_address)
+                    endpoint.content_types.append(content_type)
+                    if endpoint.failures > 0:
+                        endpoint.failures -= 1
+                        self.send_response(500)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    if "update" in form:
+                        endpoint.updates.append(form["update"][0])
+                        endpoint.dataset.update(form["update"][0])
+                        body, content_type = b"", "text/plain"
+                    else:
+                        result = endpoint.dataset.query(form["query"][0])
+                        if result.type == "CONSTRUCT":
+                            body = result.serialize(format="xml")
+                            content_type = "application/rdf+xml"
+                        else:
+                            body = result.serialize(format="json")
+                            content_type = "application/sparql-results+json"
+                assert body is not None
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                if endpoint.drop_connections:
+                    self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/sparql"
+
+
+@pytest.fixture
+def local_sparql_endpoint():
+    endpoint = LocalSparqlEndpoint()
+    thread = threading.Thread(target=endpoint.server.serve_forever, daemon=True)
+    thread.start()
+    yield endpoint
+    endpoint.server.shutdown()
+    endpoint.server.server_close()
@@ -5,15 +5,24 @@
 import os
 import sqlite3
 import tempfile
+import threading
 import urllib.parse
+from unittest.mock import MagicMock, patch
 
 import pytest
+from rdflib import Literal, URIRef
 
+from rdflib_ocdm.counter_handler.cached_counter_handler import CachedCounterHandler
+from rdflib_ocdm.counter_handler.compact_in_memory_counter_handler import (
+    CompactInMemoryCounterHandler,
+)
 from rdflib_ocdm.counter_handler.filesystem_counter_handler import (
     FilesystemCounterHandler,
 )
 from rdflib_ocdm.counter_handler.in_memory_counter_handler import InMemoryCounterHandler
+from rdflib_ocdm.counter_handler.mmap_counter_handler import MmapCounterHandler
 from rdflib_ocdm.counter_handler.sqlite_counter_handler import SqliteCounterHandler
+from rdflib_ocdm.ocdm_graph import OCDMGraph
 
 
 class TestInMemoryCounterHandler:
@@ -49,6 +58,15 @@ class TestInMemoryCounterHandler:
         result = self.handler.increment_counter("existing_entity")
         assert result == 6
 
+    def test_bulk_counters(self):
+        self.handler.set_counters({"a": 3, "b": 0})
+        assert self.handler.read_counters(["a", "b", "c"]) == {"a": 3, "b": 0, "c": 0}
+        assert self.handler.increment_counters(["a", "c", "c"]) == {"a": 4, "c": 2}
+        assert self.handler.prov_counters == {"a": 4, "b": 0, "c": 2}
+        with pytest.raises(ValueError):
+            self.handler.set_counters({"a": 1, "b": -1})
+        assert self.handler.read_counter("a") == 4
+
 
 class TestFilesystemCounterHandler:
     def test_init_with_none_info_dir(self):
@@ -114,6 +132,109 @@ class TestFilesystemCounterHandler:
             result = handler.increment_counter("existing_entity")
             assert result == 6
 
+    def test_bulk_counters(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            handler = FilesystemCounterHandler(os.path.join(temp_dir, "counters"))
+            assert handler.read_counters(["a"]) == {"a": 0}
+            handler.set_counters({"a": 3, "b": 1})
+            assert handler.increment_counters(["a", "c", "c"]) == {"a": 4, "c": 2}
+            assert handler.read_counters(["a", "b", "c", "d"]) == {
+                "a": 4,
+                "b": 1,
+                "c": 2,
+                "d": 0,
+            }
+            assert handler.read_counter("c") == 2
+            with pytest.raises(ValueError):
+                handler.set_counters({"a": -1})
+            assert handler.read_counter("a") == 4
+
+    def test_bulk_counters_single_file_access(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            handler = FilesystemCounterHandler(temp_dir)
+            names = [f"entity_{i}" for i in range(50)]
+            with patch("builtins.open", wraps=open) as mock_open:
+                handler.increment_counters(names)
+            # The index does not exist yet, so it is only written once
+            assert mock_open.call_count == 1
+            with patch("builtins.open", wraps=open) as mock_open:
+                assert handler.read_counters(names) == dict.fromkeys(names, 1)
+            assert mock_open.call_count == 1
+
+    def test_cached_mode_reads_index_once(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            FilesystemCounterHandler(temp_dir).set_counters({"a": 1, "b": 2})
+            handler = FilesystemCounterHandler(temp_dir, cached=True)
+            with patch("builtins.open", wraps=open) as mock_open:
+                for _ in range(10):
+                    assert handler.read_counter("a") == 1
+                    handler.increment_counter("b")
+            assert mock_open.call_count == 1
+            assert handler.read_counter("b") == 12
+            # Nothing is written before flushing
+            assert FilesystemCounterHandler(temp_dir).read_counter("b") == 2
+
+            handler.flush()
+            assert FilesystemCounterHandler(temp_dir).read_counter("b") == 12
+            with patch("builtins.open", wraps=open) as mock_open:
+                handler.flush()
+            mock_open.assert_not_called()
+
+    def test_cached_mode_flushes_on_exit_and_every_n_updates(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with FilesystemCounterHandler(temp_dir, cached=True) as handler:
+                handler.set_counter(5, "a")
+                assert not os.listdir(temp_dir)
+            assert FilesystemCounterHandler(temp_dir).read_counter("a") == 5
+
+            handler = FilesystemCounterHandler(temp_dir, cached=True, flush_every=3)
+            handler.increment_counter("a")
+            handler.increment_counter("a")
+            assert FilesystemCounterHandler(temp_dir).read_counter("a") == 5
+            handler.increment_counter("b")
+            assert FilesystemCounterHandler(temp_dir).read_counters(["a", "b"]) == {
+                "a": 7,
+                "b": 1,
+            }
+
+        with pytest.raises(ValueError):
+            FilesystemCounterHandler("counters", flush_every=0)
+
+    def test_write_is_atomic(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            handler = FilesystemCounterHandler(temp_dir)
+            handler.set_counter(1, "a")
+            with patch(
+                "rdflib_ocdm.counter_handler.filesystem_counter_handler.json.dump",
+                side_effect=OSError("disk full"),
+            ):
+                with pytest.raises(OSError):
+                    handler.set_counter(2, "a")
+            assert os.listdir(temp_dir) == ["provenance_index.json"]
+            assert handler.read_counter("a") == 1
+
+    def test_sync_to_disk(self):
+        fsync = "rdflib_ocdm.counter_handler.filesystem_counter_handler.os.fsync"
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with patch(fsync) as mock_fsync:
+                FilesystemCounterHandler(temp_dir).increment_counter("a")
+            mock_fsync.assert_not_called()
+
+            with patch(fsync) as mock_fsync:
+                FilesystemCounterHandler(temp_dir, durable=True).increment_counter("a")
+            mock_fsync.assert_called_once()
+
+            with patch(fsync) as mock_fsync:
+                with FilesystemCounterHandler(temp_dir, cached=True) as handler:
+                    handler.increment_counter("a")
+                    handler.increment_counter("b")
+                    mock_fsync.assert_not_called()
+            mock_fsync.assert_called_once()
+            assert FilesystemCounterHandler(temp_dir).read_counters(["a", "b"]) == {
+                "a": 3,
+                "b": 1,
+            }
+
 
 class TestSqliteCounterHandler:
     def test_set_counter_valid_value(self):
@@ -209,3 +330,424 @@ class TestSqliteCounterHandler:
         finally:
             if os.path.exists(temp_db_path):
                 os.unlink(temp_db_path)
+
+    def test_bulk_counters(self):
+        with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as temp_db:
+            temp_db_path = temp_db.name
+        try:
+            handler = SqliteCounterHandler(temp_db_path)
+            names = [f"https://w3id.org/oc/meta/br/{i}" for i in range(2000)]
+            handler.set_counters({name: 1 for name in names[:1000]})
+            assert handler.increment_counters(names + [names[0]]) == {
+                **{name: 2 for name in names[:1000]},
+                **{name: 1 for name in names[1000:]},
+                names[0]: 3,
+            }
+            counters = handler.read_counters(names + ["missing"])
+            assert counters["missing"] == 0
+            assert counters[names[0]] == 3
+            assert counters[names[1999]] == 1
+            assert handler.read_counter(names[1]) == 2
+            with pytest.raises(ValueError):
+                handler.set_counters({names[0]: -1})
+            handler.close()
+        finally:
+            if os.path.exists(temp_db_path):
+                os.unlink(temp_db_path)
+
+    def test_pragmas(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            handler = SqliteCounterHandler(
+                os.path.join(temp_dir, "counters.db"), pragmas={"synchronous": "FULL"}
+            )
+            assert handler.cur.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            assert handler.cur.execute("PRAGMA synchronous").fetchone()[0] == 2
+            handler.close()
+
+    def test_batch_commits_once(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_db_path = os.path.join(temp_dir, "counters.db")
+            handler = SqliteCounterHandler(temp_db_path)
+            other = sqlite3.connect(temp_db_path)
+            with handler.batch():
+                handler.set_counter(5, "entity1")
+                assert handler.increment_counter("entity1") == 6
+                assert handler.increment_counters(["entity2", "entity2"]) == {
+                    "entity2": 2
+                }
+                assert other.execute("SELECT COUNT(*) FROM info").fetchone()[0] == 0
+            assert dict(other.execute("SELECT entity, count FROM info")) == {
+                "entity1": 6,
+                "entity2": 2,
+            }
+            other.close()
+            handler.close()
+
+    def test_batch_rolls_back_on_error(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            handler = SqliteCounterHandler(os.path.join(temp_dir, "counters.db"))
+            handler.set_counter(1, "entity1")
+            with pytest.raises(RuntimeError):
+                with handler.batch():
+                    handler.increment_counter("entity1")
+                    handler.begin()
+                    handler.set_counter(7, "entity2")
+                    handler.commit()
+                    raise RuntimeError
+            assert handler.read_counters(["entity1", "entity2"]) == {
+                "entity1": 1,
+                "entity2": 0,
+            }
+            handler.close()
+
+    def test_increment_counter_is_atomic(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_db_path = os.path.join(temp_dir, "counters.db")
+            handlers = [SqliteCounterHandler(temp_db_path) for _ in range(4)]
+
+            def increment(handler):
+                for _ in range(50):
+                    handler.increment_counter("entity")
+
+            threads = [threading.Thread(target=increment, args=(h,)) for h in handlers]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert handlers[0].read_counter("entity") == 200
+            for handler in handlers:
+                handler.close()
+
+
+class TestCachedCounterHandler:
+    def test_reads_are_cached(self):
+        inner = MagicMock(wraps=InMemoryCounterHandler())
+        inner.set_counter(4, "a")
+        handler = CachedCounterHandler(inner)
+        assert handler.read_counter("a") == 4
+        assert handler.read_counter("a") == 4
+        assert handler.increment_counter("a") == 5
+        assert handler.read_counters(["a", "b"]) == {"a": 5, "b": 0}
+        assert handler.read_counters(["a", "b"]) == {"a": 5, "b": 0}
+        assert inner.read_counter.call_count == 1
+        inner.read_counters.assert_called_once_with(["b"])
+        assert handler.stats() == {"hits": 5, "misses": 2, "evictions": 0, "size": 2}
+
+    def test_write_back(self):
+        inner = InMemoryCounterHandler()
+        with CachedCounterHandler(inner) as handler:
+            handler.set_counter(3, "a")
+            assert handler.increment_counters(["a", "b", "b"]) == {"a": 4, "b": 2}
+            assert inner.prov_counters == {}
+            with pytest.raises(ValueError):
+                handler.set_counter(-1, "a")
+        assert inner.prov_counters == {"a": 4, "b": 2}
+
+    def test_eviction_writes_back_dirty_counters(self):
+        inner = MagicMock(wraps=InMemoryCounterHandler())
+        handler = CachedCounterHandler(inner, max_size=2)
+        handler.set_counters({"a": 1, "b": 2})
+        handler.read_counter("a")
+        handler.set_counter(3, "c")
+        inner.set_counters.assert_called_once_with({"b": 2})
+        assert handler.stats()["evictions"] == 1
+        assert handler.read_counter("b") == 2
+        handler.clear()
+        assert handler.stats()["size"] == 0
+        assert inner.read_counters(["a", "b", "c"]) == {"a": 1, "b": 2, "c": 3}
+
+    def test_provenance_run_reads_each_counter_once(self):
+        inner = MagicMock(wraps=InMemoryCounterHandler())
+        handler = CachedCounterHandler(inner)
+        subject = URIRef("https://w3id.org/oc/meta/br/0601")
+        resp_agent = "https://orcid.org/0000-0002-8420-0696"
+        ocdm_graph = OCDMGraph(handler)
+        ocdm_graph.preexisting_finished(resp_agent=resp_agent)
+        for title in ("First", "Second", "Third"):
+            ocdm_graph.add(
+                (subject, URIRef("http://purl.org/dc/terms/title"), Literal(title)),
+                resp_agent=resp_agent,
+            )
+            ocdm_graph.generate_provenance()
+            ocdm_graph.commit_changes()
+        handler.flush()
+        assert inner.read_counter.call_count + inner.read_counters.call_count == 1
+        assert inner.read_counter(str(subject)) == 3
+        # Every later prefetch and increment is served by the cache
+        assert handler.stats()["hits"] == 5
+
+
+class TestCompactInMemoryCounterHandler:
+    names = [
+        "https://w3id.org/oc/meta/br/0601",
+        "https://w3id.org/oc/meta/br/601",
+        "https://w3id.org/oc/meta/br/06010",
+        "https://w3id.org/oc/meta/ra/0601",
+        "https://w3id.org/oc/meta/br/0",
+        "https://w3id.org/oc/meta/br/abc",
+        "https://w3id.org/oc/meta/br/" + "9" * 20,
+    ]
+
+    def test_counters(self):
+        handler = CompactInMemoryCounterHandler(initial_capacity=4)
+        handler.set_counters({name: i + 1 for i, name in enumerate(self.names)})
+        assert handler.read_counters(self.names) == {
+            name: i + 1 for i, name in enumerate(self.names)
+        }
+        assert handler.increment_counters(self.names + self.names[:1]) == {
+            name: i + 2 + (i == 0) for i, name in enumerate(self.names)
+        }
+        assert handler.increment_counter("https://w3id.org/oc/meta/id/0601") == 1
+        assert len(handler) == 8
+        with pytest.raises(ValueError):
+            handler.set_counter(-1, self.names[0])
+
+    def test_read_missing_counter_does_not_store_it(self):
+        handler = CompactInMemoryCounterHandler()
+        handler.set_counter(3, "https://w3id.org/oc/meta/br/0601")
+        assert handler.read_counter("https://w3id.org/oc/meta/br/0602") == 0
+        assert handler.read_counter("https://w3id.org/oc/meta/ar/0601") == 0
+        assert handler.read_counter("https://w3id.org/oc/meta/br/abc") == 0
+        assert len(handler) == 1
+        assert handler._prefixes == {"https://w3id.org/oc/meta/br/0": 0}
+
+    def test_grows(self):
+        handler = CompactInMemoryCounterHandler(initial_capacity=8)
+        names = [
+            f"https://w3id.org/oc/meta/{t}/06{i}" for t in "ab" for i in range(500)
+        ]
+        for name in names:
+            handler.increment_counter(name)
+        handler.increment_counters(names[::3])
+        assert len(handler._keys) == 2048
+        assert handler.read_counters(names) == {
+            name: 1 + (i % 3 == 0) for i, name in enumerate(names)
+        }
+
+    def test_reads_while_growing(self):
+        handler = CompactInMemoryCounterHandler(initial_capacity=8)
+        handler.set_counter(5, "https://w3id.org/oc/meta/br/0601")
+        done = threading.Event()
+        errors: list = []
+
+        def read():
+            try:
+                while not done.is_set():
+                    assert handler.read_counter("https://w3id.org/oc/meta/br/0601") == 5
+                    assert handler.read_counters(
+                        ["https://w3id.org/oc/meta/br/0601"]
+                    ) == {"https://w3id.org/oc/meta/br/0601": 5}
+            except Exception as e:
+                errors.append(e)
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        for i in range(60000):
+            handler.increment_counter(f"https://w3id.org/oc/meta/br/07{i}")
+        done.set()
+        reader.join()
+        assert errors == []
+
+    def test_snapshot_and_restore(self):
+        handler = CompactInMemoryCounterHandler()
+        handler.set_counters({name: i + 1 for i, name in enumerate(self.names)})
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "counters.snapshot")
+            handler.snapshot(file_path)
+            assert os.listdir(temp_dir) == ["counters.snapshot"]
+            restored = CompactInMemoryCounterHandler.restore(file_path)
+            assert restored.read_counters(self.names) == handler.read_counters(
+                self.names
+            )
+            assert restored.increment_counter(self.names[0]) == 2
+            assert len(restored) == len(self.names)
+
+            with open(file_path, "wb") as f:
+                f.write(b"not a snapshot")
+            with pytest.raises(ValueError):
+                CompactInMemoryCounterHandler.restore(file_path)
+
+
+class TestMmapCounterHandler:
+    def test_counters(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with MmapCounterHandler(os.path.join(temp_dir, "counters.bin")) as handler:
+                assert handler.read_counter("missing") == 0
+                handler.set_counter(5, "entity1")
+                assert handler.increment_counter("entity1") == 6
+                assert handler.increment_counter("entity2") == 1
+                handler.set_counter(0, "entity2")
+                assert handler.read_counters(["entity1", "entity2", "missing"]) == {
+                    "entity1": 6,
+                    "entity2": 0,
+                    "missing": 0,
+                }
+                assert handler.increment_counters(["entity3", "entity3"]) == {
+                    "entity3": 2
+                }
+                assert len(handler) == 3
+                with pytest.raises(ValueError):
+                    handler.set_counter(-1, "entity1")
+                with pytest.raises(ValueError):
+                    handler.set_counters({"entity4": 1, "entity1": -1})
+                assert handler.read_counter("entity4") == 0
+
+    def test_grows_and_persists(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "counters.bin")
+            names = [f"https://w3id.org/oc/meta/br/06{i}" for i in range(1000)]
+            handler = MmapCounterHandler(file_path, initial_capacity=4)
+            handler.set_counters({name: i for i, name in enumerate(names)})
+            for name in names[::2]:
+                handler.increment_counter(name)
+            handler.close()
+            assert os.listdir(temp_dir) == ["counters.bin"]
+
+            handler = MmapCounterHandler(file_path, initial_capacity=4)
+            assert len(handler) == 1000
+            assert handler._capacity == 2048
+            assert handler.read_counters(names) == {
+                name: i + (i % 2 == 0) for i, name in enumerate(names)
+            }
+            handler.close()
+
+    def test_reads_while_growing(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "counters.bin")
+            with MmapCounterHandler(file_path, initial_capacity=4) as handler:
+                handler.set_counter(7, "entity")
+                done = threading.Event()
+                errors: list = []
+
+                def read():
+                    try:
+                        while not done.is_set():
+                            assert handler.read_counter("entity") == 7
+                    except Exception as e:
+                        errors.append(e)
+
+                reader = threading.Thread(target=read)
+                reader.start()
+                for i in range(20000):
+                    handler.set_counter(i, f"e{i}")
+                done.set()
+                reader.join()
+                assert errors == []
+
+    def test_recovers_unclean_file(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "counters.bin")
+            handler = MmapCounterHandler(file_path, initial_capacity=16)
+            handler.set_counters({"a": 1, "b": 2, "c": 3})
+            handler.flush()
+            # Simulates a process that dies between filling a slot and
+            # updating the header
+            handler._count = 1
+            handler._write_header(clean=False)
+            handler._mm.flush()
+            with open(file_path, "rb") as f:
+                crashed = f.read()
+            handler.close()
+            with open(file_path, "wb") as f:
+                f.write(crashed)
+
+            with MmapCounterHandler(file_path) as handler:
+                assert len(handler) == 3
+                assert handler.read_counter("c") == 3
+
+    def test_counts_used_slots_in_blocks(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "counters.bin")
+            names = [f"https://w3id.org/oc/meta/br/06{i}" for i in range(300)]
+            with patch(
+                "rdflib_ocdm.counter_handler.mmap_counter_handler._SCAN_SLOTS", 100
+            ):
+                with MmapCounterHandler(file_path, initial_capacity=1000) as handler:
+                    handler.increment_counters(names)
+                    handler._write_header(clean=False)
+                    handler._mm.flush()
+                    handler._mm.close()
+                    handler._file.close()
+                with MmapCounterHandler(file_path) as handler:
+                    assert len(handler) == 300
+
+    def test_rejects_other_files(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "counters.bin")
+            with open(file_path, "wb") as f:
+                f.write(b"not a counter file" * 10)
+            with pytest.raises(ValueError):
+                MmapCounterHandler(file_path)
+        with pytest.raises(ValueError):
+            MmapCounterHandler("")
+
+
+class TestShardedFilesystemCounterHandler:
+    names = [f"https://w3id.org/oc/meta/br/06{i}" for i in range(200)]
+
+    def test_counters_spread_over_shards(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            handler = FilesystemCounterHandler(temp_dir, sharded=True, n_shards=16)
+            handler.set_counters({name: i for i, name in enumerate(self.names)})
+            assert handler.increment_counter(self.names[10]) == 11
+            assert handler.read_counters(self.names[:3]) == {
+                self.names[0]: 0,
+                self.names[1]: 1,
+                self.names[2]: 2,
+            }
+            shards_dir = os.path.join(temp_dir, "provenance_index")
+            shard_files = sorted(os.listdir(shards_dir))
+            assert len(shard_files) == 17
+            assert "layout.json" in shard_files
+            assert not os.path.exists(os.path.join(temp_dir, "provenance_index.json"))
+
+            with patch("builtins.open", wraps=open) as mock_open:
+                handler.increment_counter(self.names[20])
+            # One shard read and one shard written
+            assert mock_open.call_count == 2
+
+            # The number of shards is taken from the existing index
+            reopened = FilesystemCounterHandler(temp_dir, sharded=True, n_shards=4)
+            assert reopened.n_shards == 16
+            assert reopened.read_counter(self.names[20]) == 21
+
+    def test_cached_sharded_flush_writes_dirty_shards_only(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            FilesystemCounterHandler(temp_dir, sharded=True, n_shards=16).set_counters(
+                dict.fromkeys(self.names, 1)
+            )
+            with FilesystemCounterHandler(
+                temp_dir, sharded=True, cached=True
+            ) as handler:
+                handler.increment_counter(self.names[0])
+                with patch("builtins.open", wraps=open) as mock_open:
+                    handler.flush()
+                assert mock_open.call_count == 1
+            assert (
+                FilesystemCounterHandler(temp_dir, sharded=True).read_counter(
+                    self.names[0]
+                )
+                == 2
+            )
+
+    def test_migrate_to_sharded(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            single_file = FilesystemCounterHandler(temp_dir)
+            single_file.set_counters({name: i for i, name in enumerate(self.names)})
+
+            with pytest.raises(ValueError, match="migrate_to_sharded"):
+                FilesystemCounterHandler(temp_dir, sharded=True)
+
+            handler = FilesystemCounterHandler.migrate_to_sharded(
+                temp_dir, n_shards=8, cached=True
+            )
+            assert handler.sharded and handler.cached
+            assert handler.read_counters(self.names) == {
+                name: i for i, name in enumerate(self.names)
+            }
+            assert not os.path.exists(os.path.join(temp_dir, "provenance_index.json"))
+
+            with pytest.raises(ValueError, match="sharded=True"):
+                FilesystemCounterHandler(temp_dir)
+            with pytest.raises(ValueError):
+                FilesystemCounterHandler.migrate_to_sharded(temp_dir)
@@ -2,10 +2,12 @@
 #
 # SPDX-License-Identifier: ISC
 
+import os
+import random
 import warnings
 
 import pytest
-from rdflib import Literal, Namespace, URIRef
+from rdflib import Dataset, Graph, Literal, Namespace, URIRef
 
 from rdflib_ocdm.counter_handler.in_memory_counter_handler import InMemoryCounterHandler
 from rdflib_ocdm.ocdm_graph import OCDMConjunctiveGraph, OCDMDataset, OCDMGraph
@@ -89,6 +91,103 @@ class TestOCDMGraph:
         assert entity_b in ocdm_graph.entity_index
         assert ocdm_graph.entity_index[entity_b]["to_be_deleted"]
 
+    @pytest.mark.parametrize("graph_class", [OCDMGraph, OCDMDataset])
+    def test_merge_many_matches_merge(self, graph_class):
+        def build():
+            ocdm_graph = graph_class(counter_handler=InMemoryCounterHandler())
+            for i in range(6):
+                entity = URIRef(f"http://example.org/person/{i}")
+                ocdm_graph.add((entity, self.FOAF.name, Literal(f"Person {i}")))
+                ocdm_graph.add((entity, self.FOAF.knows, URIRef(f"{entity}0")))
+                doc = URIRef(f"http://example.org/doc/{i}")
+                ocdm_graph.add((doc, self.DCTERMS.creator, entity))
+            ocdm_graph.preexisting_finished()
+            return ocdm_graph
+
+        person = [URIRef(f"http://example.org/person/{i}") for i in range(6)]
+
+        sequential = build()
+        sequential.merge(person[0], person[1])
+        sequential.merge(person[0], person[2])
+        sequential.merge(person[3], person[4])
+
+        bulk = build()
+        bulk.merge_many({person[0]: [person[1], person[2]], person[3]: [person[4]]})
+
+        assert set(bulk) == set(sequential)
+        assert bulk.merge_index == sequential.merge_index
+        assert bulk.entity_index == sequential.entity_index
+        assert bulk.dirty_subjects == sequential.dirty_subjects
+
+    def test_merge_many_resolves_chains(self):
+        ocdm_graph = OCDMGraph(counter_handler=self.counter_handler)
+
+        entity_a = URIRef("http://example.org/entity/a")
+        entity_b = URIRef("http://example.org/entity/b")
+        entity_c = URIRef("http://example.org/entity/c")
+        doc = URIRef("http://example.org/doc/1")
+
+        ocdm_graph.add((entity_a, self.FOAF.name, Literal("A")))
+        ocdm_graph.add((entity_b, self.FOAF.knows, entity_c))
+        ocdm_graph.add((doc, self.DCTERMS.creator, entity_b))
+        ocdm_graph.add((doc, self.DCTERMS.contributor, entity_c))
+
+        ocdm_graph.preexisting_finished()
+
+        ocdm_graph.merge_many({entity_b: [entity_c], entity_a: [entity_b]})
+
+        assert set(ocdm_graph) == {
+            (entity_a, self.FOAF.name, Literal("A")),
+            (doc, self.DCTERMS.creator, entity_a),
+            (doc, self.DCTERMS.contributor, entity_a),
+        }
+        assert ocdm_graph.merge_index[entity_a] == {entity_b, entity_c}
+        assert entity_b not in ocdm_graph.merge_index
+        assert ocdm_graph.entity_index[entity_b]["to_be_deleted"]
+        assert ocdm_graph.entity_index[entity_c]["to_be_deleted"]
+
+    def test_merge_many_rejects_conflicts_and_cycles(self):
+        ocdm_graph = OCDMGraph(counter_handler=self.counter_handler)
+
+        entity_a = URIRef("http://example.org/entity/a")
+        entity_b = URIRef("http://example.org/entity/b")
+        entity_c = URIRef("http://example.org/entity/c")
+
+        with pytest.raises(ValueError):
+            ocdm_graph.merge_many({entity_a: [entity_c], entity_b: [entity_c]})
+        with pytest.raises(ValueError):
+            ocdm_graph.merge_many({entity_a: [entity_b], entity_b: [entity_a]})
+        assert ocdm_graph.merge_index == {}
+
+    def test_merge_many_with_provenance(self):
+        ocdm_graph = OCDMDataset(counter_handler=self.counter_handler)
+
+        entity_a = URIRef("http://example.org/id/1")
+        entity_b = URIRef("http://example.org/id/2")
+        entity_c = URIRef("http://example.org/id/3")
+        graph = Graph(identifier=URIRef("http://example.org/id/"))
+
+        for entity in (entity_a, entity_b, entity_c):
+            ocdm_graph.add((entity, self.DCTERMS.title, Literal(str(entity)), graph))
+
+        ocdm_graph.preexisting_finished()
+
+        ocdm_graph.merge_many({entity_a: [entity_b, entity_c]})
+        ocdm_graph.generate_provenance()
+
+        se_a_2 = ocdm_graph.get_entity(f"{entity_a}/prov/se/2")
+        assert se_a_2 is not None
+        assert set(se_a_2.get_derives_from()) == {
+            ocdm_graph.get_entity(f"{entity}/prov/se/1")
+            for entity in (entity_a, entity_b, entity_c)
+        }
+        for entity in (entity_b, entity_c):
+            snapshot = ocdm_graph.get_entity(f"{entity}/prov/se/2")
+            assert snapshot is not None
+            description = snapshot.get_description()
+            assert description is not None
+            assert description.endswith("has been deleted.")
+
     def test_backward_compatibility_ocdm_conjunctive_graph(self):
         with warnings.catch_warnings(record=True) as w:
             warnings.simplefilter("always")
@@ -110,3 +209,491 @@ class TestOCDMGraph:
             entity = URIRef("http://example.org/entity")
             ocdm_graph.add((entity, self.FOAF.name, Literal("Test")))
             assert len(list(ocdm_graph.quads((entity, None, None, None)))) == 1
+
+    def test_track_changes_does_not_copy_graph(self):
+        ocdm_graph = OCDMGraph(counter_handler=self.counter_handler, track_changes=True)
+        entity = URIRef("http://example.org/person/alice")
+        ocdm_graph.add((entity, self.FOAF.name, Literal("Alice")))
+        ocdm_graph.add((entity, self.FOAF.age, Literal(30)))
+
+        ocdm_graph.preexisting_finished()
+
+        assert len(ocdm_graph.preexisting_graph) == 0
+        assert set(ocdm_graph.get_preexisting_subgraph(entity)) == {
+            (entity, self.FOAF.name, Literal("Alice")),
+            (entity, self.FOAF.age, Literal(30)),
+        }
+
+    def test_track_changes_preexisting_subgraph(self):
+        ocdm_graph = OCDMGraph(counter_handler=self.counter_handler, track_changes=True)
+        entity = URIRef("http://example.org/person/alice")
+        ocdm_graph.add((entity, self.FOAF.name, Literal("Alice")))
+        ocdm_graph.add((entity, self.FOAF.age, Literal(30)))
+        ocdm_graph.preexisting_finished()
+
+        ocdm_graph.remove((entity, self.FOAF.age, None))
+        ocdm_graph.add((entity, self.FOAF.age, Literal(31)))
+        ocdm_graph.add((entity, self.FOAF.nick, Literal("Al")))
+        ocdm_graph.remove((entity, self.FOAF.nick, Literal("Al")))
+        ocdm_graph.remove((entity, self.FOAF.name, Literal("Alice")))
+        ocdm_graph.add((entity, self.FOAF.name, Literal("Alice")))
+
+        assert set(ocdm_graph.get_preexisting_subgraph(entity)) == {
+            (entity, self.FOAF.name, Literal("Alice")),
+            (entity, self.FOAF.age, Literal(30)),
+        }
+        assert ocdm_graph.get_entity_changes(entity) == (
+            [(entity, self.FOAF.age, Literal(30))],
+            [(entity, self.FOAF.age, Literal(31))],
+        )
+
+        ocdm_graph.commit_changes()
+        assert ocdm_graph.get_entity_changes(entity) == ([], [])
+        assert set(ocdm_graph.get_preexisting_subgraph(entity)) == {
+            (entity, self.FOAF.name, Literal("Alice")),
+            (entity, self.FOAF.age, Literal(31)),
+        }
+
+    def test_track_changes_before_baseline(self):
+        ocdm_graph = OCDMGraph(counter_handler=self.counter_handler, track_changes=True)
+        entity = URIRef("http://example.org/person/alice")
+        ocdm_graph.add((entity, self.FOAF.name, Literal("Alice")))
+
+        assert ocdm_graph.get_entity_changes(entity) is None
+        assert len(ocdm_graph.get_preexisting_subgraph(entity)) == 0
+
+    def test_track_changes_dataset_matches_copy(self):
+        graph_iri = Graph(identifier=URIRef("http://example.org/graph/"))
+        entity = URIRef("http://example.org/person/alice")
+        queries = []
+        for track_changes in (False, True):
+            ocdm_dataset = OCDMDataset(
+                counter_handler=InMemoryCounterHandler(), track_changes=track_changes
+            )
+            ocdm_dataset.add((entity, self.FOAF.name, Literal("Alice"), graph_iri))
+            ocdm_dataset.preexisting_finished()
+            ocdm_dataset.remove((entity, self.FOAF.name, None, graph_iri))
+            ocdm_dataset.add((entity, self.FOAF.name, Literal("Alicia"), graph_iri))
+            ocdm_dataset.generate_provenance()
+            snapshot = ocdm_dataset.get_entity(f"{entity}/prov/se/2")
+            assert snapshot is not None
+            queries.append(snapshot.get_update_action())
+        assert queries[0] is not None
+        assert queries[0] == queries[1]
+
+    def test_track_changes_dataset_remove_from_one_graph(self):
+        entity = URIRef("http://example.org/id/1")
+        graph_1 = Graph(identifier=URIRef("http://example.org/graph/1/"))
+        graph_2 = Graph(identifier=URIRef("http://example.org/graph/2/"))
+        ocdm_dataset = OCDMDataset(
+            counter_handler=self.counter_handler, track_changes=True
+        )
+        ocdm_dataset.add((entity, self.DCTERMS.title, Literal("A"), graph_1))
+        ocdm_dataset.preexisting_finished()
+
+        ocdm_dataset.add((entity, self.FOAF.knows, entity, graph_1))
+        ocdm_dataset.add((entity, self.FOAF.knows, entity, graph_2))
+        ocdm_dataset.remove((entity, self.FOAF.knows, None, graph_1))
+
+        assert ocdm_dataset.get_entity_changes(entity) == (
+            [],
+            [(entity, self.FOAF.knows, entity, graph_2.identifier)],
+        )
+
+    @pytest.mark.parametrize("seed", range(30))
+    def test_track_changes_dataset_matches_copy_across_graphs(self, seed):
+        entities = [URIRef(f"http://example.org/id/{i}") for i in range(4)]
+        graphs = [
+            Graph(identifier=URIRef("http://example.org/graph/1/")),
+            Graph(identifier=URIRef("http://example.org/graph/2/")),
+        ]
+        predicates = [self.FOAF.knows, self.DCTERMS.title]
+
+        def random_quad(rng):
+            o = rng.choice(entities + [Literal("A"), Literal("B")])
+            return (
+                rng.choice(entities),
+                rng.choice(predicates),
+                o,
+                rng.choice(graphs),
+            )
+
+        results = []
+        for track_changes in (False, True):
+            rng = random.Random(seed)
+            ocdm_dataset = OCDMDataset(
+                counter_handler=InMemoryCounterHandler(), track_changes=track_changes
+            )
+            for _ in range(8):
+                ocdm_dataset.add(random_quad(rng))
+            ocdm_dataset.preexisting_finished()
+            for _ in range(25):
+                operation = rng.random()
+                if operation < 0.4:
+                    ocdm_dataset.add(random_quad(rng))
+                elif operation < 0.75:
+                    s, p, o, c = random_quad(rng)
+                    if rng.random() < 0.5:
+                        o = None
+                    ocdm_dataset.remove((s, p, o, c))
+                elif operation < 0.9:
+                    ocdm_dataset.addN([random_quad(rng) for _ in range(3)])
+                else:
+                    res, other = rng.sample(entities, 2)
+                    if not ocdm_dataset.entity_index.get(other, {}).get(
+                        "to_be_deleted"
+                    ):
+                        ocdm_dataset.merge(res, other)
+            baseline = dict()
+            for entity in entities:
+                subgraph = ocdm_dataset.get_preexisting_subgraph(entity)
+                assert isinstance(subgraph, Dataset)
+                baseline[entity] = set(subgraph.quads((None, None, None, None)))
+            results.append(baseline)
+        assert results[0] == results[1]
+
+    def test_track_changes_dataset_parse_after_baseline(self):
+        ocdm_dataset = OCDMDataset(
+            counter_handler=self.counter_handler, track_changes=True
+        )
+        ocdm_dataset.preexisting_finished()
+        ocdm_dataset.parse(os.path.join("test", "br_small.nq"))
+
+        entity = URIRef("https://w3id.org/oc/meta/br/0605")
+        changes = ocdm_dataset.get_entity_changes(entity)
+        assert changes is not None
+        removed, added = changes
+        assert removed == []
+        assert len(added) == len(list(ocdm_dataset.quads((entity, None, None, None))))
+        assert len(ocdm_dataset.get_preexisting_subgraph(entity)) == 0
+
+    def test_dataset_parse_registers_only_parsed_subjects(self):
+        ocdm_dataset = OCDMDataset(counter_handler=self.counter_handler)
+        ocdm_dataset.parse(os.path.join("test", "br_small.nq"))
+        ocdm_dataset.commit_changes()
+
+        entity = URIRef("http://example.org/id/1")
+        graph = URIRef("http://example.org/id/")
+        ocdm_dataset.parse(
+            data=f'<{entity}> <{self.DCTERMS.title}> "Title" <{graph}> .\n',
+            format="nquads",
+        )
+
+        assert set(ocdm_dataset.entity_index) == {entity}
+        assert ocdm_dataset.entity_index[entity]["graph_iri"] == graph
+        assert ocdm_dataset.dirty_subjects == {entity}
+        assert all(
+            context.store is ocdm_dataset.store for context in ocdm_dataset.contexts()
+        )
+
+    def test_dataset_parse_registers_replaced_subjects(self):
+        ocdm_dataset = OCDMDataset(counter_handler=self.counter_handler)
+        entity_a = URIRef("http://example.org/id/1")
+        entity_b = URIRef("http://example.org/id/2")
+        graph = URIRef("http://example.org/id/")
+        context = Graph(identifier=graph)
+        ocdm_dataset.add((entity_a, self.DCTERMS.title, Literal("A"), context))
+        ocdm_dataset.add((entity_b, self.DCTERMS.title, Literal("B"), context))
+        ocdm_dataset.add(
+            (
+                entity_b,
+                self.DCTERMS.creator,
+                entity_a,
+                Graph(identifier=URIRef("http://example.org/other/")),
+            )
+        )
+        ocdm_dataset.commit_changes()
+
+        ocdm_dataset.parse(
+            data=f'<{entity_a}> <{self.DCTERMS.title}> "A" .\n',
+            format="nt",
+            publicID=str(graph),
+        )
+
+        assert ocdm_dataset.dirty_subjects == {entity_a, entity_b}
+        assert set(ocdm_dataset.entity_index) == {entity_a, entity_b}
+        assert ocdm_dataset.entity_index[entity_a]["graph_iri"] == graph
+        assert ocdm_dataset.entity_index[entity_b]["graph_iri"] == URIRef(
+            "http://example.org/other/"
+        )
+
+    def test_graph_parse_registers_only_parsed_subjects(self):
+        ocdm_graph = OCDMGraph(counter_handler=self.counter_handler, track_changes=True)
+        entity_a = URIRef("http://example.org/id/1")
+        entity_b = URIRef("http://example.org/id/2")
+        ocdm_graph.add((entity_a, self.DCTERMS.title, Literal("A")))
+        ocdm_graph.preexisting_finished()
+        ocdm_graph.commit_changes()
+
+        ocdm_graph.parse(
+            data=(
+                f'<{entity_a}> <{self.DCTERMS.title}> "A" .\n'
+                f'<{entity_b}> <{self.DCTERMS.title}> "B" .\n'
+            ),
+            format="nt",
+        )
+
+        assert set(ocdm_graph.entity_index) == {entity_a, entity_b}
+        assert ocdm_graph.get_entity_changes(entity_a) == ([], [])
+        assert ocdm_graph.get_entity_changes(entity_b) == (
+            [],
+            [(entity_b, self.DCTERMS.title, Literal("B"))],
+        )
+
+    def test_parse_stream_dataset(self):
+        source = os.path.join("test", "br.nq")
+        expected = OCDMDataset(counter_handler=InMemoryCounterHandler())
+        expected.parse(source)
+
+        ocdm_dataset = OCDMDataset(counter_handler=self.counter_handler)
+        provenance = ocdm_dataset.provenance
+        quads: set = set()
+        chunk_sizes = []
+        for chunk_size in ocdm_dataset.parse_stream(source, chunk_triples=5):
+            assert ocdm_dataset.provenance is provenance
+            assert len(provenance) == 0
+            chunk_sizes.append(chunk_size)
+            chunk_quads = set(ocdm_dataset.quads((None, None, None, None)))
+            assert len(chunk_quads) == chunk_size
+            subjects = {quad[0] for quad in chunk_quads}
+            assert set(ocdm_dataset.entity_index) == subjects
+            assert not subjects & {quad[0] for quad in quads}
+            ocdm_dataset.generate_provenance()
+            quads |= chunk_quads
+
+        assert len(chunk_sizes) > 1
+        assert all(chunk_size >= 5 for chunk_size in chunk_sizes[:-1])
+        assert quads == set(expected.quads((None, None, None, None)))
+        assert len(ocdm_dataset) == 0
+        assert ocdm_dataset.entity_index == {}
+        assert ocdm_dataset.get_entity(f"{next(iter(quads))[0]}/prov/se/1") is None
+        assert self.counter_handler.read_counter(str(next(iter(quads))[0])) == 1
+
+    def test_parse_stream_graph(self, tmp_path):
+        entities = [URIRef(f"http://example.org/id/{i}") for i in range(5)]
+        source = tmp_path / "data.nt"
+        source.write_text(
+            "# comment\n\n"
+            + "".join(
+                f'<{entity}> <{predicate}> "{entity}" .\n'
+                for entity in entities
+                for predicate in (self.DCTERMS.title, self.FOAF.name)
+            )
+        )
+
+        ocdm_graph = OCDMGraph(counter_handler=self.counter_handler)
+        ocdm_graph.bind("ex", "http://example.org/id/")
+        with open(source, encoding="utf-8") as f:
+            chunks = []
+            for _ in ocdm_graph.parse_stream(f, chunk_triples=3):
+                chunks.append(set(ocdm_graph.subjects(unique=True)))
+                assert ocdm_graph.namespace_manager.store.namespace("ex") == URIRef(
+                    "http://example.org/id/"
+                )
+
+        assert chunks == [
+            {entities[0], entities[1]},
+            {entities[2], entities[3]},
+            {entities[4]},
+        ]
+
+        with pytest.raises(ValueError):
+            next(ocdm_graph.parse_stream(source, format="turtle"))
+
+    @pytest.mark.parametrize("max_workers", [1, 2])
+    def test_parse_parallel(self, max_workers):
+        source = os.path.join("test", "br.nq")
+        expected = OCDMDataset(counter_handler=InMemoryCounterHandler())
+        expected.parse(source)
+
+        ocdm_dataset = OCDMDataset(counter_handler=self.counter_handler)
+        ocdm_dataset.parse_parallel(source, max_workers=max_workers, chunk_bytes=500)
+
+        assert set(ocdm_dataset.quads((None, None, None, None))) == set(
+            expected.quads((None, None, None, None))
+        )
+        assert ocdm_dataset.entity_index == expected.entity_index
+        assert ocdm_dataset.dirty_subjects == expected.dirty_subjects
+
+    def test_parse_parallel_blank_nodes_and_default_graph(self, tmp_path):
+        entity = URIRef("http://example.org/id/1")
+        graph = URIRef("http://example.org/id/")
+        source = tmp_path / "data.nq"
+        source.write_text(
+            f"<{entity}> <{self.DCTERMS.creator}> _:b0 .\n"
+            + f'<{entity}> <{self.DCTERMS.title}> "A"@en <{graph}> .\n' * 20
+            + f"<{entity}> <{self.DCTERMS.contributor}> _:b0 .\n"
+        )
+
+        ocdm_dataset = OCDMDataset(counter_handler=self.counter_handler)
+        ocdm_dataset.parse_parallel(
+            source, max_workers=1, chunk_bytes=16, publicID=str(graph)
+        )
+
+        creators = {
+            quad[2] for quad in ocdm_dataset.quads((entity, self.DCTERMS.creator, None))
+        }
+        contributors = {
+            quad[2]
+            for quad in ocdm_dataset.quads((entity, self.DCTERMS.contributor, None))
+        }
+        assert len(creators) == 1
+        assert creators == contributors
+        assert {quad[3] for quad in ocdm_dataset.quads((entity, None, None, None))} == {
+            graph
+        }
+        assert len(ocdm_dataset) == 3
+        assert ocdm_dataset.entity_index[entity]["graph_iri"] == graph
+
+    def test_parse_parallel_without_public_id(self, tmp_path):
+        entity = URIRef("http://example.org/id/1")
+        source = tmp_path / "data.nq"
+        source.write_text(f'<{entity}> <{self.DCTERMS.title}> "A" .\n')
+
+        ocdm_dataset = OCDMDataset(counter_handler=self.counter_handler)
+        with warnings.catch_warnings():
+            warnings.filterwarnings(
+                "error", category=DeprecationWarning, module="rdflib_ocdm"
+            )
+            ocdm_dataset.parse_parallel(source, max_workers=1)
+
+        assert (entity, self.DCTERMS.title, Literal("A")) in (
+            ocdm_dataset.default_graph
+        )
+
+    @pytest.mark.parametrize("track_changes", [False, True])
+    def test_addn_matches_add_graph(self, track_changes):
+        entities = [URIRef(f"http://example.org/id/{i}") for i in range(3)]
+        triples = [
+            (entity, predicate, Literal(f"{entity} {predicate}"))
+            for entity in entities
+            for predicate in (self.DCTERMS.title, self.FOAF.name)
+        ]
+        agent = URIRef("https://orcid.org/0000-0002-8420-0696")
+
+        expected = OCDMGraph(
+            counter_handler=InMemoryCounterHandler(), track_changes=track_changes
+        )
+        expected.add(triples[0])
+        expected.preexisting_finished()
+        for triple in triples:
+            expected.add(triple, resp_agent=agent)
+
+        ocdm_graph = OCDMGraph(
+            counter_handler=self.counter_handler, track_changes=track_changes
+        )
+        ocdm_graph.add(triples[0])
+        ocdm_graph.preexisting_finished()
+        other = OCDMGraph(counter_handler=self.counter_handler)
+        ocdm_graph.addN(
+            [(*triple, ocdm_graph) for triple in triples]
+            + [(entities[0], self.FOAF.knows, entities[1], other)],
+            resp_agent=agent,
+        )
+
+        assert set(ocdm_graph) == set(expected)
+        assert ocdm_graph.entity_index == expected.entity_index
+        assert ocdm_graph.dirty_subjects == expected.dirty_subjects
+        for entity in entities:
+            assert ocdm_graph.get_entity_changes(entity) == expected.get_entity_changes(
+                entity
+            )
+
+    @pytest.mark.parametrize("track_changes", [False, True])
+    def test_addn_matches_add_dataset(self, track_changes):
+        entities = [URIRef(f"http://example.org/id/{i}") for i in range(3)]
+        graph = URIRef("http://example.org/id/")
+        quads = [
+            (entity, predicate, Literal(f"{entity} {predicate}"), context)
+            for entity in entities
+            for predicate, context in (
+                (self.DCTERMS.title, None),
+                (self.FOAF.name, Graph(identifier=graph)),
+            )
+        ]
+        source = URIRef("https://api.crossref.org/")
+
+        expected = OCDMDataset(
+            counter_handler=InMemoryCounterHandler(), track_changes=track_changes
+        )
+        expected.add(quads[1])
+        expected.preexisting_finished()
+        for s, p, o, c in quads:
+            # A triple goes to the default graph
+            if c is None:
+                expected.add((s, p, o), primary_source=source)
+            else:
+                expected.add((s, p, o, c), primary_source=source)
+
+        ocdm_dataset = OCDMDataset(
+            counter_handler=self.counter_handler, track_changes=track_changes
+        )
+        ocdm_dataset.add(quads[1])
+        ocdm_dataset.preexisting_finished()
+        with warnings.catch_warnings():
+            warnings.filterwarnings(
+                "error", category=DeprecationWarning, module="rdflib_ocdm"
+            )
+            ocdm_dataset.addN(quads, primary_source=source)
+
+        assert set(ocdm_dataset.quads((None, None, None, None))) == set(
+            expected.quads((None, None, None, None))
+        )
+        assert ocdm_dataset.entity_index == expected.entity_index
+        assert ocdm_dataset.entity_index[entities[0]]["graph_iri"] == graph
+        assert ocdm_dataset.dirty_subjects == expected.dirty_subjects
+        for entity in entities:
+            assert ocdm_dataset.get_entity_changes(
+                entity
+            ) == expected.get_entity_changes(entity)
+
+    def test_addn_checks_terms_before_adding(self):
+        ocdm_dataset = OCDMDataset(counter_handler=self.counter_handler)
+        entity = URIRef("http://example.org/id/1")
+
+        with pytest.raises(AssertionError):
+            ocdm_dataset.addN(
+                [
+                    (entity, self.DCTERMS.title, Literal("A"), None),
+                    (entity, self.DCTERMS.title, "B", None),
+                ]
+            )
+        assert len(ocdm_dataset) == 0
+        assert ocdm_dataset.entity_index == {}
+
+    def test_dirty_subjects(self):
+        ocdm_graph = OCDMGraph(counter_handler=self.counter_handler)
+        entity_a = URIRef("http://example.org/person/alice")
+        entity_b = URIRef("http://example.org/person/bob")
+        entity_c = URIRef("http://example.org/person/carol")
+        doc = URIRef("http://example.org/doc/1")
+        ocdm_graph.add((entity_a, self.FOAF.name, Literal("Alice")))
+        ocdm_graph.add((entity_b, self.FOAF.name, Literal("Bob")))
+        ocdm_graph.add((entity_c, self.FOAF.name, Literal("Carol")))
+        ocdm_graph.add((doc, self.DCTERMS.creator, entity_b))
+        assert ocdm_graph.dirty_subjects == {entity_a, entity_b, entity_c, doc}
+
+        ocdm_graph.preexisting_finished()
+        assert ocdm_graph.dirty_subjects == set()
+
+        ocdm_graph.remove((None, self.FOAF.name, Literal("Carol")))
+        assert ocdm_graph.dirty_subjects == {entity_c}
+
+        ocdm_graph.merge(entity_a, entity_b)
+        assert ocdm_graph.dirty_subjects == {entity_a, entity_b, entity_c, doc}
+
+        ocdm_graph.commit_changes()
+        assert ocdm_graph.dirty_subjects == set()
+
+        ocdm_graph.entity_index[entity_a] = {"to_be_deleted": False}
+        ocdm_graph.mark_as_deleted(entity_a)
+        assert ocdm_graph.dirty_subjects == {entity_a}
+
+    def test_dirty_subjects_dataset_parse(self):
+        ocdm_dataset = OCDMDataset(counter_handler=self.counter_handler)
+        ocdm_dataset.preexisting_finished()
+        ocdm_dataset.parse(os.path.join("test", "br_small.nq"))
+
+        assert URIRef("https://w3id.org/oc/meta/br/0605") in (
+            ocdm_dataset.dirty_subjects
+        )
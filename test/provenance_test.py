@@ -4,9 +4,12 @@
 
 import json
 import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import patch
 
 import pytest
-from rdflib import Literal, URIRef
+from rdflib import XSD, BNode, Literal, URIRef
 
 from rdflib_ocdm.counter_handler.filesystem_counter_handler import (
     FilesystemCounterHandler,
@@ -16,6 +19,17 @@ from rdflib_ocdm.counter_handler.sqlite_counter_handler import SqliteCounterHand
 from rdflib_ocdm.ocdm_graph import OCDMDataset, OCDMGraph
 from rdflib_ocdm.prov.provenance import OCDMProvenance
 from rdflib_ocdm.prov.snapshot_entity import SnapshotEntity
+from rdflib_ocdm.query_utils import get_update_query
+
+
+class _NoScanDict(dict):
+    """A merge index that fails if it is scanned instead of looked up."""
+
+    def items(self):
+        raise AssertionError("the merge index must not be scanned")
+
+    keys = values = __iter__ = items
+
 
 LONG_TITLE = (
     "A Review Of Hemolytic Uremic Syndrome In Patients Treated With Gemcitabine Therapy"
@@ -110,9 +124,9 @@ class TestOCDMProvenance:
         }
 
     def test_generate_provenance_modification_ocdm_conjunctive_graph_filesystem_counter(
-        self,
+        self, tmp_path
     ):
-        counter_handler = FilesystemCounterHandler(os.path.join("test", "info_dir"))
+        counter_handler = FilesystemCounterHandler(str(tmp_path / "info_dir"))
         ocdm_conjunctive_graph = OCDMDataset(counter_handler=counter_handler)
         ocdm_conjunctive_graph.parse(os.path.join("test", "br.nq"))
         ocdm_conjunctive_graph.provenance.counter_handler.set_counter(1, self.subject)
@@ -153,7 +167,7 @@ class TestOCDMProvenance:
         )
         assert se_a_2.get_update_action() == expected
         with open(
-            os.path.join("test", "info_dir", "provenance_index.json"),
+            tmp_path / "info_dir" / "provenance_index.json",
             "r",
             encoding="utf8",
         ) as outfile:
@@ -390,3 +404,202 @@ class TestOCDMProvenance:
         assert "GRAPH <https://w3id.org/oc/meta/id/>" in update_action
         assert "DELETE DATA" in update_action
         assert str(entity_uri) in update_action
+
+    def test_generate_provenance_only_visits_dirty_subjects(self):
+        ocdm_dataset = OCDMDataset()
+        ocdm_dataset.parse(os.path.join("test", "br.nq"))
+        ocdm_dataset.preexisting_finished(c_time=self.cur_time)
+        ocdm_dataset.remove(
+            (
+                URIRef(self.subject),
+                URIRef("http://purl.org/dc/terms/title"),
+                Literal(LONG_TITLE),
+            )
+        )
+
+        with patch(
+            "rdflib_ocdm.prov.provenance.get_update_query",
+            wraps=get_update_query,
+        ) as mock_get_update_query:
+            ocdm_dataset.generate_provenance(c_time=self.cur_time + 100)
+
+        assert {call.args[1] for call in mock_get_update_query.call_args_list} == {
+            URIRef(self.subject)
+        }
+        se_a_2 = ocdm_dataset.get_entity(f"{self.subject}/prov/se/2")
+        assert se_a_2 is not None
+        assert se_a_2.get_description() == f"The entity '{self.subject}' was modified."
+
+    def test_generate_provenance_batches_counter_requests(self):
+        counter_handler = InMemoryCounterHandler()
+        ocdm_dataset = OCDMDataset(counter_handler=counter_handler)
+        ocdm_dataset.parse(os.path.join("test", "br.nq"))
+
+        with (
+            patch.object(
+                counter_handler, "read_counters", wraps=counter_handler.read_counters
+            ) as mock_read_counters,
+            patch.object(
+                counter_handler,
+                "increment_counters",
+                wraps=counter_handler.increment_counters,
+            ) as mock_increment_counters,
+            patch.object(counter_handler, "read_counter") as mock_read_counter,
+            patch.object(counter_handler, "increment_counter") as mock_increment,
+            patch.object(counter_handler, "set_counter") as mock_set_counter,
+        ):
+            ocdm_dataset.preexisting_finished(c_time=self.cur_time)
+            for subject in list(ocdm_dataset.entity_index)[:3]:
+                ocdm_dataset.remove((subject, None, None, None))  # type: ignore[arg-type]
+            ocdm_dataset.generate_provenance(c_time=self.cur_time + 100)
+
+        assert mock_read_counters.call_count == 2
+        assert mock_increment_counters.call_count == 2
+        mock_read_counter.assert_not_called()
+        mock_increment.assert_not_called()
+        mock_set_counter.assert_not_called()
+        assert counter_handler.prov_counters == dict.fromkeys(
+            (str(subject) for subject in ocdm_dataset.all_entities), 1
+        ) | {str(subject): 2 for subject in list(ocdm_dataset.entity_index)[:3]}
+
+    def test_generate_provenance_looks_up_merge_index(self):
+        # A synthetic merge workload: every scan of the merge index per
+        # subject would fail, and would make the run quadratic
+        n_entities = 4000
+        n_merges = 1000
+        title = URIRef("http://purl.org/dc/terms/title")
+        entities = [
+            URIRef(f"https://w3id.org/oc/meta/br/06{i}") for i in range(n_entities)
+        ]
+        ocdm_graph = OCDMGraph()
+        for i, entity in enumerate(entities):
+            ocdm_graph.add((entity, title, Literal(f"Title {i}")))
+        ocdm_graph.preexisting_finished(c_time=self.cur_time)
+        for i in range(n_merges):
+            ocdm_graph.merge(entities[i], entities[n_entities - 1 - i])
+        ocdm_graph._OCDMGraphCommons__merge_index = _NoScanDict(  # type: ignore[attr-defined]
+            ocdm_graph.merge_index
+        )
+
+        ocdm_graph.generate_provenance(c_time=self.cur_time + 100)
+
+        for i in (0, n_merges - 1):
+            merge_snapshot = ocdm_graph.get_entity(f"{entities[i]}/prov/se/2")
+            assert merge_snapshot is not None
+            assert merge_snapshot.get_description() == (
+                f"The entity '{entities[i]}' was merged"
+                f" with '{entities[n_entities - 1 - i]}'."
+            )
+        assert ocdm_graph.get_entity(f"{entities[n_merges]}/prov/se/2") is None
+
+    @pytest.mark.parametrize("track_changes", [False, True])
+    @pytest.mark.parametrize("graph_class", [OCDMGraph, OCDMDataset])
+    def test_parallel_generate_provenance_matches_sequential(
+        self, graph_class, track_changes
+    ):
+        title = URIRef("http://purl.org/dc/terms/title")
+        graph_iri = URIRef("https://w3id.org/oc/meta/br/")
+        subjects = [URIRef(f"https://w3id.org/oc/meta/br/06{i}") for i in range(12)]
+
+        def run(max_workers):
+            ocdm_graph = graph_class(track_changes=track_changes)
+            for i, subject in enumerate(subjects):
+                triple = (subject, title, Literal(f"Title {i}"))
+                if graph_class is OCDMDataset:
+                    ocdm_graph.add((*triple, graph_iri))
+                else:
+                    ocdm_graph.add(triple)
+            ocdm_graph.preexisting_finished(c_time=self.cur_time)
+            for i, subject in enumerate(subjects[:6]):
+                ocdm_graph.remove((subject, title, None))
+                ocdm_graph.add((subject, title, Literal(f"New title {i}")))
+            ocdm_graph.add((subjects[11], title, Literal("Second title")))
+            ocdm_graph.add((subjects[10], URIRef("http://example.org/p"), BNode()))
+            ocdm_graph.mark_as_deleted(subjects[7])
+            ocdm_graph.merge(subjects[8], subjects[9])
+            ocdm_graph.generate_provenance(
+                c_time=self.cur_time + 100, max_workers=max_workers
+            )
+            return ocdm_graph.get_provenance_graphs().serialize(format="nquads")
+
+        with patch(
+            "rdflib_ocdm.prov.provenance.ProcessPoolExecutor",
+            wraps=ProcessPoolExecutor,
+        ) as mock_executor:
+            parallel = run(max_workers=2)
+        mock_executor.assert_called_once()
+        assert mock_executor.call_args.kwargs["max_workers"] == 2
+        sequential = run(max_workers=1)
+        assert parallel == sequential
+        assert f"The entity '{subjects[0]}' was modified." in parallel
+        assert f"The entity '{subjects[7]}' has been deleted." in parallel
+        assert f"The entity '{subjects[8]}' was merged" in parallel
+
+    def test_parallel_generate_provenance_in_threads(self):
+        title = URIRef("http://purl.org/dc/terms/title")
+
+        def build(prefix):
+            subjects = [URIRef(f"{prefix}06{i}") for i in range(8)]
+            ocdm_graph = OCDMGraph()
+            for i, subject in enumerate(subjects):
+                ocdm_graph.add((subject, title, Literal(f"Title {i}")))
+            ocdm_graph.preexisting_finished(c_time=self.cur_time)
+            for i, subject in enumerate(subjects):
+                ocdm_graph.remove((subject, title, None))
+                ocdm_graph.add((subject, title, Literal(f"{prefix} {i}")))
+            return ocdm_graph
+
+        def provenance(ocdm_graph):
+            return ocdm_graph.get_provenance_graphs().serialize(format="nquads")
+
+        prefixes = ["https://w3id.org/oc/meta/br/", "https://w3id.org/oc/meta/ra/"]
+        expected = []
+        for prefix in prefixes:
+            ocdm_graph = build(prefix)
+            ocdm_graph.generate_provenance(c_time=self.cur_time + 100)
+            expected.append(provenance(ocdm_graph))
+        graphs = [build(prefix) for prefix in prefixes]
+        threads = [
+            threading.Thread(
+                target=ocdm_graph.generate_provenance,
+                kwargs={"c_time": self.cur_time + 100, "max_workers": 2},
+            )
+            for ocdm_graph in graphs
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert [provenance(ocdm_graph) for ocdm_graph in graphs] == expected
+
+    def test_snapshots_are_materialized_when_read(self):
+        ocdm_graph = OCDMGraph()
+        ocdm_graph.parse(os.path.join("test", "br.nt"))
+        ocdm_graph.preexisting_finished(
+            resp_agent="https://orcid.org/0000-0002-8420-0696", c_time=self.cur_time
+        )
+        provenance = ocdm_graph.provenance
+        assert len(provenance.store) == 0
+        se_1 = ocdm_graph.get_entity(f"{self.subject}/prov/se/1")
+        assert se_1 is not None
+        assert not hasattr(se_1, "__dict__")
+        assert se_1.get_resp_agent() == URIRef("https://orcid.org/0000-0002-8420-0696")
+
+        quads = set(provenance.quads((se_1.res, None, None, None)))
+        assert len(provenance.store) > 0
+        assert (
+            se_1.res,
+            SnapshotEntity.iri_was_attributed_to,
+            URIRef("https://orcid.org/0000-0002-8420-0696"),
+            provenance.default_context.identifier,
+        ) in quads
+
+        # Changes to a materialized snapshot are written through
+        se_1.has_invalidation_time(self.cur_time_str)
+        se_1.remove_resp_agent()
+        assert (se_1.res, SnapshotEntity.iri_was_attributed_to, None) not in provenance
+        assert provenance.value(
+            se_1.res, SnapshotEntity.iri_invalidated_at_time
+        ) == Literal(self.cur_time_str, datatype=XSD.dateTime)
+        assert se_1.get_invalidation_time() == self.cur_time_str
@@ -2,10 +2,19 @@
 #
 # SPDX-License-Identifier: ISC
 
+from unittest.mock import patch
+
 from rdflib import BNode, Dataset, Graph, Literal, URIRef
 
 from rdflib_ocdm.ocdm_graph import OCDMDataset, OCDMGraph
-from rdflib_ocdm.query_utils import get_delete_query, get_insert_query, get_update_query
+from rdflib_ocdm.query_utils import (
+    _compute_update_query,
+    _diff_graphs,
+    _isomorphic_diff,
+    get_delete_query,
+    get_insert_query,
+    get_update_query,
+)
 
 
 class TestQueryUtils:
@@ -236,3 +245,119 @@ class TestQueryUtils:
         assert "INSERT DATA" in query
         assert added == 1
         assert removed == 1
+
+    def test_get_update_query_blank_nodes_use_isomorphism(self):
+        ocdm_graph = OCDMGraph()
+        entity = URIRef("http://example.org/entity")
+        ocdm_graph.add((entity, URIRef("http://example.org/p"), BNode()))
+        ocdm_graph.preexisting_finished()
+        ocdm_graph.remove((entity, URIRef("http://example.org/p"), None))
+        ocdm_graph.add((entity, URIRef("http://example.org/p"), BNode()))
+
+        assert get_update_query(ocdm_graph, entity) == ("", 0, 0)
+
+    def test_get_update_query_same_result_with_and_without_change_log(self):
+        entity = URIRef("http://example.org/entity")
+        results = []
+        for track_changes in (False, True):
+            ocdm_graph = OCDMGraph(track_changes=track_changes)
+            ocdm_graph.add((entity, URIRef("http://example.org/p1"), Literal("old")))
+            ocdm_graph.add((entity, URIRef("http://example.org/p2"), Literal("kept")))
+            ocdm_graph.preexisting_finished()
+            ocdm_graph.remove((entity, URIRef("http://example.org/p1"), None))
+            ocdm_graph.add((entity, URIRef("http://example.org/p3"), Literal("new")))
+            results.append(get_update_query(ocdm_graph, entity))
+        assert results[0] == results[1]
+        assert results[0][1:] == (1, 1)
+
+    def test_get_update_query_change_log_triple_moved_between_graphs(self):
+        ocdm_graph = OCDMDataset(track_changes=True)
+        entity = URIRef("http://example.org/entity")
+        triple = (entity, URIRef("http://example.org/p"), Literal("test"))
+        graph_a = URIRef("http://example.org/graph/a/")
+        graph_b = URIRef("http://example.org/graph/b/")
+        ocdm_graph.add(triple + (graph_a,))  # type: ignore[arg-type]
+        ocdm_graph.preexisting_finished()
+        ocdm_graph.remove(triple + (graph_a,))  # type: ignore[arg-type]
+        ocdm_graph.add(triple + (graph_b,))  # type: ignore[arg-type]
+
+        assert get_update_query(ocdm_graph, entity) == ("", 0, 0)
+
+
+class TestSetDiff:
+    n_entities = 200
+    n_triples = 20
+
+    def _build_graphs(self) -> list:
+        graphs = []
+        for i in range(self.n_entities):
+            entity = URIRef(f"http://example.org/entity/{i}")
+            preexisting = Graph()
+            current = Graph()
+            for j in range(self.n_triples):
+                triple = (entity, URIRef(f"http://example.org/p{j}"), Literal(j))
+                preexisting.add(triple)
+                current.add(triple)
+            current.remove((entity, URIRef("http://example.org/p0"), None))
+            current.add((entity, URIRef("http://example.org/p0"), Literal("new")))
+            graphs.append((preexisting, current))
+        return graphs
+
+    def test_set_diff_matches_isomorphic_diff(self):
+        graphs = self._build_graphs()
+
+        isomorphic = [_isomorphic_diff(pre, cur) for pre, cur in graphs]
+        with patch(
+            "rdflib_ocdm.query_utils._isomorphic_diff", wraps=_isomorphic_diff
+        ) as mock_isomorphic_diff:
+            fast = [_diff_graphs(pre, cur) for pre, cur in graphs]
+
+        # Without blank nodes the plain set difference is enough
+        mock_isomorphic_diff.assert_not_called()
+        for (iso_first, iso_second), (fast_first, fast_second) in zip(isomorphic, fast):
+            assert set(iso_first) == set(fast_first)
+            assert set(iso_second) == set(fast_second)
+
+
+class TestUpdateQueryCache:
+    def test_get_update_query_cached_until_entity_changes(self):
+        ocdm_graph = OCDMGraph()
+        entity = URIRef("http://example.org/entity")
+        other = URIRef("http://example.org/other")
+        ocdm_graph.add((entity, URIRef("http://example.org/p"), Literal("old")))
+        ocdm_graph.add((other, URIRef("http://example.org/p"), Literal("other")))
+        ocdm_graph.preexisting_finished()
+        ocdm_graph.add((entity, URIRef("http://example.org/p"), Literal("new")))
+
+        with patch(
+            "rdflib_ocdm.query_utils._compute_update_query",
+            wraps=_compute_update_query,
+        ) as mock_compute:
+            first = get_update_query(ocdm_graph, entity)
+            assert get_update_query(ocdm_graph, entity) == first
+            assert mock_compute.call_count == 1
+
+            ocdm_graph.add((other, URIRef("http://example.org/p"), Literal("x")))
+            assert get_update_query(ocdm_graph, entity) == first
+            assert mock_compute.call_count == 1
+
+            ocdm_graph.remove((entity, URIRef("http://example.org/p"), None))
+            query, added, removed = get_update_query(ocdm_graph, entity)
+            assert mock_compute.call_count == 2
+            assert "DELETE DATA" in query
+            assert (added, removed) == (0, 1)
+
+            ocdm_graph.commit_changes()
+            assert entity not in ocdm_graph.update_query_cache
+
+    def test_get_update_query_cache_invalidated_by_mark_as_deleted(self):
+        ocdm_graph = OCDMGraph()
+        entity = URIRef("http://example.org/entity")
+        ocdm_graph.add((entity, URIRef("http://example.org/p"), Literal("test")))
+        ocdm_graph.preexisting_finished()
+
+        assert get_update_query(ocdm_graph, entity) == ("", 0, 0)
+        ocdm_graph.mark_as_deleted(entity)
+        query, added, removed = get_update_query(ocdm_graph, entity)
+        assert "DELETE DATA" in query
+        assert (added, removed) == (0, 1)
@@ -2,13 +2,15 @@
 #
 # SPDX-License-Identifier: ISC
 
+import asyncio
 from unittest.mock import MagicMock, patch
 
 import pytest
 from rdflib import XSD, Graph, Literal, URIRef
 
 from rdflib_ocdm.ocdm_graph import OCDMDataset, OCDMGraph
-from rdflib_ocdm.reader import Reader
+from rdflib_ocdm.reader import AsyncReader, Reader
+from rdflib_ocdm.sparql_client import SPARQLClient
 
 
 class TestReader:
@@ -206,7 +208,9 @@ class TestReader:
     def test_import_entities_invalid_graph_type(self):
         with pytest.raises(TypeError) as exc_info:
             self.reader.import_entities_from_triplestore(
-                "not_a_graph", self.ts_url, self.res_list  # pyright: ignore[reportArgumentType]
+                "not_a_graph",  # pyright: ignore[reportArgumentType]
+                self.ts_url,
+                self.res_list,
             )
         assert "must be either OCDMGraph or OCDMDataset" in str(exc_info.value)
 
@@ -269,3 +273,102 @@ class TestReader:
 
         assert len(ocdm_graph) == 1
         assert mock_sparql.return_value.queryAndConvert.call_count == 3
+
+
+class TestAsyncReader:
+    subject = URIRef("http://example.org/res1")
+    other = URIRef("http://example.org/res2")
+    graph_iri = URIRef("http://example.org/graph/")
+
+    @pytest.fixture(autouse=True)
+    def setup(self, local_sparql_endpoint):
+        self.endpoint = local_sparql_endpoint
+        self.endpoint.dataset.update(
+            f"""INSERT DATA {{ GRAPH <{self.graph_iri}> {{
+                <{self.subject}> <http://example.org/title> "Title"@en .
+                <{self.subject}> <http://example.org/year>
+                    "2020"^^<{XSD.gYear}> .
+                <{self.subject}> <http://example.org/cites> <{self.other}> .
+                <{self.other}> <http://example.org/title> "Other" .
+            }} }}"""
+        )
+
+    def test_import_entities_ocdm_graph(self):
+        ocdm_graph = OCDMGraph()
+        reader = AsyncReader()
+
+        asyncio.run(
+            reader.import_entities_from_triplestore(
+                ocdm_graph, self.endpoint.url, [self.subject]
+            )
+        )
+
+        assert set(ocdm_graph) == {
+            (
+                self.subject,
+                URIRef("http://example.org/title"),
+                Literal("Title", lang="en"),
+            ),
+            (
+                self.subject,
+                URIRef("http://example.org/year"),
+                Literal("2020", datatype=XSD.gYear),
+            ),
+            (self.subject, URIRef("http://example.org/cites"), self.other),
+        }
+
+    def test_import_entities_ocdm_dataset(self):
+        ocdm_dataset = OCDMDataset()
+        reader = AsyncReader(max_concurrent_requests=1)
+
+        async def import_all():
+            await asyncio.gather(
+                reader.import_entities_from_triplestore(
+                    ocdm_dataset, self.endpoint.url, [self.subject]
+                ),
+                reader.import_entities_from_triplestore(
+                    ocdm_dataset, self.endpoint.url, [self.other]
+                ),
+            )
+
+        asyncio.run(import_all())
+
+        assert len(ocdm_dataset) == 4
+        assert {quad[3] for quad in ocdm_dataset.quads()} == {self.graph_iri}
+        assert ocdm_dataset.entity_index[self.other]["graph_iri"] == self.graph_iri
+
+    def test_import_entities_no_results(self):
+        with pytest.raises(ValueError, match="No entities were found."):
+            asyncio.run(
+                AsyncReader().import_entities_from_triplestore(
+                    OCDMGraph(),
+                    self.endpoint.url,
+                    [URIRef("http://example.org/missing")],
+                )
+            )
+
+    def test_import_entities_with_sparql_client(self):
+        ocdm_graph = OCDMGraph()
+        ocdm_dataset = OCDMDataset()
+
+        with SPARQLClient() as client:
+            Reader.import_entities_from_triplestore(
+                ocdm_graph, self.endpoint.url, [self.subject], sparql_client=client
+            )
+            asyncio.run(
+                AsyncReader().import_entities_from_triplestore(
+                    ocdm_dataset,
+                    self.endpoint.url,
+                    [self.subject, self.other],
+                    sparql_client=client,
+                )
+            )
+
+        assert len(ocdm_graph) == 3
+        assert (
+            self.subject,
+            URIRef("http://example.org/year"),
+            Literal("2020", datatype=XSD.gYear),
+        ) in ocdm_graph
+        assert len(ocdm_dataset) == 4
+        assert len(self.endpoint.connections) == 1
@@ -2,9 +2,12 @@
 #
 # SPDX-License-Identifier: ISC
 
+import threading
 from unittest.mock import patch
 
+import fakeredis
 import pytest
+import redis
 
 from rdflib_ocdm.counter_handler.redis_counter_handler import RedisCounterHandler
 
@@ -49,6 +52,57 @@ class TestRedisCounterHandler:
         assert result == 6
         assert int(self.fake_redis.get("existing_entity")) == 6  # type: ignore[arg-type]
 
+    def test_bulk_counters(self):
+        self.handler.set_counters({"a": 3, "b": 1})
+        assert self.handler.read_counters(["a", "b", "c"]) == {"a": 3, "b": 1, "c": 0}
+        assert self.handler.increment_counters(["a", "c", "c"]) == {"a": 4, "c": 2}
+        assert int(self.fake_redis.get("c")) == 2  # type: ignore[arg-type]
+        assert self.handler.read_counters([]) == {}
+        with pytest.raises(ValueError):
+            self.handler.set_counters({"a": -1})
+        assert self.handler.read_counter("a") == 4
+
+    def test_increment_counter_uses_incr(self):
+        with patch.object(self.fake_redis, "get") as get:
+            assert self.handler.increment_counter("entity") == 1
+        get.assert_not_called()
+
+    def test_concurrent_increments(self):
+        def increment():
+            for _ in range(100):
+                self.handler.increment_counter("shared")
+
+        threads = [threading.Thread(target=increment) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert self.handler.read_counter("shared") == 400
+
+    def test_namespace(self):
+        self.fake_redis.set("other", 7)
+        handler = RedisCounterHandler(namespace="prov[1]:")
+        handler.connection = self.fake_redis
+        handler.set_counters({"a": 2, "b": 5})
+        assert handler.increment_counter("a") == 3
+        assert int(self.fake_redis.get("prov[1]:a")) == 3  # type: ignore[arg-type]
+        assert self.handler.read_counter("a") == 0
+        handler.flush()
+        assert handler.read_counters(["a", "b"]) == {"a": 0, "b": 0}
+        assert int(self.fake_redis.get("other")) == 7  # type: ignore[arg-type]
+
+    def test_shared_connection_pool(self):
+        server = fakeredis.FakeServer()
+        pool = fakeredis.FakeRedis(server=server).connection_pool
+        assert isinstance(pool, redis.ConnectionPool)
+        first = RedisCounterHandler(connection_pool=pool, namespace="x:")
+        second = RedisCounterHandler(connection_pool=pool, namespace="x:")
+        assert first.increment_counter("e") == 1
+        assert second.increment_counter("e") == 2
+        first.disconnect()
+        assert second.read_counter("e") == 2
+        second.disconnect()
+
     def test_flush(self):
         self.fake_redis.set("entity1", 1)
         self.fake_redis.set("entity2", 2)
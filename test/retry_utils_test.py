@@ -2,11 +2,12 @@
 #
 # SPDX-License-Identifier: ISC
 
-from unittest.mock import MagicMock, patch
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from rdflib_ocdm.retry_utils import execute_with_retry
+from rdflib_ocdm.retry_utils import async_execute_with_retry, execute_with_retry
 
 
 class MockReporter:
@@ -67,3 +68,65 @@ class TestRetryUtils:
         assert mock_func.call_count == 4
         assert len(mock_reporter.messages) == 4
         assert "[ERROR]" in mock_reporter.messages[-1]
+
+
+class TestAsyncRetryUtils:
+    def test_async_execute_with_retry_success_after_retries(self):
+        mock_func = AsyncMock(
+            side_effect=[Exception("Error 1"), Exception("Error 2"), "success"]
+        )
+
+        with patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+            result = asyncio.run(
+                async_execute_with_retry(
+                    mock_func, "arg1", max_retries=3, base_wait_time=0.1, kwarg1=1
+                )
+            )
+
+        assert result == "success"
+        assert mock_func.await_count == 3
+        mock_func.assert_awaited_with("arg1", kwarg1=1)
+        assert mock_sleep.await_count == 2
+
+    def test_async_execute_with_retry_all_attempts_fail(self):
+        mock_reporter = MockReporter()
+        mock_func = AsyncMock(side_effect=Exception("Persistent error"))
+
+        with patch("asyncio.sleep", new_callable=AsyncMock):
+            with pytest.raises(ValueError) as exc_info:
+                asyncio.run(
+                    async_execute_with_retry(
+                        mock_func, max_retries=3, reporter=mock_reporter
+                    )
+                )
+
+        assert "Failed after 3 attempts" in str(exc_info.value)
+        assert mock_func.await_count == 4
+        assert "[ERROR]" in mock_reporter.messages[-1]
+
+    def test_async_execute_with_retry_releases_semaphore_while_waiting(self):
+        async def run():
+            semaphore = asyncio.BoundedSemaphore(1)
+            attempts = []
+
+            async def flaky(name):
+                attempts.append(name)
+                if attempts.count(name) == 1:
+                    raise Exception(f"{name} failed")
+                return name
+
+            return await asyncio.gather(
+                async_execute_with_retry(
+                    flaky, "a", base_wait_time=0.01, semaphore=semaphore
+                ),
+                async_execute_with_retry(
+                    flaky, "b", base_wait_time=0.01, semaphore=semaphore
+                ),
+            ), attempts
+
+        with patch("rdflib_ocdm.retry_utils.random.random", return_value=0):
+            results, attempts = asyncio.run(run())
+
+        assert results == ["a", "b"]
+        # "b" gets its first attempt while "a" waits for its retry
+        assert attempts[:2] == ["a", "b"]
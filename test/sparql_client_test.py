@@ -0,0 +1,94 @@
+# SPDX-FileCopyrightText: 2026 Arcangelo Massari <arcangelo.massari@unibo.it>
+#
+# SPDX-License-Identifier: ISC
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from rdflib import Literal, URIRef
+
+from rdflib_ocdm.sparql_client import SPARQLClient
+
+INSERT = 'INSERT DATA {{ <http://example.org/s> <http://example.org/p> "{}" }}'
+
+
+class TestSPARQLClient:
+    def test_update_reuses_connection(self, local_sparql_endpoint):
+        with SPARQLClient() as client:
+            for i in range(5):
+                client.update(local_sparql_endpoint.url, INSERT.format(i))
+
+        assert len(local_sparql_endpoint.updates) == 5
+        assert len(local_sparql_endpoint.connections) == 1
+        assert (
+            local_sparql_endpoint.content_types
+            == ["application/x-www-form-urlencoded"] * 5
+        )
+        assert len(local_sparql_endpoint.dataset) == 5
+
+    def test_update_as_sparql_update_body(self, local_sparql_endpoint):
+        with SPARQLClient(sparql_update_body=True) as client:
+            client.update(local_sparql_endpoint.url, INSERT.format("zì"))
+
+        assert local_sparql_endpoint.content_types == [
+            "application/sparql-update; charset=utf-8"
+        ]
+        assert (
+            URIRef("http://example.org/s"),
+            URIRef("http://example.org/p"),
+            Literal("zì"),
+        ) in local_sparql_endpoint.dataset
+
+    def test_query(self, local_sparql_endpoint):
+        with SPARQLClient() as client:
+            client.update(local_sparql_endpoint.url, INSERT.format("a"))
+            data = client.query(
+                local_sparql_endpoint.url,
+                "SELECT ?o WHERE { ?s ?p ?o }",
+                "application/sparql-results+json",
+            )
+
+        bindings = json.loads(data)["results"]["bindings"]
+        assert bindings == [{"o": {"type": "literal", "value": "a"}}]
+        assert len(local_sparql_endpoint.connections) == 1
+
+    def test_error_status_raises(self, local_sparql_endpoint):
+        local_sparql_endpoint.failures = 1
+        with SPARQLClient() as client:
+            with pytest.raises(ValueError, match="500"):
+                client.update(local_sparql_endpoint.url, INSERT.format("a"))
+            # The connection is still usable after an error status
+            client.update(local_sparql_endpoint.url, INSERT.format("a"))
+
+        assert len(local_sparql_endpoint.connections) == 1
+
+    def test_connection_closed_by_server_is_replaced(self, local_sparql_endpoint):
+        local_sparql_endpoint.drop_connections = True
+        with SPARQLClient() as client:
+            for i in range(3):
+                client.update(local_sparql_endpoint.url, INSERT.format(i))
+
+        assert len(local_sparql_endpoint.updates) == 3
+        assert len(local_sparql_endpoint.connections) == 3
+
+    def test_pool_size_bounds_connections(self, local_sparql_endpoint):
+        with SPARQLClient(pool_size=2) as client:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                list(
+                    executor.map(
+                        lambda i: client.update(
+                            local_sparql_endpoint.url, INSERT.format(i)
+                        ),
+                        range(40),
+                    )
+                )
+
+        assert len(local_sparql_endpoint.updates) == 40
+        assert len(local_sparql_endpoint.connections) <= 2
+
+    def test_invalid_arguments(self):
+        with pytest.raises(ValueError):
+            SPARQLClient(pool_size=0)
+        with pytest.raises(ValueError, match="Unsupported"):
+            SPARQLClient().update("ftp://example.org/sparql", INSERT.format("a"))
@@ -2,17 +2,24 @@
 #
 # SPDX-License-Identifier: ISC
 
+import asyncio
+import functools
+import gzip
 import os
 import shutil
 import tempfile
-from unittest.mock import patch
+import threading
+import zipfile
+from unittest.mock import AsyncMock, patch
 
 import pytest
 from oc_ocdm.support.reporter import Reporter
-from rdflib import Graph, Literal, URIRef
+from rdflib import Dataset, Graph, Literal, URIRef
 
 from rdflib_ocdm.ocdm_graph import OCDMDataset, OCDMGraph
-from rdflib_ocdm.storer import Storer
+from rdflib_ocdm.query_utils import _compute_update_query, get_update_query
+from rdflib_ocdm.sparql_client import SPARQLClient
+from rdflib_ocdm.storer import AsyncStorer, Storer
 
 LONG_TITLE = (
     "A Review Of Hemolytic Uremic Syndrome In Patients Treated With Gemcitabine Therapy"
@@ -453,3 +460,380 @@ class TestStorer:
         result = storer.upload_all(self.endpoint, self.base_dir, batch_size=0)
 
         assert result
+
+
+class TestStorerOffline:
+    def test_upload_all_only_dirty_subjects(self):
+        ocdm_graph = OCDMGraph()
+        ocdm_graph.parse(os.path.join("test", "br.nt"))
+        ocdm_graph.preexisting_finished()
+        subject = URIRef("https://w3id.org/oc/meta/br/0605")
+        ocdm_graph.add(
+            (subject, URIRef("http://purl.org/dc/terms/title"), Literal("Bella zì"))
+        )
+        storer = Storer(ocdm_graph)
+
+        with (
+            patch(
+                "rdflib_ocdm.storer.get_update_query", wraps=get_update_query
+            ) as mock_get_update_query,
+            patch.object(Storer, "_query", return_value=True) as mock_query,
+        ):
+            assert storer.upload_all("http://example.org/sparql")
+
+        assert [call.args[1] for call in mock_get_update_query.call_args_list] == [
+            subject
+        ]
+        mock_query.assert_called_once()
+        assert "Bella zì" in mock_query.call_args.args[0]
+
+    def test_upload_all_reuses_provenance_diffs(self):
+        ocdm_graph = OCDMGraph()
+        ocdm_graph.parse(os.path.join("test", "br.nt"))
+        ocdm_graph.preexisting_finished()
+        subject = URIRef("https://w3id.org/oc/meta/br/0605")
+        ocdm_graph.add(
+            (subject, URIRef("http://purl.org/dc/terms/title"), Literal("Bella zì"))
+        )
+        storer = Storer(ocdm_graph)
+
+        with (
+            patch(
+                "rdflib_ocdm.query_utils._compute_update_query",
+                wraps=_compute_update_query,
+            ) as mock_compute,
+            patch.object(Storer, "_query", return_value=True),
+        ):
+            ocdm_graph.generate_provenance()
+            storer.upload_all("http://example.org/sparql")
+
+        assert mock_compute.call_count == 1
+
+    def test_upload_all_concurrent_batches(self):
+        ocdm_graph = OCDMGraph()
+        ocdm_graph.preexisting_finished()
+        for i in range(7):
+            ocdm_graph.add(
+                (
+                    URIRef(f"http://example.org/entity/{i}"),
+                    URIRef("http://purl.org/dc/terms/title"),
+                    Literal(f"Entity {i}"),
+                )
+            )
+        storer = Storer(ocdm_graph)
+
+        with patch("rdflib_ocdm.storer.SPARQLWrapper") as mock_sparql:
+            result = storer.upload_all(
+                "http://example.org/sparql", batch_size=2, max_workers=3
+            )
+
+        assert result
+        queries = [
+            call.args[0] for call in mock_sparql.return_value.setQuery.call_args_list
+        ]
+        assert len(queries) == 4
+        for i in range(7):
+            assert sum(f"Entity {i}" in query for query in queries) == 1
+
+    def test_upload_all_concurrent_batches_with_failures(self):
+        ocdm_graph = OCDMGraph()
+        ocdm_graph.preexisting_finished()
+        for i in range(4):
+            ocdm_graph.add(
+                (
+                    URIRef(f"http://example.org/entity/{i}"),
+                    URIRef("http://purl.org/dc/terms/title"),
+                    Literal(f"Entity {i}"),
+                )
+            )
+        storer = Storer(ocdm_graph)
+
+        def failing_retry(func, *args, **kwargs):
+            raise ValueError("Connection failed")
+
+        with (
+            tempfile.TemporaryDirectory() as temp_dir,
+            patch("rdflib_ocdm.storer.execute_with_retry", side_effect=failing_retry),
+        ):
+            result = storer.upload_all(
+                "http://example.org/sparql",
+                base_dir=temp_dir,
+                batch_size=1,
+                max_workers=4,
+            )
+
+            assert not result
+            error_files = os.listdir(os.path.join(temp_dir, "tp_err"))
+            assert len(error_files) == 4
+            dumped = set()
+            for error_file in error_files:
+                with open(
+                    os.path.join(temp_dir, "tp_err", error_file), encoding="utf-8"
+                ) as f:
+                    dumped.add(f.read())
+            assert len(dumped) == 4
+
+    def _build_uneven_graph(self) -> OCDMGraph:
+        ocdm_graph = OCDMGraph()
+        ocdm_graph.preexisting_finished()
+        for i in range(10):
+            # Every third entity is much larger than the others
+            n_triples = 30 if i % 3 == 0 else 1
+            for j in range(n_triples):
+                ocdm_graph.add(
+                    (
+                        URIRef(f"http://example.org/entity/{i}"),
+                        URIRef(f"http://example.org/p{j}"),
+                        Literal(f"Entity {i} value {j}"),
+                    )
+                )
+        return ocdm_graph
+
+    def _uploaded_batches(self, storer: Storer, **kwargs) -> list:
+        with patch.object(Storer, "_query", return_value=True) as mock_query:
+            assert storer.upload_all("http://example.org/sparql", **kwargs)
+        return [call.args for call in mock_query.call_args_list]
+
+    def test_upload_all_max_triples(self):
+        ocdm_graph = self._build_uneven_graph()
+        batches = self._uploaded_batches(
+            Storer(ocdm_graph), batch_size=None, max_triples=32
+        )
+
+        assert sum(batch[3] for batch in batches) == len(ocdm_graph)
+        assert all(batch[4] == 0 for batch in batches)
+        assert all(batch[3] <= 32 for batch in batches)
+        for i in range(10):
+            assert sum(f"Entity {i} value 0" in batch[0] for batch in batches) == 1
+
+    def test_upload_all_max_bytes(self):
+        ocdm_graph = self._build_uneven_graph()
+        small_query = get_update_query(
+            ocdm_graph, URIRef("http://example.org/entity/1")
+        )[0]
+        max_bytes = 3 * len(small_query.encode("utf-8"))
+        batches = self._uploaded_batches(
+            Storer(ocdm_graph), batch_size=None, max_bytes=max_bytes
+        )
+
+        assert sum(batch[3] for batch in batches) == len(ocdm_graph)
+        for batch in batches:
+            # Only a single oversized entity can exceed the budget
+            assert len(batch[0].encode("utf-8")) <= max_bytes or (" ; " not in batch[0])
+        assert len(batches) > len(self._uploaded_batches(Storer(ocdm_graph)))
+
+    def test_upload_all_batch_size_and_budgets_combined(self):
+        ocdm_graph = self._build_uneven_graph()
+        batches = self._uploaded_batches(
+            Storer(ocdm_graph), batch_size=2, max_triples=1000
+        )
+
+        assert len(batches) == 5
+
+    def test_upload_all_with_sparql_client(self, local_sparql_endpoint):
+        ocdm_graph = OCDMGraph()
+        ocdm_graph.preexisting_finished()
+        for i in range(6):
+            ocdm_graph.add(
+                (
+                    URIRef(f"http://example.org/entity/{i}"),
+                    URIRef("http://purl.org/dc/terms/title"),
+                    Literal(f"Entity {i}"),
+                )
+            )
+        local_sparql_endpoint.failures = 1
+
+        with (
+            SPARQLClient(sparql_update_body=True) as client,
+            patch("time.sleep"),
+        ):
+            storer = Storer(ocdm_graph, sparql_client=client)
+            assert storer.upload_all(local_sparql_endpoint.url, batch_size=2)
+
+        # Batches and retries all go through the same connection
+        assert len(local_sparql_endpoint.updates) == 3
+        assert len(local_sparql_endpoint.connections) == 1
+        assert set(local_sparql_endpoint.content_types) == {
+            "application/sparql-update; charset=utf-8"
+        }
+        assert set(local_sparql_endpoint.dataset) == set(ocdm_graph)
+
+
+class TestAsyncStorer:
+    def _build_graph(self, n_entities: int) -> OCDMGraph:
+        ocdm_graph = OCDMGraph()
+        ocdm_graph.preexisting_finished()
+        for i in range(n_entities):
+            ocdm_graph.add(
+                (
+                    URIRef(f"http://example.org/entity/{i}"),
+                    URIRef("http://purl.org/dc/terms/title"),
+                    Literal(f"Entity {i}"),
+                )
+            )
+        return ocdm_graph
+
+    def test_upload_all(self, local_sparql_endpoint):
+        ocdm_graph = self._build_graph(7)
+        storer = AsyncStorer(ocdm_graph, max_concurrent_requests=2)
+
+        result = asyncio.run(storer.upload_all(local_sparql_endpoint.url, batch_size=2))
+
+        assert result
+        assert len(local_sparql_endpoint.updates) == 4
+        assert set(local_sparql_endpoint.dataset) == set(ocdm_graph)
+
+    def test_upload_all_bounded_concurrency(self, local_sparql_endpoint):
+        ocdm_graph = self._build_graph(12)
+        storer = AsyncStorer(ocdm_graph, max_concurrent_requests=3)
+        in_flight = 0
+        max_in_flight = 0
+        lock = threading.Lock()
+
+        def counting_to_thread(func, *args, **kwargs):
+            async def run():
+                nonlocal in_flight, max_in_flight
+                with lock:
+                    in_flight += 1
+                    max_in_flight = max(max_in_flight, in_flight)
+                try:
+                    await asyncio.sleep(0.01)
+                    return await asyncio.get_running_loop().run_in_executor(
+                        None, functools.partial(func, *args, **kwargs)
+                    )
+                finally:
+                    with lock:
+                        in_flight -= 1
+
+            return run()
+
+        with patch("rdflib_ocdm.storer.asyncio.to_thread", counting_to_thread):
+            result = asyncio.run(
+                storer.upload_all(local_sparql_endpoint.url, batch_size=1)
+            )
+
+        assert result
+        assert len(local_sparql_endpoint.updates) == 12
+        assert max_in_flight == 3
+
+    def test_upload_all_retries_then_dumps_failures(self, local_sparql_endpoint):
+        ocdm_graph = self._build_graph(2)
+        storer = AsyncStorer(ocdm_graph)
+        local_sparql_endpoint.failures = 1000
+
+        with (
+            tempfile.TemporaryDirectory() as temp_dir,
+            patch(
+                "rdflib_ocdm.retry_utils.asyncio.sleep", new_callable=AsyncMock
+            ) as mock_sleep,
+        ):
+            result = asyncio.run(
+                storer.upload_all(
+                    local_sparql_endpoint.url, base_dir=temp_dir, batch_size=1
+                )
+            )
+
+            assert not result
+            assert len(os.listdir(os.path.join(temp_dir, "tp_err"))) == 2
+        assert mock_sleep.await_count == 10
+        assert local_sparql_endpoint.updates == []
+
+
+class TestStoreGraphsInFile:
+    graph_iri = URIRef("http://example.org/graph/")
+    title = URIRef("http://purl.org/dc/terms/title")
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path):
+        self.tmp_path = tmp_path
+        self.ocdm_dataset = OCDMDataset()
+        for i in range(3):
+            self.ocdm_dataset.add(
+                (
+                    URIRef(f"http://example.org/entity/{i}"),
+                    self.title,
+                    Literal(f"Entity {i}"),
+                    self.graph_iri,
+                )  # type: ignore[arg-type]
+            )
+        self.ocdm_dataset.preexisting_finished()
+        self.changed = URIRef("http://example.org/entity/0")
+        self.deleted = URIRef("http://example.org/entity/1")
+        self.ocdm_dataset.add(
+            (self.changed, self.title, Literal("Bella zì"), self.graph_iri)  # type: ignore[arg-type]
+        )
+        self.ocdm_dataset.mark_as_deleted(self.deleted)
+
+    def _expected_quads(self) -> set:
+        return {
+            (s, p, o, self.graph_iri)
+            for s, p, o, _ in self.ocdm_dataset.quads((self.changed, None, None, None))
+        }
+
+    def test_store_nquads(self):
+        file_path = str(self.tmp_path / "out" / "data.nq")
+        Storer(self.ocdm_dataset, output_format="nquads").store_graphs_in_file(
+            file_path
+        )
+
+        dataset = Dataset()
+        dataset.parse(file_path, format="nquads")
+        assert set(dataset.quads()) == self._expected_quads()
+
+    def test_store_ntriples(self):
+        file_path = str(self.tmp_path / "data.nt")
+        Storer(self.ocdm_dataset, output_format="nt").store_graphs_in_file(file_path)
+
+        graph = Graph().parse(file_path, format="nt")
+        assert set(graph) == {quad[:3] for quad in self._expected_quads()}
+
+    def test_store_json_ld(self):
+        file_path = str(self.tmp_path / "data.json")
+        Storer(self.ocdm_dataset).store_graphs_in_file(file_path)
+
+        dataset = Dataset()
+        dataset.parse(file_path, format="json-ld")
+        assert set(dataset.quads()) == self._expected_quads()
+
+    def test_store_compressed(self):
+        storer = Storer(self.ocdm_dataset, output_format="nquads", zip_output=True)
+        zip_path = str(self.tmp_path / "data.nq.zip")
+        gzip_path = str(self.tmp_path / "data.nq.gz")
+        storer.store_graphs_in_file(zip_path)
+        storer.store_graphs_in_file(gzip_path, compression="gzip")
+
+        with zipfile.ZipFile(zip_path) as archive:
+            assert archive.namelist() == ["data.nq"]
+            zipped = archive.read("data.nq")
+        with gzip.open(gzip_path) as f:
+            gzipped = f.read()
+        assert zipped == gzipped
+        dataset = Dataset()
+        dataset.parse(data=zipped, format="nquads")
+        assert set(dataset.quads()) == self._expected_quads()
+
+    def test_store_provenance(self):
+        self.ocdm_dataset.generate_provenance()
+        file_path = str(self.tmp_path / "prov.nq")
+        Storer(
+            self.ocdm_dataset.provenance, output_format="nquads"
+        ).store_graphs_in_file(file_path)
+
+        dataset = Dataset()
+        dataset.parse(file_path, format="nquads")
+        # Every snapshot goes to the provenance graph of its entity
+        expected = {
+            (s, p, o, URIRef(str(s).split("/prov/")[0] + "/prov/"))
+            for s, p, o, _ in self.ocdm_dataset.provenance.quads()
+        }
+        assert set(dataset.quads()) == expected
+        assert {
+            URIRef(f"{self.changed}/prov/"),
+            URIRef(f"{self.deleted}/prov/"),
+        } <= {quad[3] for quad in expected}
+
+    def test_store_unsupported_compression(self):
+        with pytest.raises(ValueError, match="not supported"):
+            Storer(self.ocdm_dataset).store_graphs_in_file(
+                str(self.tmp_path / "data.json.bz2"), compression="bz2"
+            )